@@ -15,12 +15,17 @@ def create_app(configuration):
         configuration(str): name of configuration to use for current instace
     returns:
         app(object): app instance
+    raises:
+        RuntimeError: if no SECRET_KEY is configured
     """
     app = Flask(__name__, instance_relative_config=True)
     app.url_map.strict_slashes = False
 
     # configure app
     app.config.from_object(CONFIG[configuration])
+    if not app.config['SECRET_KEY']:
+        raise RuntimeError('Set the SECRET_KEY environment variable to the '
+                           'key access tokens are signed with')
 
     # register blueprints
     app.register_blueprint(v_1)
@@ -1,10 +1,50 @@
 """Create api version one blueprint."""
-from flask import Blueprint
+from flask import Blueprint, make_response
 
 from flask_restful import Api
 
+from app.decorators import backend_unavailable
+
 version_one = Blueprint('v1', __name__, url_prefix='/api/v1')
 
-API = Api(version_one)
+API = Api(version_one, decorators=[backend_unavailable])
 
 from app.api_1_0 import routes
+
+from app.api_1_0.backends import backend_key, open_backends
+
+from app.api_1_0.serializers import encode
+
+
+@API.representation('application/json')
+def output_json(data, code, headers=None):
+    """Encode resource results, turning records into their public form."""
+    response = make_response(encode(data), code)
+    response.headers.extend(headers or {})
+    return response
+
+
+def release_backends(error=None):
+    """Give back the connections the request thread took from backends."""
+    routes.views.DB.backend.release()
+    routes.views.USERS.backend.release()
+
+
+@version_one.record_once
+def init_app(state):
+    """Apply the app configuration to the api's shared objects."""
+    config = state.app.config
+    routes.views.CACHE.resize(config['RESPONSE_CACHE_SIZE'])
+    routes.views.DB.changes.resize(config['CHANGE_LOG_SIZE'])
+    routes.views.DB.use_columns(config['COLUMN_INDEX'])
+    routes.views.DB.events.queue_size = config['EVENT_QUEUE_SIZE']
+    routes.views.TOKENS.configure(config['SECRET_KEY'],
+                                  config['TOKEN_MAX_AGE'])
+    routes.views.HASHER.configure(config['PASSWORD_HASH_ITERATIONS'],
+                                  config['PASSWORD_HASH_WORKERS'],
+                                  config['PASSWORD_HASH_QUEUE'])
+    state.app.teardown_appcontext(release_backends)
+    if routes.views.DB.backend.key != backend_key(config):
+        incidents, users = open_backends(config)
+        routes.views.DB.use(incidents)
+        routes.views.USERS.use(users)
@@ -0,0 +1,56 @@
+"""Storage backends for the api data.
+
+IncidentStore and UserRegistry keep their indexes and locks themselves and
+hand the records to one of these backends, chosen by the STORAGE_BACKEND
+setting.
+"""
+from app.api_1_0.backends.journal import Journal, \
+    JournaledIncidentBackend, JournaledUserBackend
+from app.api_1_0.backends.memory import MemoryIncidentBackend, \
+    MemoryUserBackend
+from app.api_1_0.backends.sqlite import SQLiteDatabase, \
+    SQLiteIncidentBackend, SQLiteUserBackend
+
+
+def backend_key(config):
+    """Return the key of the backends that config asks for."""
+    if config['STORAGE_BACKEND'] == 'sqlite':
+        return ('sqlite', config['SQLITE_PATH'])
+    if config['STORAGE_BACKEND'] == 'postgres':
+        return ('postgres', config['POSTGRES_URL'])
+    if config['STORAGE_BACKEND'] == 'journal':
+        return ('journal', config['JOURNAL_DIR'])
+    return (config['STORAGE_BACKEND'],)
+
+
+def open_backends(config):
+    """Create the incident and user backends named in config.
+
+    returns:
+        tuple: an IncidentBackend and a UserBackend
+    """
+    name = config['STORAGE_BACKEND']
+    if name == 'memory':
+        return MemoryIncidentBackend(), MemoryUserBackend()
+    if name == 'sqlite':
+        database = SQLiteDatabase(config['SQLITE_PATH'],
+                                  config['SQLITE_POOL_SIZE'])
+        return SQLiteIncidentBackend(database), SQLiteUserBackend(database)
+    if name == 'journal':
+        directory = config['JOURNAL_DIR']
+        every = config['JOURNAL_SNAPSHOT_EVERY']
+        incidents = Journal(directory, 'redflags', every)
+        users = Journal(directory, 'users', every)
+        return JournaledIncidentBackend(incidents), \
+            JournaledUserBackend(users)
+    if name == 'postgres':
+        # imported here so psycopg2 is only needed when postgres is used
+        from app.api_1_0.backends.postgres import ConnectionPool, \
+            PostgresIncidentBackend, PostgresUserBackend
+        pool = ConnectionPool(
+            config['POSTGRES_URL'], size=config['POSTGRES_POOL_SIZE'],
+            timeout=config['POSTGRES_POOL_TIMEOUT'],
+            connect_timeout=config['POSTGRES_CONNECT_TIMEOUT'],
+            statement_timeout=config['POSTGRES_STATEMENT_TIMEOUT'])
+        return PostgresIncidentBackend(pool), PostgresUserBackend(pool)
+    raise ValueError('Unknown storage backend {}'.format(name))
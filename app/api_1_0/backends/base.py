@@ -0,0 +1,132 @@
+"""Interfaces the storage backends implement."""
+
+
+class BackendUnavailable(RuntimeError):
+    """Raised when a backend cannot serve a request in time."""
+
+
+class IncidentBackend():
+    """Store redflags by id.
+
+    Writes are serialized by IncidentStore. Reads may run at any time
+    and must see either the state before or after each write.
+    """
+
+    # identifies the backend and its location, to tell if it changed
+    key = None
+
+    @property
+    def version(self):
+        """Number of the latest change."""
+        raise NotImplementedError
+
+    def next_id(self):
+        """Allocate a new redflag id."""
+        raise NotImplementedError
+
+    def put(self, record_id, record):
+        """Save or replace a redflag, taking the next version."""
+        raise NotImplementedError
+
+    def put_many(self, items):
+        """Save (id, redflag) pairs, each taking the next version."""
+        for record_id, record in items:
+            self.put(record_id, record)
+
+    def delete(self, record_id):
+        """Delete a redflag that exists, taking the next version."""
+        raise NotImplementedError
+
+    def get(self, record_id):
+        """Retrieve a redflag or None if it does not exist."""
+        raise NotImplementedError
+
+    def record_version(self, record_id):
+        """Return the version of a redflag or None if it does not exist."""
+        raise NotImplementedError
+
+    def select(self, record_ids):
+        """Return {id: redflag} items for the given ids that exist."""
+        items = []
+        for record_id in record_ids:
+            record = self.get(record_id)
+            if record is not None:
+                items.append({record_id: record})
+        return items
+
+    def page(self, after, limit):
+        """Return up to limit {id: redflag} items after an id, in id order.
+
+        returns:
+            list: {id: redflag} items
+            bool: whether more redflags follow the returned ones
+        """
+        raise NotImplementedError
+
+    def iter_items(self):
+        """Yield every (id, redflag) in id order."""
+        raise NotImplementedError
+
+    def index_rows(self):
+        """Return every redflag for indexes to load.
+
+        returns:
+            list: SnapshotRows whose redflags indexes load in bulk from
+                columns
+            iterable: (id, redflag) items of the other redflags in id
+                order, read once and added to the indexes one at a time
+        """
+        return [], self.iter_items()
+
+    def clear(self):
+        """Remove all redflags and restart ids from one."""
+        raise NotImplementedError
+
+    def sync(self):
+        """Wait until the changes made by this thread are durable."""
+
+    def release(self):
+        """Give back what the current thread borrowed, as a request ends."""
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class UserBackend():
+    """Store users by normalized email.
+
+    Writes are serialized by UserRegistry.
+    """
+
+    key = None
+
+    def next_id(self):
+        """Allocate a new user id."""
+        raise NotImplementedError
+
+    def put(self, email, user):
+        """Save a user under a normalized email."""
+        raise NotImplementedError
+
+    def get(self, email):
+        """Retrieve a user by normalized email or None."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all users and restart ids from one."""
+        raise NotImplementedError
+
+    def sync(self):
+        """Wait until the changes made by this thread are durable."""
+
+    def release(self):
+        """Give back what the current thread borrowed, as a request ends."""
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+    def __len__(self):
+        raise NotImplementedError
@@ -0,0 +1,316 @@
+"""Binary snapshot format for redflags, read through mmap.
+
+A snapshot file starts with a header, followed by a heap of UTF-8
+strings and then by fixed-width columns with one entry per redflag, in id
+order:
+
+    ids, versions, creators      signed 64-bit integers
+    longitudes, latitudes        64-bit floats
+    created                      microseconds since 1970 as 64-bit integers
+    offsets                      three unsigned 64-bit heap offsets per
+                                 redflag, for its title, comment and
+                                 extras, plus the end of the heap
+
+All numbers are little-endian. Extras hold, as a JSON object, the fields
+that do not fit the columns: a location whose text is not the one rebuilt
+from the coordinates, a date that is not a plain datetime, or a status
+other than draft.
+"""
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+from app.api_1_0.backends.memory import CHUNK_BITS, Chunk
+from app.api_1_0.records import DRAFT, IncidentRecord, public
+from app.utils import parse_location
+
+MAGIC = b'IRSNAP02'
+# magic, number of redflags, version, last id, offset of the columns
+HEADER = struct.Struct('<8sQQQQ')
+COLUMNS = (('ids', 'q'), ('versions', 'q'), ('creators', 'q'),
+           ('longitudes', 'd'), ('latitudes', 'd'), ('created', 'q'),
+           ('offsets', 'Q'))
+CODES = dict(COLUMNS)
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def format_location(lon, lat):
+    """Return the text of a location."""
+    return '{!r}, {!r}'.format(lon, lat)
+
+
+def encode(record):
+    """Split a redflag into column values and heap strings.
+
+    returns:
+        tuple: longitude, latitude, created, title, comment and extras of
+            the redflag
+    """
+    extras = {}
+    location = record.location
+    point = parse_location(location) if isinstance(location, str) else None
+    if point is None or format_location(*point) != location:
+        extras['Location'] = location
+        point = (math.nan, math.nan)
+    created = record.created_on
+    if isinstance(created, datetime) and created.tzinfo is None:
+        microseconds = (created - EPOCH) // MICROSECOND
+    else:
+        extras['Date Created'] = public(created)
+        microseconds = 0
+    if record.status != DRAFT:
+        extras['Status'] = record.status
+    return (point[0], point[1], microseconds, record.title, record.comment,
+            json.dumps(extras) if extras else '')
+
+
+def write_snapshot(file, rows, version, last_id):
+    """Write redflags to a snapshot file.
+
+    args:
+        file(file): binary file open for writing, at its start
+        rows(iterable): (id, version, redflag) tuples in id order
+        version(int): number of the latest change
+        last_id(int): largest id handed out so far
+    """
+    columns = {name: array(code) for name, code in COLUMNS}
+    ids, versions, creators, longitudes, latitudes, created, offsets = \
+        (columns[name] for name, code in COLUMNS)
+    file.write(bytes(HEADER.size))
+    position = HEADER.size
+    for record_id, record_version, record in rows:
+        lon, lat, date, *strings = encode(record)
+        ids.append(record_id)
+        versions.append(record_version)
+        creators.append(record.created_by)
+        longitudes.append(lon)
+        latitudes.append(lat)
+        created.append(date)
+        for text in strings:
+            data = text.encode()
+            offsets.append(position)
+            file.write(data)
+            position += len(data)
+    offsets.append(position)
+    padding = -position % 8
+    file.write(bytes(padding))
+    for name, code in COLUMNS:
+        column = columns[name]
+        if sys.byteorder != 'little':
+            column.byteswap()
+        file.write(column.tobytes())
+    file.seek(0)
+    file.write(HEADER.pack(MAGIC, len(ids), version, last_id,
+                           position + padding))
+    file.seek(0, 2)
+
+
+class SnapshotFile():
+    """Read a snapshot file mapped into memory.
+
+    Opening a snapshot only reads its header; columns are used in place
+    and a redflag is decoded each time it is read.
+    """
+
+    def __init__(self, path):
+        """Map a snapshot file.
+
+        args:
+            path(str): location of the file
+        raises:
+            ValueError: if the file is not a snapshot
+        """
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, self.version, self.last_id, offset = \
+            HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError('{} is not a redflag snapshot'.format(path))
+        view = memoryview(self._map)
+        for name, code in COLUMNS:
+            length = 3 * count + 1 if name == 'offsets' else count
+            end = offset + length * array(code).itemsize
+            column = view[offset:end].cast(code)
+            if sys.byteorder != 'little':
+                column = array(code, column)
+                column.byteswap()
+            setattr(self, '_' + name, column)
+            offset = end
+
+    def record(self, position):
+        """Decode the redflag at a position of the columns."""
+        start = 3 * position
+        title, comment, extras, end = self._offsets[start:start + 4]
+        heap = self._map
+        fields = json.loads(heap[extras:end].decode()) if end > extras else {}
+        if 'Location' in fields:
+            location = fields['Location']
+        else:
+            location = format_location(self._longitudes[position],
+                                       self._latitudes[position])
+        if 'Date Created' in fields:
+            created = fields['Date Created']
+        else:
+            created = EPOCH + self._created[position] * MICROSECOND
+        return IncidentRecord(id=self._ids[position],
+                              created_by=self._creators[position],
+                              created_on=created, location=location,
+                              comment=heap[comment:extras].decode(),
+                              title=heap[title:comment].decode(),
+                              status=fields.get('Status', DRAFT))
+
+    def title(self, position):
+        """Decode only the title of the redflag at a position."""
+        start = 3 * position
+        return self._map[self._offsets[start]:
+                         self._offsets[start + 1]].decode()
+
+    def split(self, chunks):
+        """Separate the redflags indexes can read from the columns.
+
+        A redflag can be read from the columns while its chunk is the one
+        loaded from this file and it has no extras: its location, date
+        and status are then the ones rebuilt from the columns.
+
+        args:
+            chunks(iterable): Chunks of a backend, in id order
+        returns:
+            SnapshotRows: the redflags that can be read from the columns
+            list: (id, redflag) items of the others, in id order
+        """
+        offsets = self._offsets
+        positions = array('q')
+        items = []
+        for chunk in chunks:
+            records = chunk.records
+            if not isinstance(records, MappedColumn) or \
+                    records._read != self.record:
+                items.extend((record_id, records[record_id])
+                             for record_id in chunk.ids)
+                continue
+            start, end = records._start, records._end
+            # an empty extras string ends where the next title starts
+            if offsets[3 * start + 2:3 * end + 2:3] == \
+                    offsets[3 * start + 3:3 * end + 3:3]:
+                positions.extend(range(start, end))
+                continue
+            for position in range(start, end):
+                if offsets[3 * position + 2] == offsets[3 * position + 3]:
+                    positions.append(position)
+                else:
+                    items.append((self._ids[position],
+                                  self.record(position)))
+        if positions and positions[-1] - positions[0] + 1 == len(positions):
+            positions = range(positions[0], positions[-1] + 1)
+        return SnapshotRows(self, positions), items
+
+    def chunks(self):
+        """Return Chunks reading their redflags from the file.
+
+        returns:
+            dict: Chunks keyed by chunk number
+        """
+        ids = self._ids
+        chunks = {}
+        start = 0
+        while start < len(ids):
+            number = ids[start] >> CHUNK_BITS
+            end = bisect_left(ids, (number + 1) << CHUNK_BITS, start)
+            chunks[number] = Chunk(
+                ids[start:end],
+                MappedColumn(ids, start, end, self.record),
+                MappedColumn(ids, start, end, self._versions.__getitem__))
+            start = end
+        return chunks
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class SnapshotRows():
+    """Redflags of a SnapshotFile that indexes read from its columns.
+
+    Every one of them is a draft at the location and date rebuilt from
+    the columns, so indexes take their numbers from the mapped columns
+    without decoding them.
+    """
+
+    def __init__(self, snapshot, positions):
+        """Select rows of a snapshot.
+
+        args:
+            snapshot(SnapshotFile): where the rows are
+            positions(sequence): positions of the rows, a range when they
+                follow each other
+        """
+        self.snapshot = snapshot
+        self.positions = positions
+
+    def column(self, name):
+        """Return the values of the rows in a column of COLUMNS."""
+        column = getattr(self.snapshot, '_' + name)
+        positions = self.positions
+        if isinstance(positions, range):
+            return column[positions.start:positions.stop]
+        return array(CODES[name], (column[position]
+                                   for position in positions))
+
+    def titles(self):
+        """Return the titles of the rows."""
+        return [self.snapshot.title(position) for position in self.positions]
+
+    def items(self):
+        """Yield (id, redflag) of the rows, decoding each redflag."""
+        for position in self.positions:
+            record = self.snapshot.record(position)
+            yield record.id, record
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class MappedColumn(Mapping):
+    """Map the ids of one chunk to values read from a snapshot file."""
+
+    def __init__(self, ids, start, end, read):
+        """Initialize a mapping over a range of the id column.
+
+        args:
+            ids(sequence): the sorted id column
+            start(int): position of the first id of the chunk
+            end(int): position after the last id of the chunk
+            read(callable): returns the value at a position
+        """
+        self._ids = ids
+        self._start = start
+        self._end = end
+        self._read = read
+
+    def _position(self, record_id):
+        position = bisect_left(self._ids, record_id, self._start, self._end)
+        if position < self._end and self._ids[position] == record_id:
+            return position
+        return None
+
+    def __getitem__(self, record_id):
+        position = self._position(record_id)
+        if position is None:
+            raise KeyError(record_id)
+        return self._read(position)
+
+    def __contains__(self, record_id):
+        return self._position(record_id) is not None
+
+    def __iter__(self):
+        return iter(self._ids[self._start:self._end])
+
+    def __len__(self):
+        return self._end - self._start
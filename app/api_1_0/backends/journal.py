@@ -0,0 +1,357 @@
+"""Backends keeping data in memory with an append-only journal on disk."""
+import json
+import os
+import re
+import threading
+from functools import partial
+
+from app.api_1_0.backends.binary import SnapshotFile, write_snapshot
+from app.api_1_0.backends.memory import MemoryIncidentBackend, \
+    MemoryUserBackend, Snapshot
+from app.api_1_0.records import IncidentRecord, UserRecord
+
+
+class Journal():
+    """Append changes to a log file and compact them into snapshots.
+
+    Files are named <name>-<generation>.log and <name>-<generation>.snapshot.
+    The snapshot of a generation holds the state before the first entry of
+    the log of the same generation, so recovery loads the newest snapshot
+    and replays only the logs from its generation on. Older files are
+    removed once a newer snapshot is complete.
+
+    Appending only queues an entry. sync waits until the entries queued by
+    the calling thread are on disk: the first waiter writes and fsyncs
+    everything queued so far, so writers arriving together share a single
+    fsync. Entries must be appended by one writer at a time.
+    """
+
+    def __init__(self, directory, name, snapshot_every=10000):
+        """Initialize a journal, reading nothing until recover is called.
+
+        args:
+            directory(str): where the log and snapshot files are kept
+            name(str): prefix of the file names
+            snapshot_every(int): number of entries between snapshots
+        """
+        self.directory = directory
+        self.name = name
+        self.snapshot_every = snapshot_every
+        self.generation = 0
+        self._file = None
+        self._entries = 0
+        self._pending = []
+        self._appended = 0
+        self._durable = 0
+        self._flushing = False
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._compactor = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, generation, kind):
+        return os.path.join(self.directory, '{}-{:010d}.{}'.format(
+            self.name, generation, kind))
+
+    def _generations(self, kind):
+        pattern = re.compile(r'{}-(\d+)\.{}$'.format(re.escape(self.name),
+                                                     kind))
+        generations = []
+        for filename in os.listdir(self.directory):
+            match = pattern.match(filename)
+            if match:
+                generations.append(int(match.group(1)))
+        return sorted(generations)
+
+    def recover(self, load, apply):
+        """Replay the newest snapshot and the entries logged after it.
+
+        A last entry cut short by a crash is dropped from the log.
+
+        args:
+            load(callable): called with the path of the snapshot, if
+                there is one
+            apply(callable): called with every logged entry in order
+        """
+        snapshots = self._generations('snapshot')
+        if snapshots:
+            self.generation = snapshots[-1]
+            load(self._path(self.generation, 'snapshot'))
+        logs = [generation for generation in self._generations('log')
+                if generation >= self.generation]
+        size = 0
+        for generation in logs:
+            size = 0
+            with open(self._path(generation, 'log'), 'rb') as log:
+                for line in log:
+                    if not line.endswith(b'\n'):
+                        break
+                    apply(json.loads(line.decode()))
+                    size += len(line)
+                    self._entries += 1
+        if logs:
+            self.generation = logs[-1]
+        self._file = open(self._path(self.generation, 'log'), 'ab')
+        self._file.truncate(size)
+
+    @property
+    def compacting(self):
+        """Whether a snapshot is being written."""
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def append(self, entry):
+        """Queue an entry to be written by the next sync.
+
+        args:
+            entry(list): JSON serializable description of a change
+        returns:
+            bool: whether a snapshot is due
+        """
+        line = (json.dumps(entry) + '\n').encode()
+        with self._condition:
+            self._pending.append(line)
+            self._appended += 1
+            self._local.sequence = self._appended
+        self._entries += 1
+        return self._entries >= self.snapshot_every and not self.compacting
+
+    def _flush(self):
+        # called holding self._condition, which is released while writing
+        lines, self._pending = self._pending, []
+        sequence = self._appended
+        self._flushing = True
+        self._condition.release()
+        try:
+            self._file.write(b''.join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except BaseException:
+            self._condition.acquire()
+            self._pending[:0] = lines
+            self._flushing = False
+            self._condition.notify_all()
+            raise
+        self._condition.acquire()
+        self._durable = sequence
+        self._flushing = False
+        self._condition.notify_all()
+
+    def _flush_all(self):
+        # called holding self._condition
+        while self._flushing or self._pending:
+            if self._flushing:
+                self._condition.wait()
+            else:
+                self._flush()
+
+    def sync(self):
+        """Wait until the entries appended by this thread are on disk."""
+        sequence = getattr(self._local, 'sequence', 0)
+        with self._condition:
+            while self._durable < sequence:
+                if self._flushing:
+                    self._condition.wait()
+                else:
+                    self._flush()
+
+    def compact(self, write):
+        """Start a new log and snapshot the state before it.
+
+        The snapshot is written by a background thread, so whatever
+        write reads must not change afterwards.
+
+        args:
+            write(callable): called with a binary file to write the
+                snapshot into
+        """
+        with self._condition:
+            self._flush_all()
+            self._file.close()
+            self.generation += 1
+            self._file = open(self._path(self.generation, 'log'), 'ab')
+        self._entries = 0
+        self._compactor = threading.Thread(
+            target=self._write_snapshot, args=(self.generation, write),
+            daemon=True)
+        self._compactor.start()
+
+    def _write_snapshot(self, generation, write):
+        path = self._path(generation, 'snapshot')
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as snapshot:
+            write(snapshot)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, path)
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        for kind in ('snapshot', 'log'):
+            for old in self._generations(kind):
+                if old < generation:
+                    os.remove(self._path(old, kind))
+
+    def close(self):
+        """Finish the snapshot being written and close the log."""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._condition:
+            self._flush_all()
+            self._file.close()
+
+
+def snapshot_rows(snap):
+    """Yield (id, version, redflag) rows of a memory backend Snapshot."""
+    for number in snap.keys:
+        chunk = snap.chunks[number]
+        for record_id in chunk.ids:
+            yield (record_id, chunk.versions[record_id],
+                   chunk.records[record_id])
+
+
+def write_json_snapshot(file, header, rows):
+    """Write a JSON header line followed by one JSON line per row."""
+    file.write((json.dumps(header) + '\n').encode())
+    for row in rows:
+        file.write((json.dumps(row) + '\n').encode())
+
+
+class JournaledIncidentBackend(MemoryIncidentBackend):
+    """Keep redflags in memory and log every change to a Journal.
+
+    Opening the backend replays the journal, so redflags, ids and
+    versions are the same as before the last shutdown or crash.
+    Snapshots use the binary format of SnapshotFile and are mapped into
+    memory, so redflags from a snapshot are only decoded when read.
+    """
+
+    def __init__(self, journal):
+        """Recover the redflags of a journal.
+
+        args:
+            journal(Journal): where changes are logged
+        """
+        super().__init__()
+        self.journal = journal
+        self.key = ('journal', journal.directory)
+        self._file = None
+        journal.recover(self._load, self._apply)
+
+    def _load(self, path):
+        snapshot = self._file = SnapshotFile(path)
+        chunks = snapshot.chunks()
+        self._snapshot = Snapshot(snapshot.version, len(snapshot),
+                                  tuple(sorted(chunks)), chunks)
+        with self._id_lock:
+            self._last_id = snapshot.last_id
+
+    def index_rows(self):
+        """Return every redflag for indexes to load at once.
+
+        Redflags still in the chunks loaded from the snapshot are read from
+        its columns, and only the others are listed as items.
+        """
+        if self._file is None:
+            return super().index_rows()
+        snap = self._snapshot
+        rows, items = self._file.split(snap.chunks[number]
+                                       for number in snap.keys)
+        return [rows], items
+
+    def _apply(self, entry):
+        operation = entry[0]
+        if operation == 'put':
+            super().put(entry[1], IncidentRecord.from_dict(entry[2]))
+        elif operation == 'delete':
+            super().delete(entry[1])
+        elif operation == 'clear':
+            super().clear()
+
+    def _log(self, entry):
+        if self.journal.append(entry):
+            snap = self._snapshot
+            with self._id_lock:
+                last_id = self._last_id
+            self.journal.compact(partial(
+                write_snapshot, rows=snapshot_rows(snap),
+                version=snap.version, last_id=last_id))
+
+    def put(self, record_id, record):
+        """Save or replace a redflag."""
+        super().put(record_id, record)
+        self._log(['put', record_id, record.to_dict()])
+
+    def delete(self, record_id):
+        """Delete a redflag that exists."""
+        super().delete(record_id)
+        self._log(['delete', record_id])
+
+    def clear(self):
+        """Remove all redflags and restart ids from one."""
+        super().clear()
+        self._log(['clear'])
+
+    def sync(self):
+        """Wait until the changes made by this thread are on disk."""
+        self.journal.sync()
+
+    def close(self):
+        """Close the journal."""
+        self.journal.close()
+
+
+class JournaledUserBackend(MemoryUserBackend):
+    """Keep users in memory and log every change to a Journal."""
+
+    def __init__(self, journal):
+        """Recover the users of a journal.
+
+        args:
+            journal(Journal): where changes are logged
+        """
+        super().__init__()
+        self.journal = journal
+        self.key = ('journal', journal.directory)
+        journal.recover(self._load, self._apply)
+
+    def _load(self, path):
+        with open(path) as snapshot:
+            header = json.loads(next(snapshot))
+            self._users = {email: UserRecord.from_dict(user) for email, user
+                           in map(json.loads, snapshot)}
+        self._last_id = header['last_id']
+
+    def _apply(self, entry):
+        if entry[0] == 'put':
+            user = UserRecord.from_dict(entry[2])
+            super().put(entry[1], user)
+            self._last_id = max(self._last_id, user.id)
+        elif entry[0] == 'clear':
+            super().clear()
+
+    def _log(self, entry):
+        if self.journal.append(entry):
+            self.journal.compact(partial(
+                write_json_snapshot, header={'last_id': self._last_id},
+                rows=[(email, user.to_dict())
+                      for email, user in self._users.items()]))
+
+    def put(self, email, user):
+        """Save a user under a normalized email."""
+        super().put(email, user)
+        self._log(['put', email, user.to_dict()])
+
+    def clear(self):
+        """Remove all users and restart ids from one."""
+        super().clear()
+        self._log(['clear'])
+
+    def sync(self):
+        """Wait until the changes made by this thread are on disk."""
+        self.journal.sync()
+
+    def close(self):
+        """Close the journal."""
+        self.journal.close()
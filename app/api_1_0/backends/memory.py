@@ -0,0 +1,226 @@
+"""Backends keeping all data in memory."""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+from app.api_1_0.backends.base import IncidentBackend, UserBackend
+
+# ids per chunk of the incident backend, as a power of two
+CHUNK_BITS = 10
+
+Chunk = namedtuple('Chunk', ['ids', 'records', 'versions'])
+Chunk.__doc__ = """Redflags whose ids share the same chunk number.
+
+ids is a sorted sequence, records and versions map ids to redflags and
+to their versions. They are tuples and dicts unless the chunk was loaded
+from a SnapshotFile. A chunk is never changed once it is published.
+"""
+
+Snapshot = namedtuple('Snapshot', ['version', 'count', 'keys', 'chunks'])
+Snapshot.__doc__ = """The state of a MemoryIncidentBackend at one version.
+
+keys is a sorted tuple of chunk numbers and chunks maps them to Chunks.
+A snapshot is never changed once it is published.
+"""
+
+EMPTY = Snapshot(0, 0, (), {})
+
+
+class MemoryIncidentBackend(IncidentBackend):
+    """Keep redflags in chunks of consecutive ids.
+
+    Readers never lock. They use the current Snapshot, which is replaced
+    rather than changed: a write copies only the chunk it touches and the
+    small map of chunks, then publishes a new snapshot. Writes must be
+    serialized by the caller.
+    """
+
+    key = ('memory',)
+
+    def __init__(self):
+        """Initialize an empty backend."""
+        self._snapshot = EMPTY
+        self._last_id = 0
+        self._id_lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Number of the latest change."""
+        return self._snapshot.version
+
+    def next_id(self):
+        """Allocate a new redflag id."""
+        with self._id_lock:
+            self._last_id += 1
+            return self._last_id
+
+    def _publish(self, snap, number, chunk, version, count):
+        chunks = dict(snap.chunks)
+        keys = snap.keys
+        if chunk is None:
+            del chunks[number]
+            keys = keys[:bisect_left(keys, number)] + \
+                keys[bisect_right(keys, number):]
+        else:
+            if number not in chunks:
+                keys = list(keys)
+                insort(keys, number)
+                keys = tuple(keys)
+            chunks[number] = chunk
+        self._snapshot = Snapshot(version, count, keys, chunks)
+
+    def put(self, record_id, record):
+        """Save or replace a redflag."""
+        snap = self._snapshot
+        version = snap.version + 1
+        number = record_id >> CHUNK_BITS
+        chunk = snap.chunks.get(number)
+        if chunk is None:
+            chunk = Chunk((record_id,), {}, {})
+        records = dict(chunk.records)
+        versions = dict(chunk.versions)
+        ids = tuple(chunk.ids)
+        is_new = record_id not in records
+        if is_new and ids and record_id < ids[-1]:
+            ids = tuple(sorted(ids + (record_id,)))
+        elif is_new and records:
+            ids = ids + (record_id,)
+        records[record_id] = record
+        versions[record_id] = version
+        self._publish(snap, number, Chunk(ids, records, versions),
+                      version, snap.count + is_new)
+        with self._id_lock:
+            self._last_id = max(self._last_id, record_id)
+
+    def delete(self, record_id):
+        """Delete a redflag that exists."""
+        snap = self._snapshot
+        number = record_id >> CHUNK_BITS
+        chunk = snap.chunks[number]
+        if len(chunk.ids) == 1:
+            chunk = None
+        else:
+            records = dict(chunk.records)
+            versions = dict(chunk.versions)
+            del records[record_id]
+            del versions[record_id]
+            ids = tuple(chunk.ids)
+            position = bisect_left(ids, record_id)
+            ids = ids[:position] + ids[position + 1:]
+            chunk = Chunk(ids, records, versions)
+        self._publish(snap, number, chunk, snap.version + 1, snap.count - 1)
+
+    def get(self, record_id):
+        """Retrieve a redflag or None if it does not exist."""
+        chunk = self._snapshot.chunks.get(record_id >> CHUNK_BITS)
+        if chunk is None:
+            return None
+        return chunk.records.get(record_id)
+
+    def record_version(self, record_id):
+        """Return the version of a redflag or None if it does not exist."""
+        chunk = self._snapshot.chunks.get(record_id >> CHUNK_BITS)
+        if chunk is None:
+            return None
+        return chunk.versions.get(record_id)
+
+    def select(self, record_ids):
+        """Return {id: redflag} items for the given ids that exist."""
+        chunks = self._snapshot.chunks
+        items = []
+        for record_id in record_ids:
+            chunk = chunks.get(record_id >> CHUNK_BITS)
+            if chunk is not None and record_id in chunk.records:
+                items.append({record_id: chunk.records[record_id]})
+        return items
+
+    def page(self, after, limit):
+        """Return up to limit {id: redflag} items after an id and more."""
+        snap = self._snapshot
+        items = []
+        position = bisect_left(snap.keys, after >> CHUNK_BITS)
+        for number in snap.keys[position:]:
+            chunk = snap.chunks[number]
+            for record_id in chunk.ids[bisect_right(chunk.ids, after):]:
+                if len(items) == limit:
+                    return items, True
+                items.append({record_id: chunk.records[record_id]})
+        return items, False
+
+    def iter_items(self):
+        """Yield every (id, redflag) in id order from the current snapshot.
+
+        Changes made while iterating are not seen and nothing is copied.
+        """
+        snap = self._snapshot
+        for number in snap.keys:
+            chunk = snap.chunks[number]
+            for record_id in chunk.ids:
+                yield record_id, chunk.records[record_id]
+
+    def load(self, rows, version, last_id):
+        """Replace every redflag at once.
+
+        args:
+            rows(iterable): (id, version, redflag) tuples in id order
+            version(int): number of the latest change
+            last_id(int): largest id handed out so far
+        """
+        chunks = {}
+        count = 0
+        for record_id, record_version, record in rows:
+            number = record_id >> CHUNK_BITS
+            chunk = chunks.get(number)
+            if chunk is None:
+                chunk = chunks[number] = Chunk([], {}, {})
+            chunk.ids.append(record_id)
+            chunk.records[record_id] = record
+            chunk.versions[record_id] = record_version
+            count += 1
+        chunks = {number: chunk._replace(ids=tuple(chunk.ids))
+                  for number, chunk in chunks.items()}
+        self._snapshot = Snapshot(version, count, tuple(sorted(chunks)),
+                                  chunks)
+        with self._id_lock:
+            self._last_id = last_id
+
+    def clear(self):
+        """Remove all redflags and restart ids from one."""
+        self._snapshot = Snapshot(self._snapshot.version + 1, 0, (), {})
+        with self._id_lock:
+            self._last_id = 0
+
+    def __len__(self):
+        return self._snapshot.count
+
+
+class MemoryUserBackend(UserBackend):
+    """Keep users in a dict keyed by normalized email."""
+
+    key = ('memory',)
+
+    def __init__(self):
+        """Initialize an empty backend."""
+        self._users = {}
+        self._last_id = 0
+
+    def next_id(self):
+        """Allocate a new user id, the caller holding the registry lock."""
+        self._last_id += 1
+        return self._last_id
+
+    def put(self, email, user):
+        """Save a user under a normalized email."""
+        self._users[email] = user
+
+    def get(self, email):
+        """Retrieve a user by normalized email or None."""
+        return self._users.get(email)
+
+    def clear(self):
+        """Remove all users and restart ids from one."""
+        self._users.clear()
+        self._last_id = 0
+
+    def __len__(self):
+        return len(self._users)
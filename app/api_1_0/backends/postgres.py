@@ -0,0 +1,422 @@
+"""Backends keeping data in a PostgreSQL database."""
+import csv
+import io
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extras import Json, execute_values
+
+from app.api_1_0.backends.base import BackendUnavailable, \
+    IncidentBackend, UserBackend
+from app.api_1_0.records import IncidentRecord, UserRecord
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS redflags ('
+    'id BIGINT PRIMARY KEY, created_by BIGINT, created_on TEXT, '
+    'version BIGINT NOT NULL, data JSONB NOT NULL)',
+    # owners were 32-bit before, while user ids are 64-bit
+    "DO $$ BEGIN IF (SELECT data_type FROM information_schema.columns "
+    "WHERE table_name = 'redflags' AND column_name = 'created_by') "
+    "= 'integer' THEN "
+    'ALTER TABLE redflags ALTER COLUMN created_by TYPE BIGINT; '
+    'END IF; END $$',
+    'CREATE INDEX IF NOT EXISTS redflags_created_by '
+    'ON redflags (created_by)',
+    'CREATE INDEX IF NOT EXISTS redflags_created_on '
+    'ON redflags (created_on)',
+    'CREATE TABLE IF NOT EXISTS users ('
+    'email TEXT PRIMARY KEY, id BIGINT NOT NULL, data JSONB NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS counters ('
+    'name TEXT PRIMARY KEY, value BIGINT NOT NULL)',
+    # ids come from sequences shared by every process; tables written
+    # before the sequences existed move them past their largest id
+    'CREATE SEQUENCE IF NOT EXISTS redflags_id_seq',
+    "SELECT setval('redflags_id_seq', largest) FROM "
+    '(SELECT MAX(id) AS largest FROM redflags) AS ids '
+    'WHERE largest >= (SELECT last_value FROM redflags_id_seq)',
+    'CREATE SEQUENCE IF NOT EXISTS users_id_seq',
+    "SELECT setval('users_id_seq', largest) FROM "
+    '(SELECT MAX(id) AS largest FROM users) AS ids '
+    'WHERE largest >= (SELECT last_value FROM users_id_seq)',
+    "INSERT INTO counters (name, value) VALUES ('redflags_version', 0) "
+    'ON CONFLICT (name) DO NOTHING',
+    "INSERT INTO counters (name, value) "
+    "SELECT 'redflags_count', COUNT(*) FROM redflags "
+    'ON CONFLICT (name) DO NOTHING',
+    "INSERT INTO counters (name, value) "
+    "SELECT 'users_count', COUNT(*) FROM users "
+    'ON CONFLICT (name) DO NOTHING',
+)
+
+# prepared once on every connection and run with EXECUTE
+PREPARED = (
+    'PREPARE get_redflag (BIGINT) AS '
+    'SELECT data FROM redflags WHERE id = $1',
+    'PREPARE get_version (BIGINT) AS '
+    'SELECT version FROM redflags WHERE id = $1',
+    'PREPARE select_redflags (BIGINT[]) AS '
+    'SELECT id, data FROM redflags WHERE id = ANY($1)',
+    'PREPARE page_redflags (BIGINT, BIGINT) AS '
+    'SELECT id, data FROM redflags WHERE id > $1 ORDER BY id LIMIT $2',
+    'PREPARE delete_redflag (BIGINT) AS '
+    'DELETE FROM redflags WHERE id = $1',
+    # counters are bumped in the transaction of the write they count, so
+    # processes sharing the database never hand out the same version
+    'PREPARE add_counter (TEXT, BIGINT) AS '
+    'UPDATE counters SET value = value + $2 WHERE name = $1 '
+    'RETURNING value',
+    'PREPARE set_counter (TEXT, BIGINT) AS '
+    'UPDATE counters SET value = $2 WHERE name = $1',
+    'PREPARE get_counter (TEXT) AS '
+    'SELECT value FROM counters WHERE name = $1',
+    'PREPARE get_user (TEXT) AS '
+    'SELECT data FROM users WHERE email = $1',
+    'PREPARE put_user (TEXT, BIGINT, JSONB) AS '
+    'INSERT INTO users (email, id, data) VALUES ($1, $2, $3) '
+    'ON CONFLICT (email) DO UPDATE SET id = EXCLUDED.id, '
+    'data = EXCLUDED.data RETURNING (xmax = 0)',
+)
+
+# existing redflags are updated in place and the rest inserted, so an id
+# taken by another process fails the write instead of overwriting it
+UPDATE_REDFLAGS = ('UPDATE redflags SET created_by = v.created_by, '
+                   'created_on = v.created_on, version = v.version, '
+                   'data = v.data FROM (VALUES %s) AS v '
+                   '(id, created_by, created_on, version, data) '
+                   'WHERE redflags.id = v.id RETURNING redflags.id')
+INSERT_REDFLAGS = ('INSERT INTO redflags '
+                   '(id, created_by, created_on, version, data) VALUES %s')
+ROW_TEMPLATE = '(%s::BIGINT, %s::BIGINT, %s, %s::BIGINT, %s::JSONB)'
+
+# batches at least this large are loaded with COPY into a staging table
+COPY_THRESHOLD = 1000
+STAGE_REDFLAGS = ('CREATE TEMPORARY TABLE redflags_stage '
+                  '(LIKE redflags) ON COMMIT DROP')
+COPY_REDFLAGS = ('COPY redflags_stage '
+                 '(id, created_by, created_on, version, data) '
+                 'FROM STDIN WITH (FORMAT csv)')
+MERGE_REDFLAGS = ('UPDATE redflags SET created_by = s.created_by, '
+                  'created_on = s.created_on, version = s.version, '
+                  'data = s.data FROM redflags_stage AS s '
+                  'WHERE redflags.id = s.id')
+INSERT_STAGED = ('INSERT INTO redflags SELECT * FROM redflags_stage AS s '
+                 'WHERE NOT EXISTS '
+                 '(SELECT 1 FROM redflags WHERE redflags.id = s.id)')
+
+# rows fetched per round trip by server-side cursors
+ITER_SIZE = 500
+
+
+class PoolTimeout(BackendUnavailable):
+    """Raised when no connection is free before the pool timeout."""
+
+
+class ConnectionPool():
+    """Lend a bounded number of connections to threads.
+
+    A thread borrowing a connection gets it for one transaction: it is
+    committed when returned, or rolled back if the borrower raised. At
+    most size connections exist at once; borrowers wait up to timeout
+    seconds for one to be returned before PoolTimeout is raised.
+    """
+
+    def __init__(self, dsn, size=10, timeout=5.0, connect_timeout=5,
+                 statement_timeout=5000):
+        """Initialize a pool, opening connections only when needed.
+
+        args:
+            dsn(str): libpq connection string or URL
+            size(int): largest number of open connections
+            timeout(float): seconds to wait for a free connection
+            connect_timeout(int): seconds to wait while connecting
+            statement_timeout(int): milliseconds a statement may run
+        """
+        self.dsn = dsn
+        self.size = size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.statement_timeout = statement_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = deque()
+        self._lock = threading.Lock()
+        connection = self._open()
+        try:
+            with connection.cursor() as cursor:
+                for statement in SCHEMA:
+                    cursor.execute(statement)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _open(self):
+        return psycopg2.connect(
+            self.dsn, connect_timeout=self.connect_timeout,
+            options='-c statement_timeout={}'.format(self.statement_timeout))
+
+    def _connect(self):
+        connection = self._open()
+        with connection.cursor() as cursor:
+            for statement in PREPARED:
+                cursor.execute(statement)
+        connection.commit()
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for one transaction."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout('No database connection free after {} '
+                              'seconds'.format(self.timeout))
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None or connection.closed:
+                connection = self._connect()
+            try:
+                yield connection
+            except BaseException:
+                if not connection.closed:
+                    connection.rollback()
+                raise
+            else:
+                connection.commit()
+            finally:
+                if not connection.closed:
+                    with self._lock:
+                        self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    def fetchone(self, statement, args=()):
+        """Run a statement alone and return its first value or None."""
+        with self.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(statement, args)
+                row = cursor.fetchone()
+        return row[0] if row else None
+
+    def counter(self, name):
+        """Return a stored counter, 0 if it was never set."""
+        return self.fetchone('EXECUTE get_counter (%s)', (name,)) or 0
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+
+class PostgresIncidentBackend(IncidentBackend):
+    """Keep redflags in the redflags table.
+
+    Each redflag is stored as JSONB of its public fields, with its owner
+    and creation date in indexed columns. Ids come from a sequence, and
+    the version and count are counters bumped in the same transaction as
+    the redflags. The version is read from its counter every time, so
+    tags and cached pages built from it never outlive a change.
+
+    Only one process may use the database, though: the indexes, change
+    log and events of IncidentStore live in the memory of each process
+    and never see the redflags written by another one.
+    """
+
+    def __init__(self, pool):
+        """Use the redflags of a database.
+
+        args:
+            pool(ConnectionPool): connections to the database
+        """
+        self.pool = pool
+        self.key = ('postgres', pool.dsn)
+
+    @property
+    def version(self):
+        """Number of the latest change."""
+        return self.pool.counter('redflags_version')
+
+    def next_id(self):
+        """Allocate a new redflag id."""
+        return self.pool.fetchone("SELECT nextval('redflags_id_seq')")
+
+    def put(self, record_id, record):
+        """Save or replace a redflag."""
+        self.put_many([(record_id, record)])
+
+    def _copy(self, cursor, rows):
+        data = io.StringIO()
+        writer = csv.writer(data)
+        for record_id, creator, created, version, record in rows:
+            writer.writerow((record_id, creator, created, version,
+                             json.dumps(record.adapted)))
+        data.seek(0)
+        cursor.execute(STAGE_REDFLAGS)
+        cursor.copy_expert(COPY_REDFLAGS, data)
+        cursor.execute(MERGE_REDFLAGS)
+        cursor.execute(INSERT_STAGED)
+        return cursor.rowcount
+
+    def _insert(self, cursor, rows):
+        updated = execute_values(cursor, UPDATE_REDFLAGS, rows,
+                                 template=ROW_TEMPLATE, page_size=ITER_SIZE,
+                                 fetch=True)
+        found = {row[0] for row in updated}
+        created = [row for row in rows if row[0] not in found]
+        if created:
+            execute_values(cursor, INSERT_REDFLAGS, created,
+                           template=ROW_TEMPLATE, page_size=ITER_SIZE)
+        return len(created)
+
+    def put_many(self, items):
+        """Save (id, redflag) pairs in a single transaction.
+
+        The pairs take consecutive versions ending at self.version. Small
+        batches are sent with multi-row statements, large ones are
+        streamed with COPY.
+        """
+        if not items:
+            return
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('EXECUTE add_counter (%s, %s)',
+                               ('redflags_version', len(items)))
+                version = cursor.fetchone()[0]
+                first = version - len(items) + 1
+                rows = [(record_id, record.created_by,
+                         str(record.created_on), first + number,
+                         Json(record.to_dict()))
+                        for number, (record_id, record) in enumerate(items)]
+                if len(rows) >= COPY_THRESHOLD:
+                    created = self._copy(cursor, rows)
+                else:
+                    created = self._insert(cursor, rows)
+                cursor.execute('EXECUTE add_counter (%s, %s)',
+                               ('redflags_count', created))
+
+    def delete(self, record_id):
+        """Delete a redflag that exists."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('EXECUTE delete_redflag (%s)', (record_id,))
+                cursor.execute('EXECUTE add_counter (%s, %s)',
+                               ('redflags_count', -cursor.rowcount))
+                cursor.execute('EXECUTE add_counter (%s, %s)',
+                               ('redflags_version', 1))
+
+    def get(self, record_id):
+        """Retrieve a redflag or None if it does not exist."""
+        data = self.pool.fetchone('EXECUTE get_redflag (%s)', (record_id,))
+        return IncidentRecord.from_dict(data) if data else None
+
+    def record_version(self, record_id):
+        """Return the version of a redflag or None if it does not exist."""
+        return self.pool.fetchone('EXECUTE get_version (%s)', (record_id,))
+
+    def select(self, record_ids):
+        """Return {id: redflag} items for the given ids that exist."""
+        record_ids = list(record_ids)
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('EXECUTE select_redflags (%s)', (record_ids,))
+                found = dict(cursor.fetchall())
+        return [{record_id: IncidentRecord.from_dict(found[record_id])}
+                for record_id in record_ids if record_id in found]
+
+    def page(self, after, limit):
+        """Return up to limit {id: redflag} items after an id and more."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('EXECUTE page_redflags (%s, %s)',
+                               (after, limit + 1))
+                rows = cursor.fetchall()
+        items = [{record_id: IncidentRecord.from_dict(data)}
+                 for record_id, data in rows[:limit]]
+        return items, len(rows) > limit
+
+    def iter_items(self):
+        """Yield every (id, redflag) in id order.
+
+        Rows are read ITER_SIZE at a time, each page after the last id
+        seen with a connection borrowed only while it is fetched, so a
+        slow reader does not keep a connection from other requests.
+        """
+        after = 0
+        while True:
+            items, more = self.page(after, ITER_SIZE)
+            for item in items:
+                yield next(iter(item.items()))
+            if not more:
+                return
+            after = next(iter(items[-1]))
+
+    def clear(self):
+        """Remove all redflags and restart ids from one."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM redflags')
+                cursor.execute('ALTER SEQUENCE redflags_id_seq RESTART')
+                cursor.execute('EXECUTE set_counter (%s, %s)',
+                               ('redflags_count', 0))
+                cursor.execute('EXECUTE add_counter (%s, %s)',
+                               ('redflags_version', 1))
+
+    def close(self):
+        """Close the idle connections of the pool."""
+        self.pool.close()
+
+    def __len__(self):
+        return self.pool.counter('redflags_count')
+
+
+class PostgresUserBackend(UserBackend):
+    """Keep users in the users table, stored as JSONB by email.
+
+    Ids come from a sequence and the count from a counter, so several
+    processes may share the table.
+    """
+
+    def __init__(self, pool):
+        """Use the users of a database.
+
+        args:
+            pool(ConnectionPool): connections to the database
+        """
+        self.pool = pool
+        self.key = ('postgres', pool.dsn)
+
+    def next_id(self):
+        """Allocate a new user id."""
+        return self.pool.fetchone("SELECT nextval('users_id_seq')")
+
+    def put(self, email, user):
+        """Save a user under a normalized email."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('EXECUTE put_user (%s, %s, %s)',
+                               (email, user.id, Json(user.to_dict())))
+                if cursor.fetchone()[0]:
+                    cursor.execute('EXECUTE add_counter (%s, %s)',
+                                   ('users_count', 1))
+
+    def get(self, email):
+        """Retrieve a user by normalized email or None."""
+        data = self.pool.fetchone('EXECUTE get_user (%s)', (email,))
+        return UserRecord.from_dict(data) if data else None
+
+    def clear(self):
+        """Remove all users and restart ids from one."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM users')
+                cursor.execute('ALTER SEQUENCE users_id_seq RESTART')
+                cursor.execute('EXECUTE set_counter (%s, %s)',
+                               ('users_count', 0))
+
+    def close(self):
+        """Close the idle connections of the pool."""
+        self.pool.close()
+
+    def __len__(self):
+        return self.pool.counter('users_count')
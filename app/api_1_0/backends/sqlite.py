@@ -0,0 +1,358 @@
+"""Backends keeping data in a SQLite database."""
+import json
+import sqlite3
+import threading
+
+from app.api_1_0.backends.base import IncidentBackend, UserBackend
+from app.api_1_0.records import IncidentRecord, UserRecord
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS redflags ('
+    'id INTEGER PRIMARY KEY, created_by INTEGER, created_on TEXT, '
+    'version INTEGER NOT NULL, data TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS redflags_created_by '
+    'ON redflags (created_by)',
+    'CREATE INDEX IF NOT EXISTS redflags_created_on '
+    'ON redflags (created_on)',
+    'CREATE TABLE IF NOT EXISTS users ('
+    'email TEXT PRIMARY KEY, id INTEGER NOT NULL, data TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS counters ('
+    'name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+)
+
+# statements are kept as constants so sqlite3 reuses their prepared form
+PUT_REDFLAG = ('INSERT OR REPLACE INTO redflags '
+               '(id, created_by, created_on, version, data) '
+               'VALUES (?, ?, ?, ?, ?)')
+DELETE_REDFLAG = 'DELETE FROM redflags WHERE id = ?'
+GET_REDFLAG = 'SELECT data FROM redflags WHERE id = ?'
+GET_VERSION = 'SELECT version FROM redflags WHERE id = ?'
+PAGE_REDFLAGS = ('SELECT id, data FROM redflags WHERE id > ? '
+                 'ORDER BY id LIMIT ?')
+SET_COUNTER = 'INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)'
+GET_COUNTER = 'SELECT value FROM counters WHERE name = ?'
+PUT_USER = 'INSERT OR REPLACE INTO users (email, id, data) VALUES (?, ?, ?)'
+GET_USER = 'SELECT data FROM users WHERE email = ?'
+
+# largest number of ids sent in one IN (...) query
+SELECT_BATCH = 500
+
+
+class SQLiteDatabase():
+    """Lend connections to a SQLite file, one per thread at a time.
+
+    A thread keeps its connection until release is called, which the app
+    does when each request ends. Released connections wait in a list of
+    at most pool_size for the next thread, and the rest are closed. The
+    database keeps no other reference to a lent connection, so one left
+    by a thread that ends without releasing it is closed with the thread.
+
+    The database runs in WAL mode, so readers see a consistent state
+    without blocking the writer and the writer does not block readers.
+    """
+
+    def __init__(self, path, pool_size=8):
+        """Open the database and create its tables.
+
+        args:
+            path(str): location of the database file
+            pool_size(int): largest number of idle connections kept
+        """
+        self.path = path
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self._idle = []
+        self._closed = False
+        self._lock = threading.Lock()
+        with self.transaction() as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, isolation_level=None,
+                                     check_same_thread=False,
+                                     cached_statements=64)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    @property
+    def connection(self):
+        """Return the connection of the current thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    def release(self):
+        """Give back the connection of the current thread, if it has one."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            return
+        self._local.connection = None
+        with self._lock:
+            if not self._closed and len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def transaction(self):
+        """Return a context manager running statements in a transaction."""
+        return Transaction(self.connection)
+
+    def counter(self, name):
+        """Return a stored counter, 0 if it was never set."""
+        row = self.connection.execute(GET_COUNTER, (name,)).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        """Close the idle connections and the one of the current thread.
+
+        Connections lent to other threads are closed when they are
+        released or their thread ends.
+        """
+        self.release()
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class Transaction():
+    """Run statements between BEGIN IMMEDIATE and COMMIT or ROLLBACK."""
+
+    def __init__(self, connection):
+        """Wrap a connection in autocommit mode."""
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, kind, value, traceback):
+        if kind is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
+        return False
+
+
+class SQLiteIncidentBackend(IncidentBackend):
+    """Keep redflags in the redflags table.
+
+    Each redflag is stored as the JSON of its public fields, with its
+    owner and creation date in indexed columns. The version, last id and
+    count are mirrored in memory; writes keep them in step inside the
+    same transaction.
+    """
+
+    def __init__(self, database):
+        """Load the counters of a database.
+
+        args:
+            database(SQLiteDatabase): where the redflags are kept
+        """
+        self.database = database
+        self.key = ('sqlite', database.path)
+        connection = database.connection
+        self._version = database.counter('redflags_version')
+        self._count = connection.execute(
+            'SELECT COUNT(*) FROM redflags').fetchone()[0]
+        largest = connection.execute(
+            'SELECT MAX(id) FROM redflags').fetchone()[0] or 0
+        self._last_id = max(database.counter('redflags_last_id'), largest)
+        self._id_lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Number of the latest change."""
+        return self._version
+
+    def next_id(self):
+        """Allocate a new redflag id."""
+        with self._id_lock:
+            self._last_id += 1
+            return self._last_id
+
+    def _row(self, record_id, record, version):
+        return (record_id, record.created_by, str(record.created_on),
+                version, json.dumps(record.to_dict()))
+
+    def put(self, record_id, record):
+        """Save or replace a redflag."""
+        self.put_many([(record_id, record)])
+
+    def put_many(self, items):
+        """Save (id, redflag) pairs in a single transaction."""
+        version = self._version
+        rows = []
+        for record_id, record in items:
+            version += 1
+            rows.append(self._row(record_id, record, version))
+        if not rows:
+            return
+        ids = [row[0] for row in rows]
+        connection = self.database.connection
+        with self.database.transaction():
+            existing = 0
+            for start in range(0, len(ids), SELECT_BATCH):
+                batch = ids[start:start + SELECT_BATCH]
+                existing += connection.execute(
+                    'SELECT COUNT(*) FROM redflags WHERE id IN ({})'.format(
+                        ','.join('?' * len(batch))), batch).fetchone()[0]
+            connection.executemany(PUT_REDFLAG, rows)
+            connection.execute(SET_COUNTER, ('redflags_version', version))
+            connection.execute(SET_COUNTER, ('redflags_last_id',
+                                             max(ids + [self._last_id])))
+        self._count += len(rows) - existing
+        self._version = version
+        with self._id_lock:
+            self._last_id = max(ids + [self._last_id])
+
+    def delete(self, record_id):
+        """Delete a redflag that exists."""
+        connection = self.database.connection
+        with self.database.transaction():
+            connection.execute(DELETE_REDFLAG, (record_id,))
+            connection.execute(SET_COUNTER,
+                               ('redflags_version', self._version + 1))
+        self._version += 1
+        self._count -= 1
+
+    def get(self, record_id):
+        """Retrieve a redflag or None if it does not exist."""
+        row = self.database.connection.execute(
+            GET_REDFLAG, (record_id,)).fetchone()
+        return IncidentRecord.from_dict(json.loads(row[0])) if row else None
+
+    def record_version(self, record_id):
+        """Return the version of a redflag or None if it does not exist."""
+        row = self.database.connection.execute(
+            GET_VERSION, (record_id,)).fetchone()
+        return row[0] if row else None
+
+    def select(self, record_ids):
+        """Return {id: redflag} items for the given ids that exist."""
+        record_ids = list(record_ids)
+        found = {}
+        connection = self.database.connection
+        for start in range(0, len(record_ids), SELECT_BATCH):
+            batch = record_ids[start:start + SELECT_BATCH]
+            rows = connection.execute(
+                'SELECT id, data FROM redflags WHERE id IN ({})'.format(
+                    ','.join('?' * len(batch))), batch)
+            found.update((row[0], row[1]) for row in rows)
+        return [{record_id: IncidentRecord.from_dict(
+                    json.loads(found[record_id]))}
+                for record_id in record_ids if record_id in found]
+
+    def page(self, after, limit):
+        """Return up to limit {id: redflag} items after an id and more."""
+        rows = self.database.connection.execute(
+            PAGE_REDFLAGS, (after, limit + 1)).fetchall()
+        items = [{record_id: IncidentRecord.from_dict(json.loads(data))}
+                 for record_id, data in rows[:limit]]
+        return items, len(rows) > limit
+
+    def iter_items(self, batch=500):
+        """Yield every (id, redflag) in id order, a batch at a time."""
+        after = 0
+        while True:
+            rows = self.database.connection.execute(
+                PAGE_REDFLAGS, (after, batch)).fetchall()
+            for record_id, data in rows:
+                yield record_id, IncidentRecord.from_dict(json.loads(data))
+            if len(rows) < batch:
+                return
+            after = rows[-1][0]
+
+    def clear(self):
+        """Remove all redflags and restart ids from one."""
+        connection = self.database.connection
+        with self.database.transaction():
+            connection.execute('DELETE FROM redflags')
+            connection.execute(SET_COUNTER,
+                               ('redflags_version', self._version + 1))
+            connection.execute(SET_COUNTER, ('redflags_last_id', 0))
+        self._version += 1
+        self._count = 0
+        with self._id_lock:
+            self._last_id = 0
+
+    def release(self):
+        """Give back the connection of the current thread."""
+        self.database.release()
+
+    def close(self):
+        """Close the database connections."""
+        self.database.close()
+
+    def __len__(self):
+        return self._count
+
+
+class SQLiteUserBackend(UserBackend):
+    """Keep users in the users table, stored as JSON by email."""
+
+    def __init__(self, database):
+        """Load the counters of a database.
+
+        args:
+            database(SQLiteDatabase): where the users are kept
+        """
+        self.database = database
+        self.key = ('sqlite', database.path)
+        connection = database.connection
+        self._count = connection.execute(
+            'SELECT COUNT(*) FROM users').fetchone()[0]
+        largest = connection.execute(
+            'SELECT MAX(id) FROM users').fetchone()[0] or 0
+        self._last_id = max(database.counter('users_last_id'), largest)
+
+    def next_id(self):
+        """Allocate a new user id, the caller holding the registry lock."""
+        self._last_id += 1
+        return self._last_id
+
+    def put(self, email, user):
+        """Save a user under a normalized email."""
+        connection = self.database.connection
+        with self.database.transaction():
+            exists = connection.execute(GET_USER, (email,)).fetchone()
+            connection.execute(PUT_USER, (email, user.id,
+                                          json.dumps(user.to_dict())))
+            connection.execute(SET_COUNTER,
+                               ('users_last_id', self._last_id))
+        if exists is None:
+            self._count += 1
+
+    def get(self, email):
+        """Retrieve a user by normalized email or None."""
+        row = self.database.connection.execute(
+            GET_USER, (email,)).fetchone()
+        return UserRecord.from_dict(json.loads(row[0])) if row else None
+
+    def clear(self):
+        """Remove all users and restart ids from one."""
+        connection = self.database.connection
+        with self.database.transaction():
+            connection.execute('DELETE FROM users')
+            connection.execute(SET_COUNTER, ('users_last_id', 0))
+        self._count = 0
+        self._last_id = 0
+
+    def release(self):
+        """Give back the connection of the current thread."""
+        self.database.release()
+
+    def close(self):
+        """Close the database connections."""
+        self.database.close()
+
+    def __len__(self):
+        return self._count
@@ -0,0 +1,115 @@
+"""Cache of encoded responses."""
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache():
+    """Keep encoded JSON bodies of redflags and list pages.
+
+    Entries are evicted least recently used first once maxsize is
+    reached. The cache sits in IncidentStore.indexes, so every change to
+    a redflag drops that redflag's entry and every cached page. Methods
+    hold self.lock since request threads share the cache.
+    """
+
+    def __init__(self, maxsize=1024):
+        """Initialize an empty cache.
+
+        args:
+            maxsize(int): maximum number of entries kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._records = {}
+        self._pages = set()
+        self.lock = threading.RLock()
+
+    def get(self, key):
+        """Return a cached body or None, counting hits and misses."""
+        with self.lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put_record(self, record_id, key, body):
+        """Cache the body of a single redflag."""
+        with self.lock:
+            if self._put(key, body):
+                self._records.setdefault(record_id, set()).add(key)
+
+    def put_page(self, key, body):
+        """Cache the body of a list page."""
+        with self.lock:
+            if self._put(key, body):
+                self._pages.add(key)
+
+    def _put(self, key, body):
+        # returns whether the entry was kept, the newest one never being
+        # evicted when there is room for any
+        if not self.maxsize:
+            return False
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._forget(self._entries.popitem(last=False)[0])
+        return True
+
+    def _forget(self, key):
+        self._pages.discard(key)
+        keys = self._records.get(key[1]) if key[0] == 'redflag' else None
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._records[key[1]]
+
+    def _drop_pages(self):
+        for key in self._pages:
+            self._entries.pop(key, None)
+        self._pages.clear()
+
+    def add(self, record_id, record):
+        """Invalidate pages after a redflag is saved or changed."""
+        with self.lock:
+            self._drop_pages()
+
+    def discard(self, record_id, record):
+        """Invalidate a redflag and all pages before it changes."""
+        with self.lock:
+            for key in self._records.pop(record_id, ()):
+                self._entries.pop(key, None)
+            self._drop_pages()
+
+    def load(self, rows):
+        """Invalidate pages after redflags are loaded in bulk."""
+        with self.lock:
+            self._drop_pages()
+
+    def resize(self, maxsize):
+        """Change the maximum number of entries, evicting if needed."""
+        with self.lock:
+            self.maxsize = maxsize
+            while len(self._entries) > maxsize:
+                self._forget(self._entries.popitem(last=False)[0])
+
+    def stats(self):
+        """Return the size and hit counters of the cache."""
+        with self.lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def clear(self):
+        """Remove all entries."""
+        with self.lock:
+            self._entries.clear()
+            self._records.clear()
+            self._pages.clear()
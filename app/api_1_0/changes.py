@@ -0,0 +1,80 @@
+"""Log of recent redflag changes for clients keeping a copy in sync."""
+import threading
+from collections import deque
+
+
+class ChangeLog():
+    """Remember the ids changed by the latest store versions.
+
+    Every create, update and delete appends its version and the id of the
+    redflag it touched. Only the latest maxsize changes are kept, so the
+    log can answer what changed since a version only back to self.floor;
+    clients behind it have to download everything again. Reading the
+    changes since a version walks the log back from its end, so its cost
+    follows the number of changes rather than the number of redflags.
+    """
+
+    def __init__(self, maxsize=10000):
+        """Initialize an empty log.
+
+        args:
+            maxsize(int): maximum number of changes kept
+        """
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.reset(0)
+
+    def reset(self, version):
+        """Forget every change, answering only from version on."""
+        with self.lock:
+            self._changes = deque()
+            self.floor = version
+
+    def resize(self, maxsize):
+        """Change the maximum number of changes kept."""
+        with self.lock:
+            self.maxsize = maxsize
+            self._trim()
+
+    def _trim(self):
+        while len(self._changes) > self.maxsize:
+            self.floor = self._changes.popleft()[0]
+
+    def append(self, version, record_id):
+        """Record that a change took a version.
+
+        args:
+            version(int): version of the change, above any logged one
+            record_id(int): id of the redflag created, updated or deleted
+        """
+        with self.lock:
+            self._changes.append((version, record_id))
+            self._trim()
+
+    def since(self, version, limit):
+        """Return the redflags changed after a version, oldest first.
+
+        A redflag changed several times is listed once, at its latest
+        change.
+
+        args:
+            version(int): the version the client is at
+            limit(int): maximum number of redflags to return
+        returns:
+            list: (version, id) of the latest change of each redflag or
+                None if changes after version are no longer logged
+            bool: whether more changes follow the returned ones
+        """
+        with self.lock:
+            if version < self.floor:
+                return None, False
+            latest = []
+            seen = set()
+            for change in reversed(self._changes):
+                if change[0] <= version:
+                    break
+                if change[1] not in seen:
+                    seen.add(change[1])
+                    latest.append(change)
+        latest.reverse()
+        return latest[:limit], len(latest) > limit
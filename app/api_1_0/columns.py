@@ -0,0 +1,358 @@
+"""Columnar copy of the redflags for scans and aggregations."""
+import math
+import threading
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.utils import parse_datetime, parse_location
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+DAY = 86400 * 10 ** 6
+# (name, array typecode, numpy dtype) of the numeric columns
+COLUMNS = (('ids', 'q', 'i8'), ('creators', 'q', 'i8'),
+           ('longitudes', 'd', 'f8'), ('latitudes', 'd', 'f8'),
+           ('created', 'q', 'i8'), ('live', 'B', 'u1'))
+# dead rows are only dropped once there are at least this many
+COMPACT_AFTER = 1024
+
+
+def microseconds(created):
+    """Return a creation date as microseconds since 1970, 0 if unknown."""
+    if isinstance(created, str):
+        try:
+            created = parse_datetime(created)
+        except ValueError:
+            return 0
+    if not isinstance(created, datetime) or created.tzinfo is not None:
+        return 0
+    return (created - EPOCH) // MICROSECOND
+
+
+def day(created):
+    """Return the date of microseconds since 1970 as YYYY-MM-DD."""
+    return str((EPOCH + int(created) * MICROSECOND).date())
+
+
+class StringColumn():
+    """Strings kept as codes into a table of the distinct strings."""
+
+    def __init__(self):
+        """Initialize an empty column."""
+        self.codes = array('i')
+        self.strings = []
+        self._codes = {}
+
+    def code(self, text):
+        """Return the code of a string or None if it was never added."""
+        return self._codes.get(text)
+
+    def append(self, text):
+        """Add a string at the end of the column."""
+        code = self._codes.get(text)
+        if code is None:
+            code = self._codes[text] = len(self.strings)
+            self.strings.append(text)
+        self.codes.append(code)
+
+
+class ColumnIndex():
+    """Keep the fields redflags are filtered by in arrays, a row each.
+
+    Numbers go into typed arrays and titles into an interned
+    StringColumn. Filters and counts then read whole columns: with
+    NumPy they are vectorized operations over the arrays without copying
+    them, and without it they are loops over the compact arrays.
+
+    Rows are only appended. A change marks the old row dead and appends
+    a new one; dead rows are dropped once they are half of the rows.
+    Methods hold self.lock, and NumPy views of the arrays never outlive a
+    call, so the arrays can grow between calls.
+    """
+
+    def __init__(self, use_numpy=True):
+        """Initialize empty columns.
+
+        args:
+            use_numpy(bool): use NumPy when it is installed
+        """
+        self.numpy = numpy if use_numpy else None
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        """Remove every row."""
+        with self.lock:
+            self._columns = {name: array(code) for name, code, dtype
+                             in COLUMNS}
+            self.titles = StringColumn()
+            self._rows = {}
+            self._dead = 0
+
+    def add(self, record_id, record):
+        """Append the row of a redflag."""
+        point = parse_location(record.location) or (math.nan, math.nan)
+        values = {'ids': record_id, 'creators': record.created_by,
+                  'longitudes': point[0], 'latitudes': point[1],
+                  'created': microseconds(record.created_on), 'live': 1}
+        # convert every value first, so a value that does not fit its
+        # column raises before any column grows
+        row = [(name, array(code, (values[name],)))
+               for name, code, dtype in COLUMNS]
+        with self.lock:
+            columns = self._columns
+            self._rows[record_id] = len(columns['ids'])
+            for name, value in row:
+                columns[name].extend(value)
+            self.titles.append(record.title)
+
+    def load(self, rows):
+        """Append SnapshotRows in bulk, see IncidentBackend.index_rows."""
+        with self.lock:
+            columns = self._columns
+            for block in rows:
+                first = len(columns['ids'])
+                for name, code, dtype in COLUMNS:
+                    if name != 'live':
+                        columns[name].extend(block.column(name))
+                columns['live'].extend(bytes([1]) * len(block))
+                for title in block.titles():
+                    self.titles.append(title)
+                self._rows.update(zip(block.column('ids'),
+                                      range(first, len(columns['ids']))))
+
+    def discard(self, record_id, record):
+        """Mark the row of a redflag dead."""
+        with self.lock:
+            row = self._rows.pop(record_id, None)
+            if row is None:
+                return
+            self._columns['live'][row] = 0
+            self._dead += 1
+            if self._dead >= COMPACT_AFTER and \
+                    self._dead * 2 >= len(self._columns['live']):
+                self._compact()
+
+    def _compact(self):
+        live = self._columns['live']
+        rows = [row for row in range(len(live)) if live[row]]
+        old = self._columns
+        self._columns = {name: array(code, (old[name][row] for row in rows))
+                         for name, code, dtype in COLUMNS}
+        titles, self.titles = self.titles, StringColumn()
+        for row in rows:
+            self.titles.append(titles.strings[titles.codes[row]])
+        self._rows = {record_id: row for row, record_id
+                      in enumerate(self._columns['ids'])}
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _views(self):
+        # NumPy arrays over the columns. They must be gone before the lock
+        # is released, so they are only used by helpers called holding it.
+        views = {name: self.numpy.frombuffer(self._columns[name], dtype)
+                 for name, code, dtype in COLUMNS}
+        views['live'] = views['live'].astype(bool)
+        views['titles'] = self.numpy.frombuffer(self.titles.codes, 'i4')
+        return views
+
+    def _matches(self, row, creator, title, bbox, since, until):
+        columns = self._columns
+        if not columns['live'][row]:
+            return False
+        if creator is not None and columns['creators'][row] != creator:
+            return False
+        if title is not None and self.titles.codes[row] != title:
+            return False
+        if bbox is not None:
+            lon = columns['longitudes'][row]
+            lat = columns['latitudes'][row]
+            if not (bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3]):
+                return False
+        created = columns['created'][row]
+        if since is not None and created < since:
+            return False
+        return until is None or created < until
+
+    def select(self, creator=None, title=None, bbox=None, since=None,
+               until=None):
+        """Return the ids of redflags matching every given filter.
+
+        args:
+            creator(int): id of the owner
+            title(str): exact title
+            bbox(tuple): min_lon, min_lat, max_lon, max_lat
+            since(datetime): earliest creation date, included
+            until(datetime): latest creation date, excluded
+        returns:
+            list: matching ids in id order
+        """
+        since = None if since is None else microseconds(since)
+        until = None if until is None else microseconds(until)
+        with self.lock:
+            if title is not None:
+                title = self.titles.code(title)
+                if title is None:
+                    return []
+            filters = (creator, title, bbox, since, until)
+            if self.numpy is not None:
+                return self._select_vectorized(*filters)
+            ids = self._columns['ids']
+            return sorted(ids[row] for row in range(len(ids))
+                          if self._matches(row, *filters))
+
+    def _select_vectorized(self, creator, title, bbox, since, until):
+        views = self._views()
+        mask = views['live']
+        if creator is not None:
+            mask = mask & (views['creators'] == creator)
+        if title is not None:
+            mask = mask & (views['titles'] == title)
+        if bbox is not None:
+            lon, lat = views['longitudes'], views['latitudes']
+            mask = mask & (lon >= bbox[0]) & (lon <= bbox[2]) & \
+                (lat >= bbox[1]) & (lat <= bbox[3])
+        if since is not None:
+            mask = mask & (views['created'] >= since)
+        if until is not None:
+            mask = mask & (views['created'] < until)
+        return self.numpy.sort(views['ids'][mask]).tolist()
+
+    def count_by(self, field, cell=1.0):
+        """Count live redflags grouped by a field.
+
+        args:
+            field(str): 'creator', 'day', 'title' or 'region'
+            cell(float): width and height in degrees of a region
+        returns:
+            list: (key, count) pairs ordered by key. Regions are keyed by
+                the (longitude, latitude) of their south west corner.
+        """
+        with self.lock:
+            if self.numpy is None:
+                counts = self._count_rows(field, cell)
+            else:
+                counts = self._count_vectorized(field, cell)
+        return sorted(counts.items())
+
+    def _count_rows(self, field, cell):
+        columns = self._columns
+        rows = [row for row, live in enumerate(columns['live']) if live]
+        if field == 'creator':
+            return Counter(columns['creators'][row] for row in rows)
+        if field == 'day':
+            return Counter(day(columns['created'][row]) for row in rows)
+        if field == 'title':
+            strings, codes = self.titles.strings, self.titles.codes
+            return Counter(strings[codes[row]] for row in rows)
+        counts = Counter()
+        for row in rows:
+            # unknown coordinates, or ones too far out for the cell size,
+            # have no region
+            x = columns['longitudes'][row] / cell
+            y = columns['latitudes'][row] / cell
+            if math.isfinite(x) and math.isfinite(y):
+                counts[(math.floor(x) * cell, math.floor(y) * cell)] += 1
+        return counts
+
+    def _count_vectorized(self, field, cell):
+        np = self.numpy
+        views = self._views()
+        live = views['live']
+        if field == 'creator':
+            keys, counts = np.unique(views['creators'][live],
+                                     return_counts=True)
+            found = dict(zip(keys.tolist(), counts.tolist()))
+        elif field == 'day':
+            keys, counts = np.unique(views['created'][live] // DAY,
+                                     return_counts=True)
+            found = {day(key * DAY): count for key, count
+                     in zip(keys.tolist(), counts.tolist())}
+        elif field == 'title':
+            keys, counts = np.unique(views['titles'][live],
+                                     return_counts=True)
+            strings = self.titles.strings
+            found = {strings[key]: count for key, count
+                     in zip(keys.tolist(), counts.tolist())}
+        else:
+            with np.errstate(over='ignore', invalid='ignore'):
+                x = views['longitudes'][live] / cell
+                y = views['latitudes'][live] / cell
+            finite = np.isfinite(x) & np.isfinite(y)
+            cells = np.stack((np.floor(x[finite]), np.floor(y[finite])),
+                             axis=1)
+            keys, counts = np.unique(cells, axis=0, return_counts=True)
+            found = {(x * cell, y * cell): count for (x, y), count
+                     in zip(keys.tolist(), counts.tolist())}
+        return found
+
+    def histogram(self, bbox, cell):
+        """Count live redflags in the cells of a grid over a bounding box.
+
+        The grid starts at the south west corner of bbox. Redflags on the
+        north or east edge of bbox fall in the last cells.
+
+        args:
+            bbox(tuple): min_lon, min_lat, max_lon, max_lat
+            cell(float): width and height in degrees of a cell
+        returns:
+            list: (column, row, count) of every cell holding redflags,
+                ordered by column then row
+        """
+        with self.lock:
+            if self.numpy is None:
+                return self._histogram_rows(bbox, cell)
+            return self._histogram_vectorized(bbox, cell)
+
+    @staticmethod
+    def grid_size(bbox, cell):
+        """Return the number of columns and rows of a grid over bbox.
+
+        A side holding too many cells to count, as with a tiny cell, has
+        math.inf of them.
+        """
+        sizes = []
+        for span in (bbox[2] - bbox[0], bbox[3] - bbox[1]):
+            cells = span / cell
+            sizes.append(max(1, math.ceil(cells)) if math.isfinite(cells)
+                         else math.inf)
+        return tuple(sizes)
+
+    def _histogram_rows(self, bbox, cell):
+        columns, rows = self.grid_size(bbox, cell)
+        live = self._columns['live']
+        longitudes = self._columns['longitudes']
+        latitudes = self._columns['latitudes']
+        counts = Counter()
+        for row in range(len(live)):
+            lon, lat = longitudes[row], latitudes[row]
+            if live[row] and bbox[0] <= lon <= bbox[2] and \
+                    bbox[1] <= lat <= bbox[3]:
+                counts[(min(int((lon - bbox[0]) / cell), columns - 1),
+                        min(int((lat - bbox[1]) / cell), rows - 1))] += 1
+        return [(x, y, count) for (x, y), count in sorted(counts.items())]
+
+    def _histogram_vectorized(self, bbox, cell):
+        np = self.numpy
+        columns, rows = self.grid_size(bbox, cell)
+        views = self._views()
+        lon, lat = views['longitudes'], views['latitudes']
+        mask = views['live'] & (lon >= bbox[0]) & (lon <= bbox[2]) & \
+            (lat >= bbox[1]) & (lat <= bbox[3])
+        # the same cell arithmetic as _histogram_rows, so edges agree
+        x = np.minimum(((lon[mask] - bbox[0]) / cell).astype('i8'),
+                       columns - 1)
+        y = np.minimum(((lat[mask] - bbox[1]) / cell).astype('i8'),
+                       rows - 1)
+        grid = np.bincount(x * rows + y, minlength=columns * rows)
+        cells = np.flatnonzero(grid)
+        return list(zip((cells // rows).tolist(), (cells % rows).tolist(),
+                        grid[cells].tolist()))
@@ -1,53 +1,89 @@
 """Facilitate communication between views and models"""
+from app.api_1_0.passwords import HasherBusy
 from app.api_1_0.validators import UserValidators
 
 
 class Controller(UserValidators):
-    """Manipulate model functionality."""
+    """Manipulate model functionality.
 
-    def __init__(self):
-        """Initialize validators."""
-        super().__init__()
+    A controller keeps no state of its own, so one instance can serve
+    every request.
+    """
 
-    def login(self, email, password, login_list, users):
+    def login(self, email, password, users, tokens, hasher):
         """Signin user.
 
         args:
             email: user email
             password: user_password
-            login_list: list to save logged in user
+            users(UserRegistry): registered users
+            tokens(TokenSigner): issues the access token
+            hasher(PasswordHasher): checks the password
         """
-        if self.validate_email(email) and self.validate_password(password):
-            user = self.find_user(email, users)
-            if isinstance(user, dict):
-                if self.match_password(password, user['Password']):
-                    login_list.append({'Email': email, 'Id': user['Id']})
-                    return {'status': True, 'message': login_list}
-                return {'status': False,
-                        'message': 'Invalid password/email combination'}
+        result = self.validate_login(email, password)
+        if result.is_valid:
+            return self.sign_in(email, password, users, tokens, hasher)
+        return {'status': False, 'message': result.errors}
+
+    def sign_in(self, email, password, users, tokens, hasher):
+        """Signin user whose email and password are already validated.
+
+        A password hashed with other parameters than the current ones is
+        hashed again once it is known to match.
+
+        args:
+            email: user email
+            password: user_password
+            users(UserRegistry): registered users
+            tokens(TokenSigner): issues the access token
+            hasher(PasswordHasher): checks the password
+        raises:
+            HasherBusy: if too many passwords are being checked
+        """
+        user = self.find_user(email, users)
+        if user is not None:
+            matches, outdated = hasher.verify(password, user.password)
+            if matches:
+                if outdated:
+                    self.rehash(user, password, users, hasher)
+                return {'status': True,
+                        'message': {'Email': user.email, 'Id': user.id,
+                                    'Token': tokens.issue(user.id),
+                                    'Expires In': tokens.max_age}}
             return {'status': False,
-                    'message': 'User not found in our database'}
-        return {'status': False, 'message': self.errors}
+                    'message': 'Invalid password/email combination'}
+        return {'status': False,
+                'message': 'User not found in our database'}
+
+    @staticmethod
+    def rehash(user, password, users, hasher):
+        """Replace the stored hash of a user by one with current parameters.
+
+        Nothing changes if the user changed in the meantime, or if the
+        hasher is busy: the next login tries again.
+        """
+        try:
+            password_hash = hasher.hash(password)
+        except HasherBusy:
+            return
+        users.swap(user.email, user, user.replace(Password=password_hash))
 
     @classmethod
-    def logout(cls, user_id, logged_in):
-        """Log user out."""
-        if logged_in:
-            for user in logged_in:
-                for key, value in user.items():
-                    if str(user['Id']) == str(user_id):
-                        logged_in.remove(user)
-                        return {'status': True,
-                                'message': 'Successfuly logged out'}
-                return {'status': False,
-                        'message': 'That user is not logged in'}
-        return {'status': False, 'message': 'That user is not logged in'}
+    def logout(cls, user_id, token, tokens):
+        """Log user out by revoking the access token they sent.
+
+        args:
+            user_id: id of the user logging out
+            token(str): access token of the user or None
+            tokens(TokenSigner): checks and revokes the token
+        """
+        claims = tokens.verify(token) if token else None
+        if claims is None or str(claims['id']) != str(user_id):
+            return {'status': False, 'message': 'That user is not logged in'}
+        tokens.revoke(claims)
+        return {'status': True, 'message': 'Successfuly logged out'}
 
     @classmethod
     def find_user(cls, email, users):
         """Retrieve user."""
-        for user in users:
-            for key, value in user.items():
-                if key == email:
-                    return value
-                return None
+        return users.get(email)
@@ -0,0 +1,148 @@
+"""Publish redflag changes to live subscribers."""
+import threading
+from collections import deque
+
+from app.api_1_0.serializers import dumps
+
+
+class Event():
+    """A change to the redflags, encoded once for every subscriber."""
+
+    __slots__ = ('kind', 'version', 'record_id', 'record', '_message')
+
+    def __init__(self, kind, version, record_id=None, record=None):
+        """Initialize an event.
+
+        args:
+            kind(str): 'created', 'updated', 'deleted' or 'cleared'
+            version(int): store version of the change
+            record_id(int): id of the changed redflag
+            record(IncidentRecord): the redflag after the change, if any
+        """
+        self.kind = kind
+        self.version = version
+        self.record_id = record_id
+        self.record = record
+        self._message = None
+
+    @property
+    def message(self):
+        """The event in the Server-Sent Events format."""
+        if self._message is None:
+            data = {'Version': self.version}
+            if self.record_id is not None:
+                data['Id'] = self.record_id
+            if self.record is not None:
+                data['Redflag'] = self.record
+            self._message = 'id: {}\nevent: {}\ndata: {}\n\n'.format(
+                self.version, self.kind, dumps(data))
+        return self._message
+
+
+class Subscription():
+    """Events waiting to be sent to one subscriber.
+
+    The queue holds at most maxsize events. When it is full the oldest
+    event is dropped and counted, so publishing never waits for a slow
+    subscriber.
+    """
+
+    def __init__(self, maxsize):
+        """Initialize an empty queue.
+
+        args:
+            maxsize(int): maximum number of events waiting
+        """
+        self._events = deque(maxlen=maxsize)
+        self._dropped = 0
+        self._condition = threading.Condition(threading.Lock())
+
+    def put(self, event):
+        """Queue an event, dropping the oldest one if the queue is full."""
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self._dropped += 1
+            self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout):
+        """Wait for events and take all of them.
+
+        args:
+            timeout(float): seconds to wait for an event
+        returns:
+            list: the queued events, empty if none came in time
+            int: number of events dropped since the last call
+        """
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            dropped, self._dropped = self._dropped, 0
+            return events, dropped
+
+
+class EventHub():
+    """Fan out events to every Subscription.
+
+    Subscribers sit in a tuple that is replaced rather than changed, so
+    publishing reads it without locking. Publishing only queues the event
+    on each Subscription, so its cost does not depend on how fast
+    subscribers read.
+    """
+
+    def __init__(self, queue_size=256):
+        """Initialize a hub without subscribers.
+
+        args:
+            queue_size(int): maximum number of events waiting for each
+                subscriber
+        """
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self._subscribers = ()
+
+    def subscribe(self):
+        """Return a new Subscription receiving every later event."""
+        subscription = Subscription(self.queue_size)
+        with self.lock:
+            self._subscribers += (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop sending events to a Subscription."""
+        with self.lock:
+            self._subscribers = tuple(
+                other for other in self._subscribers
+                if other is not subscription)
+
+    def publish(self, event):
+        """Queue an event for every subscriber."""
+        for subscription in self._subscribers:
+            subscription.put(event)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+def stream_events(subscription, keepalive):
+    """Yield the events of a Subscription in the Server-Sent Events format.
+
+    A comment is sent whenever no event came for keepalive seconds, and a
+    dropped event tells how many events the subscriber missed.
+
+    args:
+        subscription(Subscription): where the events come from
+        keepalive(float): seconds between messages when idle
+    """
+    yield 'retry: 3000\n\n'
+    while True:
+        events, dropped = subscription.get(keepalive)
+        if dropped:
+            yield 'event: dropped\ndata: {}\n\n'.format(
+                dumps({'Dropped': dropped}))
+        if not events and not dropped:
+            yield ': keepalive\n\n'
+        for event in events:
+            yield event.message
@@ -1,12 +1,13 @@
 """Contains the models for the data."""
 import datetime
+from app.api_1_0.records import DRAFT, IncidentRecord, UserRecord
 from app.api_1_0.validators import RedFlagValidators, UserValidators
 
 
 class RedFlagModel(RedFlagValidators):
     """This class models an RedFlag."""
 
-    def __init__(self, created_by, location, title, comment):
+    def __init__(self, created_by, location, title, comment, status=DRAFT):
         """Initialize an redflag object.
 
         args:
@@ -15,47 +16,77 @@ class RedFlagModel(RedFlagValidators):
             status(str): draft, under investigation, resolved or rejected
             comment(str): A description of the redflag
         """
-        super().__init__()
         self.incident_id = ''
         self.created_by = created_by
         self.created_on = datetime.datetime.now()
         self.location = location
         self.title = title
         self.comment = comment
+        self.status = status
+
+    def validate(self):
+        """Validate the redflag, stopping at the first invalid field.
+
+        returns:
+            ValidationResult: the errors found
+        """
+        return self.validate_redflag(self.created_by, self.location,
+                                     self.comment, self.title, self.status)
 
     def save(self, incident_list):
         """Save redflag to db.
 
         args:
-            db(list): The list into which to save the redflag.
+            db(IncidentStore): The store into which to save the redflag.
+        """
+        result = self.validate()
+        if result.is_valid:
+            return self.insert(incident_list)
+        return {'status': False, 'message': {'errors': result.errors}}
+
+    def insert(self, incident_list):
+        """Save an already validated redflag to db.
+
+        args:
+            db(IncidentStore): The store into which to save the redflag.
         """
-        if self.validate_creator(self.created_by) and \
-           self.validate_location(self.location) and \
-           self.validate_comment(self.comment) and \
-           self.validate_title(self.title):
-            self.incident_id = len(incident_list) + 1
-            incident_list.append({self.incident_id: self.describe_redflag()})
-            return {'status': True,
-                    'message': {"Id": self.incident_id,
-                                "message": "Successfuly created redflag"}}
-        return {'status': False, 'message': {'errors': self.errors}}
+        self.incident_id = incident_list.next_id()
+        incident_list.add(self.incident_id, self.describe_redflag())
+        return {'status': True,
+                'message': {"Id": self.incident_id,
+                            "message": "Successfuly created redflag"}}
+
+    @classmethod
+    def insert_many(cls, redflags, incident_list):
+        """Save several already validated redflags at once.
+
+        Ids are taken first, without holding the store lock, and the
+        store writes the whole group together.
+
+        args:
+            redflags(list): RedFlagModel objects
+            incident_list(IncidentStore): The store to save them into.
+        """
+        items = []
+        for redflag in redflags:
+            redflag.incident_id = incident_list.next_id()
+            items.append((redflag.incident_id, redflag.describe_redflag()))
+        incident_list.add_many(items)
 
     @classmethod
     def find_redflag(cls, redflag_id, redflag_list):
         """Retrieve an redflag."""
-        comp = [incident for incident in redflag_list if next(iter(incident)) == redflag_id]
-        if comp:
-            return comp[0]
+        redflag = redflag_list.get(redflag_id)
+        if redflag is not None:
+            return {redflag_id: redflag}
         return None
 
     @classmethod
     def update_resource(cls, redflag_id, redflag_list, **kwargs):
         """Update an redflag location."""
-        redflag = cls.find_redflag(redflag_id, redflag_list)
-        if redflag:
-            update_redflag = cls.get_dict_values(redflag)
-            update_redflag.update(kwargs)
-            return {'status': True, 'message': update_redflag['Id']}
+        update_redflag = redflag_list.update(redflag_id, **kwargs)
+        if update_redflag is not None:
+            return {'status': True, 'message': update_redflag.id}
         else:
             return {'status': False, 'message': 'That redflag cannot be found'}
 
@@ -67,10 +98,7 @@ class RedFlagModel(RedFlagValidators):
     @classmethod
     def delete_redflag(cls, redflag_id, redflag_list):
         """Delete an redflag."""
-        incident = RedFlagModel.find_redflag(redflag_id, redflag_list)
-        print(incident)
-        if incident:
-            redflag_list.remove(incident)
+        if redflag_list.remove(redflag_id) is not None:
             return True
         return False
 
@@ -78,17 +106,16 @@ class RedFlagModel(RedFlagValidators):
         """Return the object description.
 
         returns:
-            dict: redflag properties
+            IncidentRecord: redflag properties
 
         """
-        return {
-            'Id': self.incident_id,
-            'Created By': int(self.created_by),
-            'Date Created': str(self.created_on),
-            'Location': self.location,
-            'Comment': self.comment,
-            'Title': self.title
-        }
+        return IncidentRecord(id=self.incident_id,
+                              created_by=int(self.created_by),
+                              created_on=self.created_on,
+                              location=self.location,
+                              comment=self.comment,
+                              title=self.title,
+                              status=self.status)
 
 
 class User(UserValidators):
@@ -102,47 +129,53 @@ class User(UserValidators):
             password: secret characters
             confirm_passowrd: confirmation password
         """
-        super().__init__()
         self.email = email
         self.password = password
+        self.password_hash = ''
         self.user_id = ''
 
-    def sign_up(self, confirm_passowrd, users):
+    def sign_up(self, confirm_passowrd, users, hasher):
         """Register user.
 
         args:
-            users: list to save the user
+            users(UserRegistry): registry to save the user
+            hasher(PasswordHasher): hashes the password
+        """
+        result = self.validate_signup(self.email, self.password,
+                                      confirm_passowrd)
+        if result.is_valid:
+            return self.register(users, hasher)
+        return {'status': False, 'message': {'errors': result.errors}}
+
+    def register(self, users, hasher):
+        """Save an already validated user unless the email is taken.
+
+        The password is hashed before the registry checks the email and
+        takes it, so slow hashing never holds up other signups.
+
+        args:
+            users(UserRegistry): registry to save the user
+            hasher(PasswordHasher): hashes the password
+        raises:
+            HasherBusy: if too many passwords are being hashed
         """
-        if self.validate_email(self.email) and \
-           self.validate_password(self.password) and \
-           self.validate_password(confirm_passowrd):
-            if self.match_password(confirm_passowrd, self.password):
-                if not self.find_user(self.email, users):
-                    self.user_id = len(users) + 1
-                    users.append({self.email: self.describe_user()})
-                    return {'status': True,
-                            'message': {"Id": self.email,
-                                        "message":
-                                        "You have successfuly signed up"}}
-                return {'status': False,
-                        'message': self.errors.
-                                   append("That email is already taken")}
-            return {'status': False, 'message': {'errors': self.errors}}
-        return {'status': False, 'message': {'errors': self.errors}}
+        if not self.find_user(self.email, users):
+            self.password_hash = hasher.hash(self.password)
+            self.user_id = users.next_id()
+            if users.swap(self.email, None, self.describe_user()):
+                return {'status': True,
+                        'message': {"Id": self.email,
+                                    "message":
+                                    "You have successfuly signed up"}}
+        return {'status': False,
+                'message': {'errors': ["That email is already taken"]}}
 
     def describe_user(self):
         """Return object representation of user."""
-        return {
-            "Email": self.email,
-            "Password": self.password,
-            "Id": self.user_id
-        }
+        return UserRecord(email=self.email, password=self.password_hash,
+                          id=self.user_id)
 
     @classmethod
     def find_user(cls, email, users):
         """Retrieve user."""
-        for user in users:
-            for key, value in user.items():
-                if key == email:
-                    return value
-                return None
+        return users.get(email)
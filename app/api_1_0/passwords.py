@@ -0,0 +1,135 @@
+"""Slow password hashing on a bounded pool of worker threads."""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = 'pbkdf2_sha256'
+SALT_BYTES = 16
+
+
+class HasherBusy(RuntimeError):
+    """Raised when too many passwords are waiting to be hashed."""
+
+
+def b64(data):
+    """Encode bytes as unpadded base64 text."""
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def unb64(text):
+    """Decode unpadded base64 text."""
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def pbkdf2(password, salt, iterations):
+    """Return the PBKDF2-SHA256 digest of a password."""
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+
+def encode_hash(password, iterations, salt=None):
+    """Hash a password and return it with its parameters.
+
+    The result reads pbkdf2_sha256$<iterations>$<salt>$<digest>, so every
+    user keeps the parameters their password was hashed with.
+    """
+    salt = os.urandom(SALT_BYTES) if salt is None else salt
+    return '{}${}${}${}'.format(ALGORITHM, iterations, b64(salt),
+                                b64(pbkdf2(password, salt, iterations)))
+
+
+def parse_hash(stored):
+    """Split a stored hash into iterations, salt and digest.
+
+    returns:
+        tuple: the parameters or None if stored is not a known hash, as
+            for passwords saved before they were hashed
+    """
+    parts = stored.split('$')
+    if len(parts) != 4 or parts[0] != ALGORITHM:
+        return None
+    try:
+        return int(parts[1]), unb64(parts[2]), unb64(parts[3])
+    except ValueError:
+        return None
+
+
+def check_hash(password, stored):
+    """Return whether a password matches a stored hash."""
+    parsed = parse_hash(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode(), stored.encode())
+    iterations, salt, digest = parsed
+    return hmac.compare_digest(pbkdf2(password, salt, iterations), digest)
+
+
+class PasswordHasher():
+    """Hash and check passwords on a fixed number of worker threads.
+
+    hashlib releases the GIL while it runs PBKDF2, so the workers use
+    other cores while request threads keep serving. At most workers plus
+    queue_size passwords are hashed or waiting at once: past that, calls
+    raise HasherBusy at once instead of holding a request thread.
+    """
+
+    def __init__(self, iterations=260000, workers=2, queue_size=32):
+        """Initialize a hasher, starting threads only when first used.
+
+        args:
+            iterations(int): PBKDF2 iterations of new hashes
+            workers(int): number of hashing threads
+            queue_size(int): passwords allowed to wait for a thread
+        """
+        self._pool = None
+        self.configure(iterations, workers, queue_size)
+
+    def configure(self, iterations, workers, queue_size):
+        """Change the cost of new hashes and the size of the pool."""
+        self.iterations = iterations
+        if self._pool is not None and \
+                (self.workers, self.queue_size) == (workers, queue_size):
+            return
+        self.workers = workers
+        self.queue_size = queue_size
+        previous = self._pool
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix='password')
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def _run(self, function, *args):
+        slots, pool = self._slots, self._pool
+        if not slots.acquire(blocking=False):
+            raise HasherBusy('Too many passwords are being checked')
+        try:
+            future = pool.submit(function, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda future: slots.release())
+        return future.result()
+
+    def hash(self, password):
+        """Return the hash of a password with the current parameters.
+
+        raises:
+            HasherBusy: if the pool is full
+        """
+        return self._run(encode_hash, password, self.iterations)
+
+    def verify(self, password, stored):
+        """Check a password against the hash stored for a user.
+
+        raises:
+            HasherBusy: if the pool is full
+        returns:
+            bool: whether the password matches
+            bool: whether the stored hash should be replaced by one with
+                the current parameters
+        """
+        matches = self._run(check_hash, password, stored)
+        parsed = parse_hash(stored)
+        return matches, parsed is None or parsed[0] != self.iterations
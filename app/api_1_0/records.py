@@ -0,0 +1,107 @@
+"""Compact records for stored redflags and users."""
+from collections.abc import Mapping
+from datetime import datetime
+
+from app.utils import parse_datetime
+
+# statuses a redflag moves through, the first given to new redflags
+STATUSES = ('draft', 'under investigation', 'resolved', 'rejected')
+DRAFT = STATUSES[0]
+
+
+def public(value):
+    """Return the form of a field value shown in responses."""
+    if isinstance(value, datetime):
+        return str(value)
+    return value
+
+
+class Record(Mapping):
+    """Fixed set of fields kept in slots.
+
+    A record reads like a dict of its public field names, so it compares
+    equal to one, but it only builds a dict when it is serialized with
+    to_dict. Records are never changed: replace returns a changed copy.
+    """
+
+    __slots__ = ()
+    # (public name, attribute) pairs in the order fields are serialized
+    FIELDS = ()
+    # values of the attributes that may be left out, by attribute
+    DEFAULTS = {}
+
+    def __init__(self, **values):
+        """Initialize a record from attribute values."""
+        for name, attribute in self.FIELDS:
+            if attribute in values:
+                setattr(self, attribute, values[attribute])
+            else:
+                setattr(self, attribute, self.DEFAULTS[attribute])
+
+    def __getitem__(self, name):
+        attribute = self.ATTRIBUTES.get(name)
+        if attribute is None:
+            raise KeyError(name)
+        return public(getattr(self, attribute))
+
+    def __iter__(self):
+        return iter(self.ATTRIBUTES)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.to_dict())
+
+    def to_dict(self):
+        """Return the public fields as a dict."""
+        return {name: public(getattr(self, attribute))
+                for name, attribute in self.FIELDS}
+
+    def replace(self, **fields):
+        """Return a copy with some public fields changed."""
+        values = {attribute: getattr(self, attribute)
+                  for name, attribute in self.FIELDS}
+        for name, value in fields.items():
+            values[self.ATTRIBUTES[name]] = value
+        return type(self)(**values)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a dict of public fields."""
+        return cls(**{attribute: data[name]
+                      for name, attribute in cls.FIELDS if name in data})
+
+
+class IncidentRecord(Record):
+    """A stored redflag."""
+
+    __slots__ = ('id', 'created_by', 'created_on', 'location', 'comment',
+                 'title', 'status')
+    FIELDS = (('Id', 'id'), ('Created By', 'created_by'),
+              ('Date Created', 'created_on'), ('Location', 'location'),
+              ('Comment', 'comment'), ('Title', 'title'),
+              ('Status', 'status'))
+    ATTRIBUTES = dict(FIELDS)
+    # redflags saved before they had a status are drafts
+    DEFAULTS = {'status': DRAFT}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a redflag from its public fields, parsing its date."""
+        created = data['Date Created']
+        if isinstance(created, str):
+            try:
+                data = dict(data, **{'Date Created':
+                                     parse_datetime(created)})
+            except ValueError:
+                pass
+        return super().from_dict(data)
+
+
+class UserRecord(Record):
+    """A registered user."""
+
+    __slots__ = ('email', 'password', 'id')
+    FIELDS = (('Email', 'email'), ('Password', 'password'), ('Id', 'id'))
+    ATTRIBUTES = dict(FIELDS)
@@ -4,11 +4,24 @@ from app.api_1_0 import API as api
 from app.api_1_0 import views
 
 api.add_resource(views.RedFlag, '/redflags')
+api.add_resource(views.RedFlagBatch, '/redflags/batch')
+api.add_resource(views.RedFlagExport, '/redflags/export')
+api.add_resource(views.RedFlagNearby, '/redflags/nearby')
+api.add_resource(views.RedFlagWithin, '/redflags/within')
+api.add_resource(views.RedFlagHeatmap, '/redflags/heatmap')
+api.add_resource(views.RedFlagSearch, '/redflags/search')
+api.add_resource(views.RedFlagCounts, '/redflags/counts')
+api.add_resource(views.RedFlagChanges, '/redflags/changes')
+api.add_resource(views.RedFlagEvents, '/redflags/events')
+api.add_resource(views.RedFlagStats, '/redflags/stats')
+api.add_resource(views.RedFlagCacheStats, '/redflags/cache')
 api.add_resource(views.RedFlagManipulation, '/redflags/<int:redflag_id>')
 api.add_resource(views.EditRedFlagComment,
                  '/redflags/<int:redflag_id>/comments')
 api.add_resource(views.EditRedFlagLocation,
                  '/redflags/<int:redflag_id>/location')
+api.add_resource(views.EditRedFlagStatus,
+                 '/redflags/<int:redflag_id>/status')
 api.add_resource(views.Signup, '/auth/signup')
 api.add_resource(views.Signin, '/auth/login')
 api.add_resource(views.Signout, '/auth/logout/<user_id>')
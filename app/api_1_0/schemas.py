@@ -0,0 +1,124 @@
+"""Declarative request schemas.
+
+A Schema is built once when its resource class is defined and then reads,
+converts and checks every argument of a request in a single pass.
+"""
+from flask import request
+
+
+class Field():
+    """Describe one request argument."""
+
+    def __init__(self, name, type=str, required=False, default=None,
+                 help=None, checks=()):
+        """Initialize a field.
+
+        args:
+            name(str): argument name in the request
+            type(callable): converts the raw value, raising ValueError
+            required(bool): whether the argument must be sent
+            default: value used when an optional argument is missing
+            help(str): error shown when the argument is missing or invalid
+            checks(tuple): functions returning an error message or None
+        """
+        self.name = name
+        self.type = type
+        self.required = required
+        self.default = default
+        self.help = help or '{} is required'.format(name)
+        self.checks = tuple(checks)
+
+
+class SchemaResult():
+    """Values and errors found while parsing a request.
+
+    missing maps arguments that were not sent or could not be converted
+    to their help message. errors maps arguments that failed a check to
+    the check's message.
+    """
+
+    __slots__ = ('values', 'missing', 'errors')
+
+    def __init__(self):
+        """Initialize an empty result."""
+        self.values = {}
+        self.missing = {}
+        self.errors = {}
+
+    @property
+    def is_valid(self):
+        """Whether the request had no missing or invalid arguments."""
+        return not self.missing and not self.errors
+
+    def messages(self):
+        """Return the check errors in field order."""
+        return list(self.errors.values())
+
+
+class Schema():
+    """Parse, convert and check a group of request arguments."""
+
+    def __init__(self, *fields, location='body', rules=()):
+        """Compile a schema.
+
+        args:
+            fields(Field): the arguments to read, in checking order
+            location(str): 'args' for the query string, 'body' for JSON
+                or form data
+            rules(tuple): (name, function) pairs. Each function takes
+                the converted values and returns an error message for the
+                named argument or None. Rules run only if every field is
+                valid.
+        """
+        self.location = location
+        self.rules = tuple(rules)
+        self._plan = tuple((field.name, field.type, field.required,
+                            field.default, field.help, field.checks)
+                           for field in fields)
+
+    def source(self):
+        """Return the mapping holding the current request's arguments."""
+        if self.location == 'args':
+            return request.args
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            return data
+        return request.values
+
+    def parse(self, data=None):
+        """Read the arguments of the current request or of data.
+
+        args:
+            data(dict): arguments to use instead of the request's
+        returns:
+            SchemaResult: the converted values and any errors
+        """
+        if data is None:
+            data = self.source()
+        result = SchemaResult()
+        for name, kind, required, default, help, checks in self._plan:
+            value = data.get(name)
+            if value is None:
+                if required:
+                    result.missing[name] = help
+                else:
+                    result.values[name] = default
+                continue
+            try:
+                value = kind(value)
+            except (TypeError, ValueError):
+                result.missing[name] = help
+                continue
+            for check in checks:
+                error = check(value)
+                if error:
+                    result.errors[name] = error
+                    break
+            result.values[name] = value
+        if result.is_valid:
+            for name, rule in self.rules:
+                error = rule(result.values)
+                if error:
+                    result.errors[name] = error
+                    break
+        return result
@@ -0,0 +1,132 @@
+"""Full text index over redflag titles and comments."""
+import heapq
+import math
+import re
+import threading
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Split text into lowercase words."""
+    return TOKEN.findall(text.lower())
+
+
+class InvertedIndex():
+    """Map each word to the redflags that contain it.
+
+    Each posting list holds the weighted term frequency per redflag, so a
+    query only visits the redflags that contain one of its words. Results
+    are ranked with BM25, with words in the title counting more than
+    words in the comment. Methods hold self.lock so searches can run
+    while redflags are being saved.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, fields=None):
+        """Initialize an empty index.
+
+        args:
+            fields(dict): redflag field name to weight of its words
+        """
+        self.fields = fields or {'Title': 2, 'Comment': 1}
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+        self.lock = threading.RLock()
+        self._loaded = threading.Event()
+        self._loaded.set()
+
+    def _terms(self, record):
+        terms = {}
+        for field, weight in self.fields.items():
+            for term in tokenize(record[field]):
+                terms[term] = terms.get(term, 0) + weight
+        return terms
+
+    def load(self, rows):
+        """Index the redflags of SnapshotRows on a background thread.
+
+        They are decoded there, so opening a store does not wait for
+        them. Every other call waits until the thread is done.
+        """
+        self._loaded.wait()
+        self._loaded.clear()
+        threading.Thread(target=self._load, args=(rows,),
+                         name='text-index', daemon=True).start()
+
+    def _load(self, rows):
+        try:
+            with self.lock:
+                for block in rows:
+                    for record_id, record in block.items():
+                        self._add(record_id, record)
+        finally:
+            self._loaded.set()
+
+    def add(self, record_id, record):
+        """Index the words of a redflag."""
+        self._loaded.wait()
+        self._add(record_id, record)
+
+    def _add(self, record_id, record):
+        with self.lock:
+            terms = self._terms(record)
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[record_id] = frequency
+            length = sum(terms.values())
+            self._lengths[record_id] = length
+            self._total_length += length
+
+    def discard(self, record_id, record):
+        """Stop indexing the words of a redflag."""
+        self._loaded.wait()
+        with self.lock:
+            length = self._lengths.pop(record_id, None)
+            if length is None:
+                return
+            self._total_length -= length
+            for term in self._terms(record):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(record_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def search(self, query, limit):
+        """Return (score, id) of the best matching redflags.
+
+        args:
+            query(str): words to look for
+            limit(int): maximum number of results
+        """
+        self._loaded.wait()
+        with self.lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            average = self._total_length / count
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) /
+                               (len(postings) + 0.5))
+                for record_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b *
+                                      self._lengths[record_id] / average)
+                    scores[record_id] = scores.get(record_id, 0) + \
+                        idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, ((score, record_id)
+                                      for record_id, score in scores.items()))
+
+    def clear(self):
+        """Remove all indexed words."""
+        self._loaded.wait()
+        with self.lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._total_length = 0
@@ -0,0 +1,48 @@
+"""Encode redflags for responses."""
+import json
+
+from app.api_1_0.records import Record
+
+
+def to_json(value):
+    """Return the JSON form of values json does not know, like records."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def dumps(value):
+    """Encode a value as a JSON string."""
+    return json.dumps(value, default=to_json)
+
+
+def encode(payload):
+    """Encode a response payload as JSON bytes.
+
+    args:
+        payload(dict): response body
+    """
+    return dumps(payload).encode() + b'\n'
+
+
+def stream_json(records):
+    """Yield a JSON array of records one record at a time.
+
+    args:
+        records(iterable): redflag records
+    """
+    separator = '['
+    for record in records:
+        yield separator + dumps(record.to_dict())
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def stream_ndjson(records):
+    """Yield records as newline delimited JSON.
+
+    args:
+        records(iterable): redflag records
+    """
+    for record in records:
+        yield dumps(record.to_dict()) + '\n'
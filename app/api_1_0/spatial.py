@@ -0,0 +1,126 @@
+"""Spatial index over redflag locations."""
+import math
+import threading
+
+from app.utils import parse_location
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """Return the great circle distance between two points in km."""
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex():
+    """Bucket redflag coordinates into a grid of square cells.
+
+    Locations are parsed once when a redflag is saved or its location
+    changes. Queries only look at the points in the cells that overlap
+    the requested area instead of every stored redflag. Methods hold
+    self.lock so queries can run while redflags are being saved.
+    """
+
+    def __init__(self, cell_size=0.1):
+        """Initialize an empty grid.
+
+        args:
+            cell_size(float): width and height of a cell in degrees
+        """
+        self.cell_size = cell_size
+        self._cells = {}
+        self._points = {}
+        self.lock = threading.RLock()
+
+    def _cell(self, lon, lat):
+        return (math.floor(lon / self.cell_size),
+                math.floor(lat / self.cell_size))
+
+    def add(self, record_id, record):
+        """Index the location of a redflag."""
+        with self.lock:
+            point = parse_location(record['Location'])
+            if point is None or not all(map(math.isfinite, point)):
+                return
+            self._points[record_id] = point
+            self._cells.setdefault(self._cell(*point), set()).add(record_id)
+
+    def load(self, rows):
+        """Index SnapshotRows in bulk, see IncidentBackend.index_rows."""
+        with self.lock:
+            for block in rows:
+                for point in zip(block.column('ids'),
+                                 block.column('longitudes'),
+                                 block.column('latitudes')):
+                    if math.isfinite(point[1]) and math.isfinite(point[2]):
+                        self._points[point[0]] = point[1:]
+                        self._cells.setdefault(self._cell(*point[1:]),
+                                               set()).add(point[0])
+
+    def discard(self, record_id, record):
+        """Stop indexing a redflag."""
+        with self.lock:
+            point = self._points.pop(record_id, None)
+            if point is None:
+                return
+            cell = self._cell(*point)
+            self._cells[cell].discard(record_id)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def coordinates(self, record_id):
+        """Return the (longitude, latitude) of a redflag or None."""
+        return self._points.get(record_id)
+
+    def within(self, min_lon, min_lat, max_lon, max_lat):
+        """Return ids of redflags inside a bounding box, in id order."""
+        with self.lock:
+            low_x, low_y = self._cell(min_lon, min_lat)
+            high_x, high_y = self._cell(max_lon, max_lat)
+            area = (high_x - low_x + 1) * (high_y - low_y + 1)
+            if area > len(self._cells):
+                cells = [cell for cell in self._cells
+                         if low_x <= cell[0] <= high_x and
+                         low_y <= cell[1] <= high_y]
+            else:
+                cells = [(x, y) for x in range(low_x, high_x + 1)
+                         for y in range(low_y, high_y + 1)]
+            found = []
+            for cell in cells:
+                for record_id in self._cells.get(cell, ()):
+                    lon, lat = self._points[record_id]
+                    if min_lon <= lon <= max_lon and min_lat <= lat <= max_lat:
+                        found.append(record_id)
+            return sorted(found)
+
+    def nearby(self, lon, lat, radius):
+        """Return (distance, id) of redflags within radius km, nearest first.
+
+        args:
+            lon(float): longitude of the centre
+            lat(float): latitude of the centre
+            radius(float): search radius in km
+        """
+        with self.lock:
+            delta_lat = radius / KM_PER_DEGREE
+            cos_lat = math.cos(math.radians(min(abs(lat) + delta_lat, 89.9)))
+            delta_lon = min(radius / (KM_PER_DEGREE * cos_lat), 180.0)
+            candidates = self.within(lon - delta_lon, lat - delta_lat,
+                                     lon + delta_lon, lat + delta_lat)
+            found = []
+            for record_id in candidates:
+                distance = haversine(lon, lat, *self._points[record_id])
+                if distance <= radius:
+                    found.append((distance, record_id))
+            found.sort()
+            return found
+
+    def clear(self):
+        """Remove all indexed locations."""
+        with self.lock:
+            self._cells.clear()
+            self._points.clear()
@@ -0,0 +1,90 @@
+"""Running totals of redflags for dashboards."""
+import threading
+from collections import Counter
+from datetime import datetime
+
+from app.api_1_0.columns import DAY, day
+from app.api_1_0.records import DRAFT, STATUSES
+
+
+def created_day(created):
+    """Return the YYYY-MM-DD day a redflag was created or 'unknown'."""
+    if isinstance(created, datetime):
+        return str(created.date())
+    return 'unknown'
+
+
+class StatsIndex():
+    """Count redflags per owner, per day created and per status.
+
+    The counters sit in IncidentStore.indexes and move by one on every
+    change, so reading them never scans the redflags. The report built
+    from them is kept until the next change, so repeated reads return the
+    same dict without copying the counters again. Methods hold self.lock
+    since request threads share the counters.
+    """
+
+    def __init__(self):
+        """Initialize counters for an empty store."""
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Reset every counter."""
+        with self.lock:
+            self.total = 0
+            self.creators = Counter()
+            self.days = Counter()
+            self.statuses = Counter()
+            self._report = None
+
+    def _count(self, record, step):
+        self.total += step
+        self._report = None
+        for counter, key in ((self.creators, record.created_by),
+                             (self.days, created_day(record.created_on)),
+                             (self.statuses, record.status)):
+            counter[key] += step
+            if not counter[key]:
+                del counter[key]
+
+    def add(self, record_id, record):
+        """Count a redflag that was saved."""
+        with self.lock:
+            self._count(record, 1)
+
+    def load(self, rows):
+        """Count SnapshotRows in bulk, see IncidentBackend.index_rows."""
+        with self.lock:
+            for block in rows:
+                self.total += len(block)
+                self.creators.update(block.column('creators'))
+                days = Counter(created // DAY
+                               for created in block.column('created'))
+                self.days.update({day(number * DAY): count
+                                  for number, count in days.items()})
+                self.statuses[DRAFT] += len(block)
+            self._report = None
+
+    def discard(self, record_id, record):
+        """Stop counting a redflag that is about to change or go."""
+        with self.lock:
+            self._count(record, -1)
+
+    def report(self):
+        """Return the totals.
+
+        returns:
+            dict: the number of redflags under total, and the numbers per
+                owner id, per day and per status, every status included
+        """
+        with self.lock:
+            if self._report is None:
+                statuses = dict.fromkeys(STATUSES, 0)
+                statuses.update(self.statuses)
+                self._report = {
+                    'total': self.total,
+                    'creators': dict(sorted(self.creators.items())),
+                    'days': dict(sorted(self.days.items())),
+                    'statuses': statuses}
+            return self._report
@@ -0,0 +1,356 @@
+"""Storage for the api data."""
+import secrets
+import threading
+
+from app.api_1_0.backends import MemoryIncidentBackend, MemoryUserBackend
+from app.api_1_0.changes import ChangeLog
+from app.api_1_0.events import Event, EventHub
+from app.api_1_0.columns import ColumnIndex
+from app.api_1_0.search import InvertedIndex
+from app.api_1_0.spatial import GridIndex
+from app.api_1_0.stats import StatsIndex
+from app.api_1_0.timeline import TimeIndex
+
+
+class IncidentStore():
+    """Hold redflags indexed by their id.
+
+    The redflags themselves live in a backend, kept in memory unless the
+    app is configured otherwise. Ids come from a counter that only moves
+    forward, so an id is never handed out twice even after deletes, and
+    pages can start at any id without reading the ones before it.
+
+    Reads go straight to the backend without locking. Writers serialize
+    on self.lock and wait for their changes to be durable only after
+    releasing it, so a backend can make several writes durable together.
+    Callers should not hold the lock around writes, which would then
+    wait for durability while holding it; add_many makes several changes
+    at once instead.
+
+    Secondary indexes in self.indexes are told about every change with
+    their add and discard methods so they never need a full rebuild. They
+    guard their own data for readers. Switching backends loads them in
+    bulk from the snapshot columns IncidentBackend.index_rows hands over,
+    without decoding those redflags, and streams the other redflags into
+    their add methods one at a time, so a database is read in one pass
+    without holding every redflag at once.
+
+    Every change takes the next number of self.version. A redflag keeps
+    the number of its last change as its own version, so the version of
+    the store is the newest version of any redflag or delete. The id each
+    version touched goes into self.changes, and an Event describing the
+    change is published to self.events while the lock is held, so events
+    arrive in version order. A memory backend counts versions from zero
+    again after a restart, so tags built from versions also hold
+    self.epoch, a random token drawn whenever the store takes a backend.
+    """
+
+    def __init__(self, backend=None):
+        """Initialize a store.
+
+        args:
+            backend(IncidentBackend): where to keep the redflags
+        """
+        self.backend = MemoryIncidentBackend() if backend is None else backend
+        self.epoch = secrets.token_hex(8)
+        self.lock = threading.RLock()
+        self.spatial = GridIndex()
+        self.text = InvertedIndex()
+        self.columns = ColumnIndex()
+        self.stats = StatsIndex()
+        self.timeline = TimeIndex()
+        self.indexes = [self.spatial, self.text, self.columns, self.stats,
+                        self.timeline]
+        self.changes = ChangeLog()
+        self.changes.reset(self.backend.version)
+        self.events = EventHub()
+
+    def use(self, backend):
+        """Switch to another backend and index the redflags it holds."""
+        with self.lock:
+            previous, self.backend = self.backend, backend
+            self.epoch = secrets.token_hex(8)
+            rows, items = backend.index_rows()
+            for index in self.indexes:
+                index.clear()
+                index.load(rows)
+            for record_id, record in items:
+                for index in self.indexes:
+                    index.add(record_id, record)
+            self.changes.reset(backend.version)
+            previous.close()
+
+    def use_columns(self, enabled):
+        """Keep a ColumnIndex in self.columns or drop it, leaving None."""
+        with self.lock:
+            if enabled == (self.columns is not None):
+                return
+            if enabled:
+                self.columns = ColumnIndex()
+                rows, items = self.backend.index_rows()
+                self.columns.load(rows)
+                for record_id, record in items:
+                    self.columns.add(record_id, record)
+                self.indexes.append(self.columns)
+            else:
+                self.indexes.remove(self.columns)
+                self.columns = None
+
+    @property
+    def version(self):
+        """Number of the latest change."""
+        return self.backend.version
+
+    def next_id(self):
+        """Allocate a new redflag id.
+
+        returns:
+            int: an id that has never been used by this store
+        """
+        return self.backend.next_id()
+
+    def _index(self, changes):
+        # Apply (id, previous, record) changes to every index, where
+        # previous or record is None for a create or a delete. Returns the
+        # steps taken so _unindex can undo them; if an index raises, the
+        # steps already taken are undone first.
+        steps = []
+        try:
+            for record_id, previous, record in changes:
+                for index in self.indexes:
+                    if previous is not None:
+                        index.discard(record_id, previous)
+                        steps.append((index.add, record_id, previous))
+                    if record is not None:
+                        index.add(record_id, record)
+                        steps.append((index.discard, record_id, record))
+        except BaseException:
+            self._unindex(steps)
+            raise
+        return steps
+
+    @staticmethod
+    def _unindex(steps):
+        for undo, record_id, record in reversed(steps):
+            undo(record_id, record)
+
+    def _write(self, changes, write, *args):
+        # index changes, then write them to the backend, leaving the
+        # indexes as they were if either fails
+        steps = self._index(changes)
+        try:
+            write(*args)
+        except BaseException:
+            self._unindex(steps)
+            raise
+
+    def _changed(self, kind, version, record_id, record=None):
+        self.changes.append(version, record_id)
+        self.events.publish(Event(kind, version, record_id, record))
+
+    def add(self, record_id, record):
+        """Save a redflag.
+
+        args:
+            record_id(int): id allocated with next_id
+            record(dict): redflag properties, not to be changed afterwards
+        """
+        with self.lock:
+            previous = self.backend.get(record_id)
+            self._write([(record_id, previous, record)], self.backend.put,
+                        record_id, record)
+            self._changed('created' if previous is None else 'updated',
+                          self.backend.version, record_id, record)
+        self.backend.sync()
+
+    def add_many(self, items):
+        """Save several redflags in one backend write.
+
+        args:
+            items(list): (id, redflag) pairs
+        """
+        with self.lock:
+            changes = [(record_id, self.backend.get(record_id), record)
+                       for record_id, record in items]
+            kinds = ['created' if previous is None else 'updated'
+                     for record_id, previous, record in changes]
+            self._write(changes, self.backend.put_many, items)
+            # the items took the versions up to the backend's new one
+            version = self.backend.version - len(items)
+            for kind, (record_id, record) in zip(kinds, items):
+                version += 1
+                self._changed(kind, version, record_id, record)
+        self.backend.sync()
+
+    def get(self, record_id):
+        """Retrieve a redflag or None if it does not exist."""
+        return self.backend.get(record_id)
+
+    def update(self, record_id, **fields):
+        """Change some fields of a redflag.
+
+        The stored redflag is replaced by an updated copy so readers
+        holding the old one are not affected.
+
+        args:
+            fields: new values by public field name
+        returns:
+            IncidentRecord: the updated redflag or None if it does not
+                exist
+        """
+        with self.lock:
+            record = self.backend.get(record_id)
+            if record is None:
+                return None
+            updated = record.replace(**fields)
+            self._write([(record_id, record, updated)], self.backend.put,
+                        record_id, updated)
+            self._changed('updated', self.backend.version, record_id,
+                          updated)
+        self.backend.sync()
+        return updated
+
+    def remove(self, record_id):
+        """Delete a redflag.
+
+        returns:
+            dict: the removed redflag or None if it does not exist
+        """
+        with self.lock:
+            record = self.backend.get(record_id)
+            if record is None:
+                return None
+            self._write([(record_id, record, None)], self.backend.delete,
+                        record_id)
+            self._changed('deleted', self.backend.version, record_id)
+        self.backend.sync()
+        return record
+
+    def record_version(self, record_id):
+        """Return the version of a redflag or None if it does not exist."""
+        return self.backend.record_version(record_id)
+
+    def select(self, record_ids):
+        """Return {id: redflag} items for the given ids that exist."""
+        return self.backend.select(record_ids)
+
+    def page(self, after, limit):
+        """Return redflags following an id in id order.
+
+        args:
+            after(int): id of the last redflag already seen, 0 to start
+            limit(int): maximum number of redflags to return
+        returns:
+            list: {id: redflag} items
+            bool: whether more redflags follow the returned ones
+        """
+        return self.backend.page(after, limit)
+
+    def iter_records(self):
+        """Yield every redflag in id order."""
+        for record_id, record in self.backend.iter_items():
+            yield record
+
+    def clear(self):
+        """Remove all redflags and restart ids from one.
+
+        The version keeps counting so old tags never match again.
+        """
+        with self.lock:
+            self.backend.clear()
+            for index in self.indexes:
+                index.clear()
+            self.changes.reset(self.backend.version)
+            self.events.publish(Event('cleared', self.backend.version))
+        self.backend.sync()
+
+    def __len__(self):
+        return len(self.backend)
+
+    def __contains__(self, record_id):
+        return self.get(record_id) is not None
+
+
+def normalize_email(email):
+    """Return the form of an email address used as a registry key."""
+    return email.strip().lower()
+
+
+class UserRegistry():
+    """Hold users indexed by their normalized email.
+
+    Emails are compared case insensitively, so signup duplicate checks
+    and login lookups are a single backend lookup. Ids come from a
+    counter that only moves forward like IncidentStore ids.
+
+    Lookups do not lock. Writers hold self.lock and wait for their
+    changes to be durable only after releasing it, like IncidentStore
+    writers. swap checks the stored user and replaces it in one step, so
+    callers never need to hold the lock.
+    """
+
+    def __init__(self, backend=None):
+        """Initialize a registry.
+
+        args:
+            backend(UserBackend): where to keep the users
+        """
+        self.backend = MemoryUserBackend() if backend is None else backend
+        self.lock = threading.RLock()
+
+    def use(self, backend):
+        """Switch to another backend."""
+        with self.lock:
+            previous, self.backend = self.backend, backend
+            previous.close()
+
+    def next_id(self):
+        """Allocate a new user id."""
+        with self.lock:
+            return self.backend.next_id()
+
+    def add(self, email, user):
+        """Save a user.
+
+        args:
+            email(str): user email, normalized before use as the key
+            user(dict): user properties
+        """
+        with self.lock:
+            self.backend.put(normalize_email(email), user)
+        self.backend.sync()
+
+    def swap(self, email, expected, user):
+        """Save a user if the one stored under an email is still expected.
+
+        args:
+            email(str): user email, normalized before use as the key
+            expected(UserRecord): the stored user, None if the email must
+                be free
+            user(UserRecord): user properties
+        returns:
+            bool: whether the user was saved
+        """
+        key = normalize_email(email)
+        with self.lock:
+            if self.backend.get(key) != expected:
+                return False
+            self.backend.put(key, user)
+        self.backend.sync()
+        return True
+
+    def get(self, email):
+        """Retrieve a user by email or None if not registered."""
+        return self.backend.get(normalize_email(email))
+
+    def clear(self):
+        """Remove all users and restart ids from one."""
+        with self.lock:
+            self.backend.clear()
+        self.backend.sync()
+
+    def __len__(self):
+        return len(self.backend)
+
+    def __contains__(self, email):
+        return self.get(email) is not None
@@ -0,0 +1,125 @@
+"""Index of redflags ordered by creation date."""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from app.api_1_0.columns import EPOCH, MICROSECOND
+
+
+def timestamp(created):
+    """Return a creation date as microseconds since 1970 or None.
+
+    Only plain datetimes have a timestamp; other dates are not indexed.
+    """
+    if not isinstance(created, datetime) or created.tzinfo is not None:
+        return None
+    return (created - EPOCH) // MICROSECOND
+
+
+class TimeIndex():
+    """Keep redflag ids sorted by creation date, then by id.
+
+    Dates and ids sit in two parallel arrays sorted by (date, id) keys, so
+    a date range or the position after a key is found with bisect.
+    Redflags are mostly created in date order, which makes adding one an
+    append at the end. Methods hold self.lock so queries can run while
+    redflags are being saved.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        """Remove every redflag."""
+        with self.lock:
+            self._times = array('q')
+            self._ids = array('q')
+
+    def _position(self, created, record_id):
+        # position of the key (created, record_id), or where it would go
+        low = bisect_left(self._times, created)
+        high = bisect_right(self._times, created, low)
+        return bisect_left(self._ids, record_id, low, high)
+
+    def add(self, record_id, record):
+        """Index the creation date of a redflag."""
+        created = timestamp(record.created_on)
+        if created is None:
+            return
+        with self.lock:
+            position = self._position(created, record_id)
+            self._times.insert(position, created)
+            self._ids.insert(position, record_id)
+
+    def load(self, rows):
+        """Index SnapshotRows in bulk, see IncidentBackend.index_rows.
+
+        The keys are sorted once, which takes linear time when redflags
+        were created in id order.
+        """
+        keys = []
+        for block in rows:
+            keys.extend(zip(block.column('created'), block.column('ids')))
+        with self.lock:
+            keys.extend(zip(self._times, self._ids))
+            keys.sort()
+            self._times = array('q', (key[0] for key in keys))
+            self._ids = array('q', (key[1] for key in keys))
+
+    def discard(self, record_id, record):
+        """Stop indexing a redflag."""
+        created = timestamp(record.created_on)
+        if created is None:
+            return
+        with self.lock:
+            position = self._position(created, record_id)
+            if position < len(self._ids) and \
+                    self._times[position] == created and \
+                    self._ids[position] == record_id:
+                del self._times[position]
+                del self._ids[position]
+
+    def page(self, since=None, until=None, after=None, limit=20,
+             descending=False):
+        """Return the keys of redflags created in a date range.
+
+        args:
+            since(datetime): earliest creation date, included
+            until(datetime): latest creation date, excluded
+            after(tuple): (timestamp, id) key of the last redflag already
+                seen, None to start
+            limit(int): maximum number of keys to return
+            descending(bool): newest first instead of oldest first
+        returns:
+            list: (timestamp, id) keys in the requested order
+            bool: whether more redflags follow the returned ones
+        """
+        with self.lock:
+            times, ids = self._times, self._ids
+            start = 0 if since is None else bisect_left(times,
+                                                        timestamp(since))
+            end = len(times) if until is None else \
+                bisect_left(times, timestamp(until))
+            if descending:
+                if after is not None:
+                    end = min(end, self._position(*after))
+                first = max(start, end - limit)
+                positions = range(end - 1, first - 1, -1)
+                more = first > start
+            else:
+                if after is not None:
+                    position = self._position(*after)
+                    if position < len(ids) and \
+                            (times[position], ids[position]) == after:
+                        position += 1
+                    start = max(start, position)
+                last = min(end, start + limit)
+                positions = range(start, last)
+                more = last < end
+            return [(times[i], ids[i]) for i in positions], more
+
+    def __len__(self):
+        return len(self._ids)
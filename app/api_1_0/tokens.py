@@ -0,0 +1,122 @@
+"""Signed expiring access tokens."""
+import heapq
+import secrets
+import threading
+import time
+from datetime import timezone
+
+from itsdangerous import BadSignature, SignatureExpired, \
+    URLSafeTimedSerializer
+
+
+class RevocationSet():
+    """Ids of revoked tokens, each kept only until its token expires.
+
+    Expiry times also sit in a heap, so every call drops the entries that
+    have expired in order without scanning the rest. Methods hold
+    self.lock since request threads share the set.
+    """
+
+    def __init__(self, clock=time.time):
+        """Initialize an empty set.
+
+        args:
+            clock(callable): returns the current time in seconds
+        """
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget every revoked token."""
+        with self.lock:
+            self._expires = {}
+            self._heap = []
+
+    def _expire(self):
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            expires, token_id = heapq.heappop(self._heap)
+            if self._expires.get(token_id) == expires:
+                del self._expires[token_id]
+
+    def add(self, token_id, expires):
+        """Revoke a token until it expires.
+
+        args:
+            token_id(str): id of the token
+            expires(float): time at which the token expires anyway
+        """
+        with self.lock:
+            self._expire()
+            if expires > self._expires.get(token_id, 0):
+                self._expires[token_id] = expires
+                heapq.heappush(self._heap, (expires, token_id))
+
+    def __contains__(self, token_id):
+        with self.lock:
+            self._expire()
+            return token_id in self._expires
+
+    def __len__(self):
+        with self.lock:
+            self._expire()
+            return len(self._expires)
+
+
+class TokenSigner():
+    """Issue and check access tokens for users.
+
+    A token holds the user id and a random token id, signed with the
+    secret key and stamped with the time it was issued. Any process
+    sharing the secret key can check it without looking anything up.
+    Tokens of logged out users are kept in a RevocationSet until they
+    expire.
+    """
+
+    salt = 'access-token'
+
+    def __init__(self, secret_key='', max_age=3600):
+        """Initialize a signer.
+
+        args:
+            secret_key(str): key tokens are signed with
+            max_age(int): seconds a token stays valid
+        """
+        self.revoked = RevocationSet()
+        self.configure(secret_key, max_age)
+
+    def configure(self, secret_key, max_age):
+        """Change the key tokens are signed with and how long they last."""
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=self.salt)
+
+    def issue(self, user_id):
+        """Return a new token for a user."""
+        return self._serializer.dumps({'id': user_id,
+                                       'jti': secrets.token_urlsafe(12)})
+
+    def verify(self, token):
+        """Check a token.
+
+        returns:
+            dict: the user id under id, the token id under jti and the time
+                the token expires under expires, or None if the token is
+                forged, expired or revoked
+        """
+        try:
+            claims, issued = self._serializer.loads(
+                token, max_age=self.max_age, return_timestamp=True)
+        except (SignatureExpired, BadSignature):
+            return None
+        if not isinstance(claims, dict) or 'id' not in claims or \
+                claims.get('jti') in self.revoked:
+            return None
+        # the issue time is in UTC, naive in older itsdangerous releases
+        claims['expires'] = issued.replace(tzinfo=timezone.utc).timestamp() \
+            + self.max_age
+        return claims
+
+    def revoke(self, claims):
+        """Stop accepting a token checked with verify."""
+        self.revoked.add(claims['jti'], claims['expires'])
@@ -1,100 +1,192 @@
 """This module validates the data models."""
+import math
+
+from app.api_1_0.records import DRAFT, STATUSES
 from app.utils import is_email, is_empty, is_valid_password
-from app.utils import has_special_characters
+from app.utils import has_special_characters, parse_location
+
+# ids are stored as signed 64-bit integers
+MAX_ID = 2 ** 63 - 1
+
+
+def check_creator(creator):
+    """Return the error in a redflag owner or None."""
+    if not creator:
+        return "redflag owner should not be blank"
+    if not isinstance(creator, int):
+        return "Created By should be an Integer"
+    if not 1 <= creator <= MAX_ID:
+        return "Created By should be between 1 and {}".format(MAX_ID)
+    return None
+
+
+def check_title(title):
+    """Return the error in a title or None."""
+    if is_empty(title):
+        return "Title cannot be empty"
+    if has_special_characters(title):
+        return "Title cannot contain special characters"
+    return None
+
+
+def check_location(location):
+    """Return the error in a location or None."""
+    if is_empty(location):
+        return "Location should not be empty"
+    if len(location.split(',')) != 2:
+        return "Two coordinates required"
+    point = parse_location(location)
+    if point is None:
+        return "Coordinates should be floating point values"
+    if check_longitude(point[0]) or check_latitude(point[1]):
+        return "Location should be a longitude between -180 and 180 " \
+            "and a latitude between -90 and 90"
+    return None
+
+
+def check_latitude(lat):
+    """Return the error in a latitude or None."""
+    if not (math.isfinite(lat) and -90 <= lat <= 90):
+        return "lat should be between -90 and 90"
+    return None
+
+
+def check_longitude(lon):
+    """Return the error in a longitude or None."""
+    if not (math.isfinite(lon) and -180 <= lon <= 180):
+        return "lon should be between -180 and 180"
+    return None
+
+
+def check_bbox(bbox):
+    """Return the error in a min_lon,min_lat,max_lon,max_lat box or None."""
+    for lon in bbox[0::2]:
+        if check_longitude(lon):
+            return "bbox longitudes should be between -180 and 180"
+    for lat in bbox[1::2]:
+        if check_latitude(lat):
+            return "bbox latitudes should be between -90 and 90"
+    return None
+
+
+def check_cell(cell):
+    """Return the error in the size in degrees of a grid cell or None."""
+    if not (math.isfinite(cell) and cell > 0):
+        return "cell should be a finite number greater than zero"
+    # coordinates divided by a tiny cell overflow to infinity
+    if not math.isfinite(180 / cell):
+        return "cell is too small"
+    return None
+
+
+def check_comment(comment):
+    """Return the error in a comment or None."""
+    if is_empty(comment):
+        return "Comments cannot be empty"
+    if has_special_characters(comment):
+        return "Comments cannot contain {}".format("special characters")
+    return None
+
+
+def check_status(status):
+    """Return the error in a redflag status or None."""
+    if status not in STATUSES:
+        return "Status should be one of {}".format(', '.join(STATUSES))
+    return None
 
 
-class RedFlagValidators():
+def check_email(email):
+    """Return the error in an email or None."""
+    if is_empty(email):
+        return "Email should not be blank"
+    if not is_email(email):
+        return 'Invalid Email Address'
+    return None
+
+
+def check_password(password):
+    """Return the error in a password or None."""
+    if is_empty(password):
+        return "Password should not be blank"
+    if not is_valid_password(password):
+        return "Password should be atleast eight characters"
+    return None
+
+
+def check_passwords_match(password, confirm_password):
+    """Return the error in a password confirmation or None."""
+    if password != confirm_password:
+        return "Passwords should match"
+    return None
+
+
+class ValidationResult():
+    """Errors found by one validation call."""
+
+    __slots__ = ('errors',)
+
+    def __init__(self, errors=None):
+        """Initialize a result with the errors found."""
+        self.errors = errors or []
+
+    @property
+    def is_valid(self):
+        """Whether no errors were found."""
+        return not self.errors
+
+    def __bool__(self):
+        return self.is_valid
+
+
+class Validator():
+    """Run checks without keeping any state between calls.
+
+    Every call returns its own ValidationResult, so a validator can be
+    shared by all requests and failed validations leave nothing behind.
+    """
+
+    @staticmethod
+    def run(*checks):
+        """Run checks in order, stopping at the first that fails.
+
+        args:
+            checks(tuple): (check function, *arguments) tuples
+        returns:
+            ValidationResult: the error of the failing check, if any
+        """
+        for check, *args in checks:
+            error = check(*args)
+            if error:
+                return ValidationResult([error])
+        return ValidationResult()
+
+
+class RedFlagValidators(Validator):
     """Validates a RedFlag object data."""
 
-    def __init__(self):
-        """Initialize validator with empty errors list."""
-        self.errors = []
-
-    def validate_creator(self, creator):
-        """Verify and set created_by."""
-        if creator:
-            created_by = creator
-            if isinstance(created_by, int):
-                return True
-            self.errors.append("Created by should be an Integer")
-            return False
-        self.errors.append("redflag owner should not be blank")
-        return False
-
-    def validate_title(self, title):
-        """Validate Title."""
-        if not is_empty(title):
-            if not has_special_characters(title):
-                return True
-            self.errors.append(("Title cannot contain special characters"))
-        self.errors.append("Title cannot be empty")
-        return False
-
-    def validate_location(self, location):
-        """Validate location."""
-        if not is_empty(location):
-            coordinates = [x.strip() for x in location.split(',')]
-            if len(coordinates) == 2:
-                longitude = ''
-                lat = ''
-                try:
-                    longitude = float(coordinates[0])
-                    lat = float(coordinates[1])
-                except:
-                    longitude = None
-                    lat = None
-                if longitude is not None and lat is not None:
-                    return True
-                self.errors.append(
-                    "Coordinates should be floating point values")
-                return False
-            self.errors.append("Two coordinates required")
-            return False
-        self.errors.append("Location should not be empty")
-        return False
-
-    def validate_comment(self, comment):
-        """Validate comment."""
-        if not is_empty(comment):
-            if not has_special_characters(comment):
-                return True
-            self.errors.append("Comments cannot contain {}".
-                               format("special characters"))
-            return False
-        self.errors.append("Comments cannot be empty")
-        return False
-
-
-class UserValidators():
+    @classmethod
+    def validate_redflag(cls, creator, location, comment, title,
+                         status=DRAFT):
+        """Validate the fields of a redflag."""
+        return cls.run((check_creator, creator),
+                       (check_location, location),
+                       (check_comment, comment),
+                       (check_title, title),
+                       (check_status, status))
+
+
+class UserValidators(Validator):
     """Validate user fields."""
 
-    def __init__(self):
-        """Initialize validator with empty errors list."""
-        self.errors = []
-
-    def validate_email(self, email):
-        """Validate email."""
-        if not is_empty(email):
-            if is_email(email):
-                return True
-            self.errors.append('Invalid Email Address')
-            return False
-        self.errors.append("Email should not be blank")
-        return False
-
-    def validate_password(self, password):
-        """Validate password."""
-        if not is_empty(password):
-            if is_valid_password(password):
-                return True
-            self.errors.append("Password should be atleast eight characters")
-            return False
-        self.errors.append("Password should not be blank")
-        return False
-
-    def match_password(self, password, confirm_passowrd):
-        """Match passwords."""
-        if password == confirm_passowrd:
-            return True
-        self.errors.append("Passwords should match")
-        return False
+    @classmethod
+    def validate_login(cls, email, password):
+        """Validate the credentials sent to login."""
+        return cls.run((check_email, email), (check_password, password))
+
+    @classmethod
+    def validate_signup(cls, email, password, confirm_password):
+        """Validate the fields sent to signup."""
+        return cls.run((check_email, email),
+                       (check_password, password),
+                       (check_password, confirm_password),
+                       (check_passwords_match, confirm_password, password))
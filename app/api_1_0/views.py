@@ -1,74 +1,543 @@
 """Api endpoint implementation."""
-from flask_restful import Resource, reqparse
+import math
 
-from app.api_1_0.models import RedFlagModel, RedFlagValidators, User
+from flask import Response, current_app, request, url_for
+
+from flask_restful import Resource
+
+from werkzeug.http import quote_etag
+
+from app.api_1_0.models import RedFlagModel, User
 
 from app.api_1_0.controller import Controller
 
-from app.errors import bad_request, not_found, no_content
+from app.api_1_0.events import stream_events
+
+from app.api_1_0.passwords import HasherBusy, PasswordHasher
+
+from app.api_1_0.cache import ResponseCache
+
+from app.api_1_0.schemas import Field, Schema
+
+from app.api_1_0.serializers import encode, stream_json, stream_ndjson
 
+from app.api_1_0.store import IncidentStore, UserRegistry
 
-DB = []
-USERS = []
-LOGGED_IN = []
+from app.api_1_0.tokens import TokenSigner
+
+from app.api_1_0.validators import check_bbox, check_cell, \
+    check_comment, check_creator, check_email, check_latitude, \
+    check_location, check_longitude, check_password, check_passwords_match, \
+    check_status, check_title
+
+from app.errors import bad_request, gone, not_found, no_content, \
+    service_unavailable
+
+from app.utils import encode_cursor, decode_cursor, is_empty, \
+    parse_datetime
+
+LIMIT = Field('limit', type=int, help='limit should be an integer')
+REDFLAG_SCHEMA = Schema(
+    Field('Created By', type=int, required=True, checks=(check_creator,)),
+    Field('Location', required=True, checks=(check_location,)),
+    Field('Comment', required=True, checks=(check_comment,)),
+    Field('Title', required=True, checks=(check_title,)))
+
+
+DB = IncidentStore()
+USERS = UserRegistry()
+TOKENS = TokenSigner()
+HASHER = PasswordHasher()
 CONTROLLER = Controller()
+CACHE = ResponseCache()
+DB.indexes.append(CACHE)
+
+
+def page_limit(limit):
+    """Apply the default page size to a requested limit.
+
+    args:
+        limit(int): limit sent by the client or None
+    returns:
+        int: the page size to use or None if limit is out of range
+    """
+    if limit is None:
+        return current_app.config['PAGE_SIZE']
+    if 1 <= limit <= current_app.config['MAX_PAGE_SIZE']:
+        return limit
+    return None
+
+
+def not_modified(etag):
+    """Answer a conditional GET whose If-None-Match matches etag.
+
+    args:
+        etag(str): unquoted strong tag of the current representation
+    returns:
+        Response: an empty 304 response or None if the client copy is old
+    """
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': quote_etag(etag)})
+    return None
+
+
+def invalid_request(result):
+    """Return the 400 response for a SchemaResult with errors.
+
+    Missing or unconvertible arguments are reported under message, like
+    flask_restful does, and failed checks as a list under error.
+    """
+    if result.missing:
+        return {'message': result.missing, 'status': 400}, 400
+    return {'error': result.messages(), 'fields': result.errors,
+            'status': 400}, 400
+
+
+def bearer_token():
+    """Return the token of an Authorization: Bearer header or None."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(
+        ' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()
+
+
+def json_response(body, etag):
+    """Wrap an encoded JSON body in a 200 response tagged etag."""
+    return Response(body, mimetype='application/json',
+                    headers={'ETag': quote_etag(etag)})
+
+
+def parse_bbox(bbox):
+    """Convert min_lon,min_lat,max_lon,max_lat into a tuple of floats."""
+    coordinates = tuple(float(x) for x in bbox.split(','))
+    if len(coordinates) != 4:
+        raise ValueError('bbox should have four coordinates')
+    if not all(map(math.isfinite, coordinates)):
+        raise ValueError('bbox coordinates should be finite')
+    return coordinates
 
 
 class RedFlag(Resource):
     """Implements an RedFlag's endpoints."""
 
+    sorts = ('id', 'created', '-created')
+    list_schema = Schema(
+        LIMIT, Field('cursor'),
+        Field('from', type=parse_datetime,
+              help='from should be an ISO 8601 date'),
+        Field('to', type=parse_datetime,
+              help='to should be an ISO 8601 date'),
+        Field('sort', checks=(lambda sort: None if sort in RedFlag.sorts else
+                              'sort should be one of {}'.format(
+                                  ', '.join(RedFlag.sorts)),)),
+        location='args')
+
     def post(self):
         """Send redflag creation request."""
-        parser = reqparse.RequestParser()
-        parser.add_argument('Created By',
-                            type=int, help='Created By is required',
-                            required=True)
-        parser.add_argument('Location', type=str,
-                            help='Location is required',
-                            required=True)
-        parser.add_argument('Comment', type=str,
-                            help='Comment is required',
-                            required=True)
-        parser.add_argument('Title', type=str,
-                            help='Title is required',
-                            required=True)
-        args = parser.parse_args()
+        result = REDFLAG_SCHEMA.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        args = result.values
         redflag = RedFlagModel(
             args['Created By'], args['Location'],
             args['Title'], args['Comment'])
-        res = redflag.save(DB)
-        if res['status']:
-            return {'status': 201, 'data': res['message']}, 201
-        redflag_validation_errors = res['message']['errors'].copy()
-        redflag.errors.clear()
-        return bad_request(redflag_validation_errors)
+        res = redflag.insert(DB)
+        return {'status': 201, 'data': res['message']}, 201
+
+    def get(self):
+        """Return a page of created redflags.
+
+        The page starts after the redflag encoded in the cursor argument
+        and the response links to the next page if there is one. Pages
+        are in id order unless sort is created or -created, or a from or
+        to date is given: they are then in creation order, oldest or
+        newest first, from the from date included to the to date
+        excluded.
+        """
+        result = self.list_schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        args = result.values
+        by_date = args['from'] is not None or args['to'] is not None
+        sort = args['sort'] or ('created' if by_date else 'id')
+        if by_date and sort == 'id':
+            return bad_request('from and to need sort=created or '
+                               'sort=-created')
+        if not DB:
+            return no_content('There are no redflags at the moment')
+        version = DB.version
+        etag = 'redflags-{}-{}'.format(DB.epoch, version)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        limit = page_limit(args['limit'])
+        if limit is None:
+            return bad_request('limit should be between 1 and {}'.format(
+                current_app.config['MAX_PAGE_SIZE']))
+        after = None
+        if args['cursor']:
+            after = decode_cursor(args['cursor'], 1 if sort == 'id' else 2)
+            if after is None:
+                return bad_request('Invalid cursor')
+        key = ('page', version, sort, args['from'], args['to'], after,
+               limit)
+        body = CACHE.get(key)
+        if body is None:
+            if sort == 'id':
+                redflags, more = DB.page(after or 0, limit)
+                last = (next(iter(redflags[-1])),) if more else None
+            else:
+                keys, more = DB.timeline.page(
+                    args['from'], args['to'], after, limit,
+                    descending=sort == '-created')
+                redflags = DB.select(record_id for created, record_id
+                                     in keys)
+                last = keys[-1] if more else None
+            next_page = None
+            if more:
+                query = {name: request.args[name]
+                         for name in ('from', 'to', 'sort')
+                         if name in request.args}
+                next_page = url_for('v1.redflag', limit=limit,
+                                    cursor=encode_cursor(*last), **query)
+            body = encode({'status': 200, 'data': redflags,
+                           'next': next_page})
+            CACHE.put_page(key, body)
+        return json_response(body, etag)
+
+
+class RedFlagBatch(Resource):
+    """Create many redflags in one request."""
+
+    def post(self):
+        """Create every valid redflag in a JSON array.
+
+        The response lists, in request order, the id of each created
+        redflag or the errors that stopped it from being created.
+        """
+        items = request.get_json(silent=True)
+        if not isinstance(items, list) or not items:
+            return bad_request('Send a non empty JSON array of redflags')
+        if len(items) > current_app.config['MAX_BATCH_SIZE']:
+            return bad_request('Send at most {} redflags at a time'.format(
+                current_app.config['MAX_BATCH_SIZE']))
+        results = []
+        redflags = []
+        for item in items:
+            if not isinstance(item, dict):
+                results.append({'errors': ['Redflag should be an object']})
+                continue
+            result = REDFLAG_SCHEMA.parse(item)
+            if not result.is_valid:
+                errors = list(result.missing.values()) + result.messages()
+                results.append({'errors': errors})
+                continue
+            args = result.values
+            redflag = RedFlagModel(args['Created By'], args['Location'],
+                                   args['Title'], args['Comment'])
+            redflags.append(redflag)
+            results.append(redflag)
+        RedFlagModel.insert_many(redflags, DB)
+        results = [{'Id': result.incident_id}
+                   if isinstance(result, RedFlagModel) else result
+                   for result in results]
+        if any('Id' in result for result in results):
+            return {'status': 201, 'data': results}, 201
+        return bad_request(results)
+
+
+class RedFlagExport(Resource):
+    """Export all redflags in a single streamed response."""
+
+    formats = {
+        'json': (stream_json, 'application/json'),
+        'ndjson': (stream_ndjson, 'application/x-ndjson')
+    }
+    schema = Schema(Field('format', default='ndjson'), location='args')
+
+    def get(self):
+        """Stream every redflag as JSON or NDJSON.
+
+        Redflags are encoded one by one as the response is sent, so the
+        memory used does not grow with the number of redflags.
+        """
+        args = self.schema.parse().values
+        if args['format'] not in self.formats:
+            return bad_request('format should be one of {}'.format(
+                ', '.join(sorted(self.formats))))
+        encode, mimetype = self.formats[args['format']]
+        return Response(encode(DB.iter_records()), mimetype=mimetype)
+
+
+class RedFlagNearby(Resource):
+    """Find redflags close to a point."""
+
+    schema = Schema(
+        Field('lat', type=float, required=True, help='lat should be a number',
+              checks=(check_latitude,)),
+        Field('lon', type=float, required=True, help='lon should be a number',
+              checks=(check_longitude,)),
+        Field('radius', type=float, default=1.0,
+              help='radius should be a number',
+              checks=(lambda radius: None if math.isfinite(radius) and
+                      radius > 0 else 'radius should be a finite number '
+                      'greater than zero',)),
+        LIMIT, location='args')
+
+    def get(self):
+        """Return redflags within radius km of lat, lon, nearest first."""
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        args = result.values
+        limit = page_limit(args['limit'])
+        if limit is None:
+            return bad_request('limit should be between 1 and {}'.format(
+                current_app.config['MAX_PAGE_SIZE']))
+        found = DB.spatial.nearby(args['lon'], args['lat'], args['radius'])
+        redflags = DB.select(
+            record_id for distance, record_id in found[:limit])
+        return {'status': 200, 'data': redflags}, 200
+
+
+class RedFlagWithin(Resource):
+    """Find redflags inside a bounding box."""
+
+    schema = Schema(
+        Field('bbox', type=parse_bbox, required=True,
+              help='bbox should be four comma separated numbers',
+              checks=(check_bbox,)),
+        LIMIT, location='args')
+
+    def get(self):
+        """Return redflags inside bbox=min_lon,min_lat,max_lon,max_lat."""
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        args = result.values
+        min_lon, min_lat, max_lon, max_lat = args['bbox']
+        if min_lon > max_lon or min_lat > max_lat:
+            return bad_request('bbox minimums should not exceed maximums')
+        limit = page_limit(args['limit'])
+        if limit is None:
+            return bad_request('limit should be between 1 and {}'.format(
+                current_app.config['MAX_PAGE_SIZE']))
+        found = DB.spatial.within(min_lon, min_lat, max_lon, max_lat)
+        return {'status': 200, 'data': DB.select(found[:limit])}, 200
+
+
+class RedFlagHeatmap(Resource):
+    """Count redflags over a grid for map views."""
+
+    schema = Schema(
+        Field('bbox', type=parse_bbox, required=True,
+              help='bbox should be four comma separated numbers',
+              checks=(check_bbox,)),
+        Field('cell', type=float, default=1.0,
+              help='cell should be a number', checks=(check_cell,)),
+        location='args')
+
+    def get(self):
+        """Return redflag counts in cells of a grid over bbox.
+
+        Cells are listed as [longitude, latitude, count] with the south
+        west corner of the cell, and only cells holding redflags are
+        listed. Responses are cached until the redflags change.
+        """
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        index = DB.columns
+        if index is None:
+            return not_found('Heatmaps are turned off')
+        bbox, cell = result.values['bbox'], result.values['cell']
+        if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return bad_request('bbox minimums should not exceed maximums')
+        columns, rows = index.grid_size(bbox, cell)
+        if columns * rows > current_app.config['MAX_HEATMAP_CELLS']:
+            return bad_request('cell is too small for bbox, use at most {} '
+                               'cells'.format(
+                                   current_app.config['MAX_HEATMAP_CELLS']))
+        version = DB.version
+        etag = 'heatmap-{}-{}'.format(DB.epoch, version)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        key = ('heatmap', version, bbox, cell)
+        body = CACHE.get(key)
+        if body is None:
+            cells = [[bbox[0] + x * cell, bbox[1] + y * cell, count]
+                     for x, y, count in index.histogram(bbox, cell)]
+            body = encode({'status': 200,
+                           'data': {'bbox': bbox, 'cell': cell,
+                                    'columns': columns, 'rows': rows,
+                                    'cells': cells}})
+            CACHE.put_page(key, body)
+        return json_response(body, etag)
+
+
+class RedFlagSearch(Resource):
+    """Search redflag titles and comments."""
+
+    schema = Schema(
+        Field('q', required=True,
+              checks=(lambda q: 'q should not be empty' if is_empty(q)
+                      else None,)),
+        LIMIT, location='args')
+
+    def get(self):
+        """Return the redflags best matching q, best match first."""
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        args = result.values
+        limit = page_limit(args['limit'])
+        if limit is None:
+            return bad_request('limit should be between 1 and {}'.format(
+                current_app.config['MAX_PAGE_SIZE']))
+        found = DB.text.search(args['q'], limit)
+        redflags = DB.select(record_id for score, record_id in found)
+        return {'status': 200, 'data': redflags}, 200
+
+
+class RedFlagCounts(Resource):
+    """Count redflags by owner, day, title or region."""
+
+    groups = ('creator', 'day', 'title', 'region')
+    schema = Schema(
+        Field('by', required=True,
+              checks=(lambda by: None if by in RedFlagCounts.groups else
+                      'by should be one of {}'.format(
+                          ', '.join(RedFlagCounts.groups)),)),
+        Field('cell', type=float, default=1.0,
+              help='cell should be a number', checks=(check_cell,)),
+        location='args')
+
+    def get(self):
+        """Return the number of redflags in each group, ordered by group.
+
+        Regions are cells of cell degrees keyed by their south west
+        corner.
+        """
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        index = DB.columns
+        if index is None:
+            return not_found('Redflag counts are turned off')
+        by = result.values['by']
+        counts = index.count_by(by, result.values['cell'])
+        return {'status': 200,
+                'data': [{by: key, 'count': count}
+                         for key, count in counts]}, 200
+
+
+class RedFlagChanges(Resource):
+    """Changes to redflags for clients keeping a copy."""
+
+    schema = Schema(
+        Field('since', type=int, required=True,
+              help='since should be an integer',
+              checks=(lambda since: None if since >= 0 else
+                      'since should not be negative',)),
+        LIMIT, location='args')
+
+    def get(self):
+        """Return the redflags changed after the since version.
+
+        Each change holds the version and id of a redflag and either the
+        redflag or, if it was deleted, deleted set to true. Clients send
+        the returned version as since next time, or follow next while
+        more changes remain. A since older than the kept changes, or
+        newer than the store as after a restart of a memory store, gets a
+        410 response and the client has to list every redflag again.
+        """
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        args = result.values
+        limit = page_limit(args['limit'])
+        if limit is None:
+            return bad_request('limit should be between 1 and {}'.format(
+                current_app.config['MAX_PAGE_SIZE']))
+        version = DB.version
+        if args['since'] > version:
+            return gone('Version {} is ahead of the redflags, list every '
+                        'redflag again'.format(args['since']))
+        changes, more = DB.changes.since(args['since'], limit)
+        if changes is None:
+            return gone('Changes since version {} are no longer kept, '
+                        'list every redflag again'.format(args['since']))
+        data = []
+        for change_version, record_id in changes:
+            record = DB.get(record_id)
+            if record is None:
+                data.append({'Id': record_id, 'Version': change_version,
+                             'Deleted': True})
+            else:
+                data.append({'Id': record_id,
+                             'Version': DB.record_version(record_id),
+                             'Redflag': record})
+        next_page = None
+        if more:
+            version = changes[-1][0]
+            next_page = url_for('v1.redflagchanges', since=version,
+                                limit=limit)
+        return {'status': 200,
+                'data': {'version': version, 'changes': data},
+                'next': next_page}, 200
+
+
+class RedFlagEvents(Resource):
+    """Push redflag changes to live dashboards."""
+
+    def get(self):
+        """Stream created, updated, deleted and cleared events.
+
+        The stream uses the Server-Sent Events format. Each event id is
+        the store version of the change, so a client that reconnects or
+        gets a dropped event can catch up with /redflags/changes.
+        """
+        subscription = DB.events.subscribe()
+        response = Response(
+            stream_events(subscription,
+                          current_app.config['EVENT_KEEPALIVE']),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache'})
+        response.call_on_close(
+            lambda: DB.events.unsubscribe(subscription))
+        return response
+
+
+class RedFlagStats(Resource):
+    """Totals of redflags for dashboards."""
+
+    def get(self):
+        """Return the number of redflags per owner, day and status."""
+        return {'status': 200, 'data': DB.stats.report()}, 200
+
+
+class RedFlagCacheStats(Resource):
+    """Report how well the response cache is doing."""
 
     def get(self):
-        """Return all created redflags."""
-        if DB:
-            return {'status': 200, 'data': DB}, 200
-        return no_content('There are no redflags at the moment')
+        """Return the size and hit counters of the response cache."""
+        return {'status': 200, 'data': CACHE.stats()}, 200
 
 
 class EditRedFlagComment(Resource):
     """Edit RedFlag comment."""
 
+    schema = Schema(Field('Comment', required=True, checks=(check_comment,)))
+
     def patch(self, redflag_id):
         """Edit an redflag."""
-        parser = reqparse.RequestParser()
-        parser.add_argument('Comment',
-                            type=str,
-                            help='Comment is required',
-                            required=True)
-        args = parser.parse_args()
-        validate = RedFlagValidators()
-        comment = args['Comment']
-        if validate.validate_comment(args['Comment']):
-            comment = args['Comment']
-        else:
-            return {'status': 400, 'error': validate.errors}, 400
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
         res = RedFlagModel.update_resource(redflag_id, DB,
-                                           Comment=comment)
+                                           Comment=result.values['Comment'])
         if res['status']:
             return {'status': 200,
                     'data': {'Id': res['message'],
@@ -80,23 +549,16 @@ class EditRedFlagComment(Resource):
 class EditRedFlagLocation(Resource):
     """Edit RedFlag location."""
 
+    schema = Schema(
+        Field('Location', required=True, checks=(check_location,)))
+
     def patch(self, redflag_id):
         """Edit an redflag location."""
-        parser = reqparse.RequestParser()
-        parser.add_argument('Location',
-                            type=str,
-                            help='Location is required',
-                            required=True)
-        args = parser.parse_args()
-        validate = RedFlagValidators()
-        location = args['Location']
-        if validate.validate_location(args['Location']):
-            location = args['Location']
-        else:
-            return {'status': 400, 'error': validate.errors}, 400
-
-        res = RedFlagModel.update_resource(redflag_id, DB,
-                                           Location=location)
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        res = RedFlagModel.update_resource(
+            redflag_id, DB, Location=result.values['Location'])
         if res['status']:
             return {'status': 200,
                     'data': {'Id': res['message'],
@@ -105,15 +567,46 @@ class EditRedFlagLocation(Resource):
         return not_found(res['message'])
 
 
+class EditRedFlagStatus(Resource):
+    """Edit RedFlag status."""
+
+    schema = Schema(Field('Status', required=True, checks=(check_status,)))
+
+    def patch(self, redflag_id):
+        """Move an redflag to another status."""
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        res = RedFlagModel.update_resource(redflag_id, DB,
+                                           Status=result.values['Status'])
+        if res['status']:
+            return {'status': 200,
+                    'data': {'Id': res['message'],
+                             'message': 'Updated redflag status'}}, 200
+        return not_found(res['message'])
+
+
 class RedFlagManipulation(Resource):
     """Manage redflags."""
 
     def get(self, redflag_id):
         """Get a specefic redflag."""
-        redflag = RedFlagModel.find_redflag(redflag_id, DB)
-        if redflag is not None:
-            return {'status': 200, 'data': redflag}, 200
-        return not_found('That redflag cannot be found')
+        version = DB.record_version(redflag_id)
+        if version is None:
+            return not_found('That redflag cannot be found')
+        etag = 'redflag-{}-{}-{}'.format(DB.epoch, redflag_id, version)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        key = ('redflag', redflag_id, version)
+        body = CACHE.get(key)
+        if body is None:
+            redflag = RedFlagModel.find_redflag(redflag_id, DB)
+            if redflag is None:
+                return not_found('That redflag cannot be found')
+            body = encode({'status': 200, 'data': redflag})
+            CACHE.put_record(redflag_id, key, body)
+        return json_response(body, etag)
 
     def delete(self, redflag_id):
         """Delete an redflag."""
@@ -127,50 +620,48 @@ class RedFlagManipulation(Resource):
 class Signup(Resource):
     """Register user."""
 
+    schema = Schema(
+        Field('Email', required=True, checks=(check_email,)),
+        Field('Password', required=True, checks=(check_password,)),
+        Field('Confirm Password', required=True, checks=(check_password,)),
+        rules=(('Confirm Password', lambda args: check_passwords_match(
+            args['Confirm Password'], args['Password'])),))
+
     def post(self):
         """Create user."""
-        parser = reqparse.RequestParser()
-        parser.add_argument('Email',
-                            type=str,
-                            help='Email is required',
-                            required=True)
-        parser.add_argument('Password',
-                            type=str,
-                            help='Password is required',
-                            required=True)
-        parser.add_argument('Confirm Password',
-                            type=str,
-                            help='Confirm Password is required',
-                            required=True)
-        args = parser.parse_args()
-
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        args = result.values
         user = User(args['Email'], args['Password'])
-        res = user.sign_up(args['Confirm Password'], USERS)
+        try:
+            res = user.register(USERS, HASHER)
+        except HasherBusy:
+            return service_unavailable('Too many signups, try again soon')
         if res.get('status'):
             return {'data': {'message': res.get('message'),
                              'status': 201}}, 201
-        return bad_request(user.errors)
+        return bad_request(res['message']['errors'])
 
 
 class Signin(Resource):
     """Signup user."""
 
+    schema = Schema(
+        Field('Email', required=True, checks=(check_email,)),
+        Field('Password', required=True, checks=(check_password,)))
+
     def post(self):
         """Create user."""
-        parser = reqparse.RequestParser()
-        parser.add_argument('Email',
-                            type=str,
-                            help='Email is required',
-                            required=True)
-        parser.add_argument('Password',
-                            type=str,
-                            help='Password is required',
-                            required=True)
-        args = parser.parse_args()
-
-        user = User(args['Email'], args['Password'])
-        res = CONTROLLER.login(args['Email'], args['Password'],
-                               LOGGED_IN, USERS)
+        result = self.schema.parse()
+        if not result.is_valid:
+            return invalid_request(result)
+        args = result.values
+        try:
+            res = CONTROLLER.sign_in(args['Email'], args['Password'],
+                                     USERS, TOKENS, HASHER)
+        except HasherBusy:
+            return service_unavailable('Too many logins, try again soon')
         if res.get('status'):
             return {'data': {'message': res.get('message'),
                              'status': 200}}, 200
@@ -182,7 +673,7 @@ class Signout(Resource):
 
     def post(self, user_id):
         """Create user."""
-        res = CONTROLLER.logout(user_id, LOGGED_IN)
+        res = CONTROLLER.logout(user_id, bearer_token(), TOKENS)
         if res['status']:
             return {'data': {'message': res['message'], 'status': 200}}, 200
         return bad_request(res['message'])
@@ -1,9 +1,27 @@
 """Defines the decorators for the errors."""
+from functools import wraps
+
 from flask import Blueprint, jsonify
 
+from app.api_1_0.backends.base import BackendUnavailable
+
+from app.errors import service_unavailable
+
 errors = Blueprint('errors', __name__)
 
 
+def backend_unavailable(view):
+    """Answer 503 when a storage backend cannot serve a request in time."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        except BackendUnavailable as error:
+            body, code = service_unavailable(str(error))
+            return jsonify(body), code
+    return wrapper
+
+
 @errors.app_errorhandler(404)
 def resource_not_found(e):
     """Show custom error for inexisting resource."""
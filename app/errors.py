@@ -71,3 +71,27 @@ def conflict(msg):
         status code(int): The failure status code
     """
     return {'error': msg, 'status': 409}, 409
+
+
+def gone(msg):
+    """Resource requested is no longer available.
+
+    args:
+        msg(str): The error to display
+    returns:
+        error(dict): The error encounters and the status
+        status code(int): The failure status code
+    """
+    return {'error': msg, 'status': 410}, 410
+
+
+def service_unavailable(msg):
+    """Server too busy to process the request now.
+
+    args:
+        msg(str): The error to display
+    returns:
+        error(dict): The error encounters and the status
+        status code(int): The failure status code
+    """
+    return {'error': msg, 'status': 503}, 503
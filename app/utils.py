@@ -1,6 +1,14 @@
 """repeated stuff."""
 
+import base64
 import re
+from datetime import datetime
+
+# str(datetime) gives the first two, and queries may also use a T, leave
+# out the seconds or give the date alone
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S',
+                    '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+                    '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d')
 
 
 def is_empty(value):
@@ -46,3 +54,69 @@ def is_valid_password(password):
     if len(password) >= 8:
         return True
     return False
+
+
+def encode_cursor(*key):
+    """Make an opaque pagination cursor.
+
+    args:
+        key(int): id of the last item on the current page, or the
+            numbers of its sort key
+    """
+    return base64.urlsafe_b64encode(
+        ':'.join(map(str, key)).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size=1):
+    """Read the id or sort key stored in a pagination cursor.
+
+    args:
+        cursor(str): value returned by encode_cursor
+        size(int): number of values in the key
+    returns:
+        int: the id, or a tuple of size numbers if size is more than one,
+            or None if the cursor is invalid
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        text = base64.urlsafe_b64decode(padded.encode()).decode()
+        key = tuple(int(part) for part in text.split(':'))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if len(key) != size or min(key) < 0:
+        return None
+    return key[0] if size == 1 else key
+
+
+def parse_datetime(text):
+    """Convert an ISO 8601 date or date and time without a timezone.
+
+    Parsed with strptime, as datetime.fromisoformat needs Python 3.7.
+
+    raises:
+        ValueError: if text is not such a date
+    """
+    for date_format in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            pass
+    raise ValueError('{!r} is not an ISO 8601 date without a '
+                     'timezone'.format(text))
+
+
+def parse_location(location):
+    """Split a location into longitude and latitude.
+
+    args:
+        location(str): comma separated longitude and latitude
+    returns:
+        tuple: (longitude, latitude) floats or None if invalid
+    """
+    coordinates = [x.strip() for x in location.split(',')]
+    if len(coordinates) != 2:
+        return None
+    try:
+        return float(coordinates[0]), float(coordinates[1])
+    except ValueError:
+        return None
@@ -7,18 +7,71 @@ class Config:
     """Contains the basic settings for all configurations."""
 
     PROPAGATE_EXCEPTIONS = True
+    # key access tokens are signed with, shared by every process of the
+    # app, and seconds a token stays valid. Only development and testing
+    # fall back to a known key; the app refuses to start without one.
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    TOKEN_MAX_AGE = int(os.environ.get('TOKEN_MAX_AGE', 3600))
+    # PBKDF2 iterations of new password hashes, raised over time; users
+    # get the new cost at their next login
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS',
+                                                  260000))
+    # threads hashing passwords and passwords allowed to wait for one
+    # before signups and logins are refused with 503
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = 32
+    # number of redflags per page when listing
+    PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    # maximum number of redflags created by one batch request
+    MAX_BATCH_SIZE = 500
+    # keep a columnar copy of the redflags for /redflags/counts and
+    # /redflags/heatmap, which are turned off without it
+    COLUMN_INDEX = os.environ.get('COLUMN_INDEX', '1') != '0'
+    # largest grid a heatmap request may ask for
+    MAX_HEATMAP_CELLS = 100000
+    # where redflags and users are kept: 'memory', 'journal', 'sqlite' or
+    # 'postgres'
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'memory')
+    # the journal backend logs changes to memory in this directory and
+    # snapshots everything after the given number of changes
+    JOURNAL_DIR = os.environ.get('JOURNAL_DIR', 'journal')
+    JOURNAL_SNAPSHOT_EVERY = 10000
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', 'ireporter.db')
+    # largest number of idle SQLite connections kept between requests
+    SQLITE_POOL_SIZE = 8
+    POSTGRES_URL = os.environ.get('DATABASE_URL',
+                                  'postgresql://localhost/ireporter')
+    # largest number of open connections and seconds to wait for one
+    POSTGRES_POOL_SIZE = int(os.environ.get('POSTGRES_POOL_SIZE', 10))
+    POSTGRES_POOL_TIMEOUT = 5.0
+    POSTGRES_CONNECT_TIMEOUT = 5
+    # milliseconds a single statement may run
+    POSTGRES_STATEMENT_TIMEOUT = 5000
+    # number of encoded redflags and pages kept in memory
+    RESPONSE_CACHE_SIZE = 1024
+    # number of latest redflag changes kept for /redflags/changes
+    CHANGE_LOG_SIZE = 10000
+    # events waiting for each /redflags/events client before the oldest
+    # are dropped, and seconds between keepalives on an idle stream
+    EVENT_QUEUE_SIZE = 256
+    EVENT_KEEPALIVE = 15
 
 
 class Development(Config):
     """Contains configurations to be used by developer."""
 
     DEBUG = True
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'ireporter-development-key')
 
 
 class Testing(Config):
     """Contains configurations for testing."""
 
     TESTING = True
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'ireporter-development-key')
+    STORAGE_BACKEND = 'memory'
+    PASSWORD_HASH_ITERATIONS = 1000
 
 
 class Production(Config):
@@ -0,0 +1,61 @@
+"""Contains the tests for creating redflags in batches."""
+import unittest
+
+from app import create_app
+
+from app.api_1_0.views import DB
+
+
+class TestBatch(unittest.TestCase):
+    """Test creating many redflags in one request."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.redflag = {
+            "Created By": 1,
+            "Location": "23.0, 34.5",
+            "Comment": "Thieves thieves thieves",
+            "Title": "Corruption of the highest order"
+        }
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+
+    def tearDown(self):
+        """Remove instance variables."""
+        del self.redflag
+        DB.clear()
+
+    def test_batch_of_valid_redflags_true(self):
+        """Test every redflag in a valid batch is created."""
+        res = self.client().post('/api/v1/redflags/batch',
+                                 json=[self.redflag] * 3)
+        self.assertEqual(res.status_code, 201)
+        res = res.get_json()
+        self.assertEqual([item['Id'] for item in res['data']], [1, 2, 3])
+        self.assertEqual(len(DB), 3)
+
+    def test_batch_reports_errors_per_item_true(self):
+        """Test invalid items are reported without stopping valid ones."""
+        invalid = dict(self.redflag, Location="34.5")
+        missing = {"Created By": 1}
+        res = self.client().post('/api/v1/redflags/batch',
+                                 json=[invalid, self.redflag, missing])
+        self.assertEqual(res.status_code, 201)
+        res = res.get_json()
+        self.assertEqual(res['data'][0]['errors'][0],
+                         'Two coordinates required')
+        self.assertEqual(res['data'][1], {'Id': 1})
+        self.assertEqual(res['data'][2]['errors'][0],
+                         'Location is required')
+
+    def test_batch_without_valid_redflags_false(self):
+        """Test a batch creating nothing is a bad request."""
+        res = self.client().post('/api/v1/redflags/batch',
+                                 json=[dict(self.redflag, Title="")])
+        self.assertEqual(res.status_code, 400)
+
+    def test_batch_not_a_list_false(self):
+        """Test the batch must be a JSON array."""
+        res = self.client().post('/api/v1/redflags/batch',
+                                 json=self.redflag)
+        self.assertEqual(res.status_code, 400)
@@ -0,0 +1,76 @@
+"""Contains the tests for the response cache."""
+import unittest
+
+from app import create_app
+
+from app.api_1_0.views import CACHE, DB
+
+
+class TestCache(unittest.TestCase):
+    """Test encoded responses are reused until redflags change."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.redflag = {
+            "Created By": 1,
+            "Location": "23.0, 34.5",
+            "Comment": "Thieves thieves thieves",
+            "Title": "Corruption of the highest order"
+        }
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        self.client().post('/api/v1/redflags', data=self.redflag)
+
+    def tearDown(self):
+        """Remove instance variables."""
+        del self.redflag
+        DB.clear()
+        CACHE.resize(self.app.config['RESPONSE_CACHE_SIZE'])
+
+    def stats(self):
+        """Return the cache counters from the api."""
+        return self.client().get('/api/v1/redflags/cache').get_json()['data']
+
+    def test_repeated_get_is_cache_hit_true(self):
+        """Test the second read of a redflag comes from the cache."""
+        before = self.stats()
+        first = self.client().get('/api/v1/redflags/1').get_json()
+        second = self.client().get('/api/v1/redflags/1').get_json()
+        after = self.stats()
+        self.assertEqual(first, second)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+    def test_edit_invalidates_redflag_and_pages_true(self):
+        """Test edited redflags are not served from the cache."""
+        self.client().get('/api/v1/redflags/1')
+        self.client().get('/api/v1/redflags')
+        self.client().patch('/api/v1/redflags/1/comments',
+                            data={"Comment": "Clerks are taking bribes"})
+        self.assertEqual(self.stats()['size'], 0)
+        res = self.client().get('/api/v1/redflags/1').get_json()
+        self.assertEqual(res['data']['1']['Comment'],
+                         'Clerks are taking bribes')
+        res = self.client().get('/api/v1/redflags').get_json()
+        self.assertEqual(res['data'][0]['1']['Comment'],
+                         'Clerks are taking bribes')
+
+    def test_cache_size_is_bounded_true(self):
+        """Test the least recently used entries are evicted."""
+        CACHE.resize(2)
+        for _ in range(3):
+            self.client().post('/api/v1/redflags', data=self.redflag)
+        for redflag_id in (1, 2, 3):
+            self.client().get('/api/v1/redflags/{}'.format(redflag_id))
+        self.assertEqual(self.stats()['size'], 2)
+        self.client().get('/api/v1/redflags/1')
+        self.assertEqual(self.stats()['size'], 2)
+
+    def test_disabled_cache_keeps_nothing_false(self):
+        """Test a cache of size zero does not track the keys it skips."""
+        CACHE.resize(0)
+        self.client().get('/api/v1/redflags/1')
+        self.client().get('/api/v1/redflags')
+        self.assertEqual(self.stats()['size'], 0)
+        self.assertEqual(CACHE._records, {})
+        self.assertEqual(CACHE._pages, set())
@@ -0,0 +1,109 @@
+"""Contains the tests for syncing redflag changes."""
+import unittest
+
+from app import create_app
+from app.api_1_0.changes import ChangeLog
+
+from app.api_1_0.views import DB
+
+
+class TestChangeLog(unittest.TestCase):
+    """Test the log of recent changes."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.log = ChangeLog(maxsize=4)
+        for version, record_id in enumerate((1, 2, 1, 3), 1):
+            self.log.append(version, record_id)
+
+    def test_since_lists_latest_change_per_redflag_true(self):
+        """Test redflags changed twice are listed once, oldest first."""
+        self.assertEqual(self.log.since(0, 10), ([(2, 2), (3, 1), (4, 3)],
+                                                 False))
+        self.assertEqual(self.log.since(2, 10), ([(3, 1), (4, 3)], False))
+        self.assertEqual(self.log.since(0, 2), ([(2, 2), (3, 1)], True))
+        self.assertEqual(self.log.since(4, 10), ([], False))
+
+    def test_old_versions_are_forgotten_true(self):
+        """Test versions before the kept changes cannot be answered."""
+        self.log.append(5, 4)
+        self.assertEqual(self.log.floor, 1)
+        self.assertEqual(self.log.since(0, 10), (None, False))
+        self.assertEqual(self.log.since(1, 10)[0], [(2, 2), (3, 1), (4, 3),
+                                                    (5, 4)])
+        self.log.resize(1)
+        self.assertEqual(self.log.since(4, 10), ([(5, 4)], False))
+        self.log.reset(7)
+        self.assertEqual(self.log.since(6, 10), (None, False))
+        self.assertEqual(self.log.since(7, 10), ([], False))
+
+
+class TestChanges(unittest.TestCase):
+    """Test the redflag changes endpoint."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        self.start = DB.version
+        for location in ("36.80, -1.28", "36.81, -1.29", "39.66, -4.04"):
+            self.client().post('/api/v1/redflags', data={
+                "Created By": 1,
+                "Location": location,
+                "Comment": "Thieves thieves thieves",
+                "Title": "Corruption of the highest order"
+            })
+
+    def tearDown(self):
+        """Remove instance variables."""
+        DB.clear()
+
+    def changes(self, since, limit=''):
+        """Return the data of a changes response."""
+        res = self.client().get('/api/v1/redflags/changes?since={}{}'.format(
+            since, limit))
+        self.assertEqual(res.status_code, 200)
+        return res.get_json()
+
+    def test_changes_hold_records_and_tombstones_true(self):
+        """Test updates carry the redflag and deletes a tombstone."""
+        version = self.changes(self.start)['data']['version']
+        self.client().patch('/api/v1/redflags/2/comments',
+                            data={"Comment": "Changed"})
+        self.client().delete('/api/v1/redflags/3')
+        data = self.changes(version)['data']
+        self.assertEqual(data['version'], DB.version)
+        self.assertEqual([change['Id'] for change in data['changes']],
+                         [2, 3])
+        self.assertEqual(data['changes'][0]['Redflag']['Comment'],
+                         'Changed')
+        self.assertEqual(data['changes'][0]['Version'],
+                         DB.record_version(2))
+        self.assertTrue(data['changes'][1]['Deleted'])
+        self.assertEqual(self.changes(DB.version)['data']['changes'], [])
+
+    def test_changes_are_paged_true(self):
+        """Test next continues after the last change returned."""
+        body = self.changes(self.start, '&limit=2')
+        self.assertEqual([change['Id'] for change in body['data']['changes']],
+                         [1, 2])
+        res = self.client().get(body['next'])
+        body = res.get_json()
+        self.assertEqual([change['Id'] for change in body['data']['changes']],
+                         [3])
+        self.assertIsNone(body['next'])
+
+    def test_changes_before_a_clear_are_gone_false(self):
+        """Test clients behind the kept changes must resync."""
+        DB.clear()
+        res = self.client().get(
+            '/api/v1/redflags/changes?since={}'.format(self.start))
+        self.assertEqual(res.status_code, 410)
+        res = self.client().get('/api/v1/redflags/changes?since=-1')
+        self.assertEqual(res.status_code, 400)
+
+    def test_versions_ahead_of_the_store_are_gone_false(self):
+        """Test clients ahead of the store, as after a restart, resync."""
+        res = self.client().get(
+            '/api/v1/redflags/changes?since={}'.format(DB.version + 1))
+        self.assertEqual(res.status_code, 410)
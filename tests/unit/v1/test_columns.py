@@ -0,0 +1,220 @@
+"""Contains the tests for the columnar copy of redflags."""
+import unittest
+from datetime import datetime
+
+from app import create_app
+from app.api_1_0 import columns
+from app.api_1_0.columns import ColumnIndex
+from app.api_1_0.records import IncidentRecord
+
+from app.api_1_0.views import CACHE, DB
+
+
+def redflag(record_id, creator, location, title, created):
+    """Return a stored redflag."""
+    return IncidentRecord(id=record_id, created_by=creator,
+                          created_on=created, location=location,
+                          comment='Thieves thieves thieves', title=title)
+
+
+class TestColumnIndex(unittest.TestCase):
+    """Test filters and counts over the columns, with and without NumPy."""
+
+    use_numpy = False
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.index = ColumnIndex(use_numpy=self.use_numpy)
+        rows = ((1, 1, '36.80, -1.28', 'Bribe', datetime(2024, 1, 1, 8)),
+                (2, 2, '36.81, -1.29', 'Bribe', datetime(2024, 1, 1, 20)),
+                (3, 1, '39.66, -4.04', 'Theft', datetime(2024, 1, 2, 9)),
+                (4, 1, 'somewhere', 'Theft', 'yesterday'))
+        for row in rows:
+            self.index.add(row[0], redflag(*row))
+
+    def test_select_filters_true(self):
+        """Test every filter narrows the selected ids."""
+        self.assertEqual(self.index.select(), [1, 2, 3, 4])
+        self.assertEqual(self.index.select(creator=1), [1, 3, 4])
+        self.assertEqual(self.index.select(title='Bribe'), [1, 2])
+        self.assertEqual(self.index.select(title='Other'), [])
+        self.assertEqual(self.index.select(bbox=(36, -2, 37, -1)), [1, 2])
+        self.assertEqual(self.index.select(
+            since=datetime(2024, 1, 1, 12), until=datetime(2024, 1, 2)), [2])
+
+    def test_count_by_true(self):
+        """Test counts grouped by each field."""
+        self.assertEqual(self.index.count_by('creator'), [(1, 3), (2, 1)])
+        self.assertEqual(self.index.count_by('title'),
+                         [('Bribe', 2), ('Theft', 2)])
+        self.assertEqual(self.index.count_by('day'), [
+            ('1970-01-01', 1), ('2024-01-01', 2), ('2024-01-02', 1)])
+        self.assertEqual(self.index.count_by('region'),
+                         [((36.0, -2.0), 2), ((39.0, -5.0), 1)])
+        self.assertEqual(self.index.count_by('region', cell=10),
+                         [((30.0, -10.0), 3)])
+
+    def test_regions_too_far_for_the_cell_are_skipped_false(self):
+        """Test coordinates overflowing over a tiny cell have no region."""
+        self.assertEqual(self.index.count_by('region', cell=1e-310), [])
+
+    def test_histogram_true(self):
+        """Test redflags are binned into cells from the south west corner."""
+        self.assertEqual(self.index.histogram((36, -5, 40, -1), 1.0),
+                         [(0, 3, 2), (3, 0, 1)])
+        self.assertEqual(self.index.histogram((36, -5, 40, -1), 10),
+                         [(0, 0, 3)])
+        self.assertEqual(self.index.histogram((36.8, -1.28, 37, -1), 0.1),
+                         [(0, 0, 1)])
+        self.assertEqual(self.index.histogram((0, 0, 1, 1), 0.5), [])
+
+    def test_discard_and_replace_true(self):
+        """Test dead rows are skipped and replaced rows are counted once."""
+        self.index.discard(2, None)
+        self.index.discard(3, None)
+        self.index.add(3, redflag(3, 2, '36.80, -1.28', 'Bribe',
+                                  datetime(2024, 1, 2)))
+        self.assertEqual(self.index.select(title='Bribe'), [1, 3])
+        self.assertEqual(self.index.count_by('creator'), [(1, 2), (2, 1)])
+        self.assertEqual(len(self.index), 3)
+
+    def test_overflowing_row_is_not_added_false(self):
+        """Test a value too large for its column leaves every column alone."""
+        with self.assertRaises(OverflowError):
+            self.index.add(5, redflag(5, 10 ** 20, '1.0, 1.0', 'Spam',
+                                      datetime(2024, 2, 1)))
+        lengths = {len(column) for column in self.index._columns.values()}
+        self.assertEqual(lengths, {4})
+        self.index.discard(4, None)
+        self.assertEqual(self.index.select(creator=1), [1, 3])
+
+    def test_compaction_keeps_live_rows_true(self):
+        """Test dropping dead rows keeps the live ones."""
+        for record_id in range(5, 2 * columns.COMPACT_AFTER + 5):
+            self.index.add(record_id, redflag(
+                record_id, 3, '1.5, 1.5', 'Spam', datetime(2024, 2, 1)))
+        for record_id in range(5, 2 * columns.COMPACT_AFTER + 5):
+            self.index.discard(record_id, None)
+        self.assertLess(len(self.index._columns['ids']),
+                        2 * columns.COMPACT_AFTER)
+        self.assertEqual(self.index.select(), [1, 2, 3, 4])
+        self.assertEqual(self.index.count_by('title'),
+                         [('Bribe', 2), ('Theft', 2)])
+
+
+@unittest.skipUnless(columns.numpy, 'NumPy is not installed')
+class TestVectorizedColumnIndex(TestColumnIndex):
+    """Run the column tests with NumPy."""
+
+    use_numpy = True
+
+
+class TestCounts(unittest.TestCase):
+    """Test the redflag counts endpoint."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        for creator, location in ((1, "36.80, -1.28"), (1, "36.81, -1.29"),
+                                  (2, "39.66, -4.04")):
+            self.client().post('/api/v1/redflags', data={
+                "Created By": creator,
+                "Location": location,
+                "Comment": "Thieves thieves thieves",
+                "Title": "Corruption of the highest order"
+            })
+
+    def tearDown(self):
+        """Remove instance variables."""
+        DB.clear()
+
+    def test_counts_by_creator_true(self):
+        """Test redflags are counted per owner."""
+        res = self.client().get('/api/v1/redflags/counts?by=creator')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()['data'], [
+            {'creator': 1, 'count': 2}, {'creator': 2, 'count': 1}])
+
+    def test_counts_follow_deletes_true(self):
+        """Test deleted redflags are no longer counted."""
+        self.client().delete('/api/v1/redflags/3')
+        res = self.client().get('/api/v1/redflags/counts?by=region&cell=5')
+        self.assertEqual(res.get_json()['data'], [
+            {'region': [35.0, -5.0], 'count': 2}])
+
+    def test_counts_by_unknown_field_false(self):
+        """Test only known fields can be counted."""
+        res = self.client().get('/api/v1/redflags/counts?by=comment')
+        self.assertEqual(res.status_code, 400)
+        res = self.client().get('/api/v1/redflags/counts?by=day&cell=0')
+        self.assertEqual(res.status_code, 400)
+        for cell in ('inf', 'nan', '1e-310'):
+            res = self.client().get(
+                '/api/v1/redflags/counts?by=region&cell=' + cell)
+            self.assertEqual(res.status_code, 400)
+
+    def test_counts_turned_off_false(self):
+        """Test counts are not found without the column index."""
+        DB.use_columns(False)
+        try:
+            res = self.client().get('/api/v1/redflags/counts?by=creator')
+            self.assertEqual(res.status_code, 404)
+            self.client().delete('/api/v1/redflags/3')
+        finally:
+            DB.use_columns(True)
+        res = self.client().get('/api/v1/redflags/counts?by=creator')
+        self.assertEqual(res.get_json()['data'], [
+            {'creator': 1, 'count': 2}])
+
+
+class TestHeatmap(unittest.TestCase):
+    """Test the redflag heatmap endpoint."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        for location in ("36.80, -1.28", "36.81, -1.29", "39.66, -4.04"):
+            self.client().post('/api/v1/redflags', data={
+                "Created By": 1,
+                "Location": location,
+                "Comment": "Thieves thieves thieves",
+                "Title": "Corruption of the highest order"
+            })
+
+    def tearDown(self):
+        """Remove instance variables."""
+        DB.clear()
+
+    def test_heatmap_counts_cells_true(self):
+        """Test cells are listed by their south west corner."""
+        res = self.client().get(
+            '/api/v1/redflags/heatmap?bbox=36,-5,40,-1&cell=2')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()['data'], {
+            'bbox': [36.0, -5.0, 40.0, -1.0], 'cell': 2.0, 'columns': 2,
+            'rows': 2, 'cells': [[36.0, -3.0, 2], [38.0, -5.0, 1]]})
+
+    def test_heatmap_is_cached_until_a_change_true(self):
+        """Test the cached grid is replaced once redflags change."""
+        url = '/api/v1/redflags/heatmap?bbox=36,-5,40,-1&cell=2'
+        self.client().get(url)
+        hits = CACHE.hits
+        self.client().get(url)
+        self.assertEqual(CACHE.hits, hits + 1)
+        self.client().delete('/api/v1/redflags/3')
+        res = self.client().get(url)
+        self.assertEqual(res.get_json()['data']['cells'],
+                         [[36.0, -3.0, 2]])
+
+    def test_heatmap_rejects_bad_grids_false(self):
+        """Test the bbox and cell size are checked."""
+        for query in ('bbox=1,2,3', 'bbox=40,-5,36,-1',
+                      'bbox=36,-5,40,-1&cell=-1', 'bbox=0,0,nan,10',
+                      'bbox=0,0,inf,10', 'bbox=36,-5,40,-1&cell=inf',
+                      'bbox=36,-5,40,-1&cell=nan', 'bbox=-1e308,0,1e308,1',
+                      'bbox=-180,-90,180,90&cell=0.01',
+                      'bbox=-180,-90,180,90&cell=1e-320'):
+            res = self.client().get('/api/v1/redflags/heatmap?' + query)
+            self.assertEqual(res.status_code, 400)
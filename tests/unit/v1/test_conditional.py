@@ -0,0 +1,74 @@
+"""Contains the tests for conditional requests on redflags."""
+import unittest
+
+from app import create_app
+
+from app.api_1_0.backends import MemoryIncidentBackend
+from app.api_1_0.views import DB
+
+
+class TestConditional(unittest.TestCase):
+    """Test ETags and If-None-Match handling."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.redflag = {
+            "Created By": 1,
+            "Location": "23.0, 34.5",
+            "Comment": "Thieves thieves thieves",
+            "Title": "Corruption of the highest order"
+        }
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        self.client().post('/api/v1/redflags', data=self.redflag)
+
+    def tearDown(self):
+        """Remove instance variables."""
+        del self.redflag
+        DB.clear()
+
+    def test_unchanged_redflag_not_modified_true(self):
+        """Test a redflag is not sent again if the tag matches."""
+        res = self.client().get('/api/v1/redflags/1')
+        etag = res.headers['ETag']
+        res = self.client().get('/api/v1/redflags/1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.get_data(), b'')
+
+    def test_edited_redflag_modified_true(self):
+        """Test a redflag is sent again after it changes."""
+        etag = self.client().get('/api/v1/redflags/1').headers['ETag']
+        self.client().patch('/api/v1/redflags/1/comments',
+                            data={"Comment": "Clerks are taking bribes"})
+        res = self.client().get('/api/v1/redflags/1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers['ETag'], etag)
+
+    def test_unchanged_collection_not_modified_true(self):
+        """Test the redflag list is not sent again if nothing changed."""
+        etag = self.client().get('/api/v1/redflags').headers['ETag']
+        res = self.client().get('/api/v1/redflags',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 304)
+
+    def test_collection_changes_after_delete_true(self):
+        """Test deleting a redflag changes the collection tag."""
+        self.client().post('/api/v1/redflags', data=self.redflag)
+        etag = self.client().get('/api/v1/redflags').headers['ETag']
+        self.client().delete('/api/v1/redflags/2')
+        res = self.client().get('/api/v1/redflags',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+
+    def test_tags_change_after_a_restart_true(self):
+        """Test a new memory backend never matches the tags of an old one."""
+        DB.use(MemoryIncidentBackend())
+        self.client().post('/api/v1/redflags', data=self.redflag)
+        etag = self.client().get('/api/v1/redflags/1').headers['ETag']
+        DB.use(MemoryIncidentBackend())
+        self.client().post('/api/v1/redflags', data=self.redflag)
+        res = self.client().get('/api/v1/redflags/1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
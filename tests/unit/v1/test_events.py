@@ -0,0 +1,87 @@
+"""Contains the tests for the live redflag event stream."""
+import json
+import unittest
+
+from app import create_app
+from app.api_1_0.events import Event, EventHub, Subscription
+
+from app.api_1_0.views import DB
+
+
+class TestEventHub(unittest.TestCase):
+    """Test events fan out without waiting for subscribers."""
+
+    def test_full_queue_drops_oldest_true(self):
+        """Test a slow subscriber loses its oldest events."""
+        subscription = Subscription(2)
+        for version in (1, 2, 3):
+            subscription.put(Event('deleted', version, version))
+        events, dropped = subscription.get(0)
+        self.assertEqual([event.version for event in events], [2, 3])
+        self.assertEqual(dropped, 1)
+        self.assertEqual(subscription.get(0), ([], 0))
+
+    def test_publish_reaches_every_subscriber_true(self):
+        """Test each subscriber gets the same event until it leaves."""
+        hub = EventHub(queue_size=4)
+        first, second = hub.subscribe(), hub.subscribe()
+        event = Event('deleted', 5, 2)
+        hub.publish(event)
+        hub.unsubscribe(first)
+        hub.publish(Event('cleared', 6))
+        self.assertEqual(len(hub), 1)
+        self.assertEqual(first.get(0), ([event], 0))
+        self.assertEqual([e.version for e in second.get(0)[0]], [5, 6])
+        self.assertEqual(event.message, 'id: 5\nevent: deleted\n'
+                         'data: {"Version": 5, "Id": 2}\n\n')
+
+
+class TestEvents(unittest.TestCase):
+    """Test the redflag event stream endpoint."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.app.config['EVENT_KEEPALIVE'] = 0.01
+        self.client = self.app.test_client
+
+    def tearDown(self):
+        """Remove instance variables."""
+        DB.clear()
+
+    @staticmethod
+    def message(stream):
+        """Return the event name and data of the next message."""
+        lines = next(stream).decode().split('\n\n')[0].splitlines()
+        fields = dict(line.split(': ', 1) for line in lines)
+        return fields.get('event'), json.loads(fields.get('data', 'null'))
+
+    def test_stream_pushes_changes_true(self):
+        """Test creates, updates and deletes are pushed in order."""
+        res = self.client().get('/api/v1/redflags/events', buffered=False)
+        self.assertEqual(res.mimetype, 'text/event-stream')
+        stream = iter(res.response)
+        self.assertEqual(next(stream), b'retry: 3000\n\n')
+        self.assertEqual(next(stream), b': keepalive\n\n')
+        self.client().post('/api/v1/redflags', data={
+            "Created By": 1,
+            "Location": "36.80, -1.28",
+            "Comment": "Thieves thieves thieves",
+            "Title": "Corruption of the highest order"
+        })
+        self.client().patch('/api/v1/redflags/1/status',
+                            data={"Status": "resolved"})
+        self.client().delete('/api/v1/redflags/1')
+        kind, data = self.message(stream)
+        self.assertEqual((kind, data['Id']), ('created', 1))
+        self.assertEqual(data['Redflag']['Status'], 'draft')
+        kind, data = self.message(stream)
+        self.assertEqual(kind, 'updated')
+        self.assertEqual(data['Redflag']['Status'], 'resolved')
+        kind, data = self.message(stream)
+        self.assertEqual(kind, 'deleted')
+        self.assertNotIn('Redflag', data)
+        self.assertEqual(data['Version'], DB.version)
+        subscribers = len(DB.events)
+        res.close()
+        self.assertEqual(len(DB.events), subscribers - 1)
@@ -0,0 +1,56 @@
+"""Contains the tests for exporting redflags."""
+import json
+import unittest
+
+from app import create_app
+
+from app.api_1_0.views import DB
+
+
+class TestExport(unittest.TestCase):
+    """Test streaming all redflags."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.redflag = {
+            "Created By": 1,
+            "Location": "23.0, 34.5",
+            "Comment": "Thieves thieves thieves",
+            "Title": "Corruption of the highest order"
+        }
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+
+    def tearDown(self):
+        """Remove instance variables."""
+        del self.redflag
+        DB.clear()
+
+    def test_export_ndjson_true(self):
+        """Test every redflag is exported on its own line."""
+        for _ in range(3):
+            self.client().post('/api/v1/redflags', data=self.redflag)
+        res = self.client().get('/api/v1/redflags/export')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, 'application/x-ndjson')
+        lines = res.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['Id'] for line in lines],
+                         [1, 2, 3])
+
+    def test_export_json_true(self):
+        """Test redflags can be exported as a JSON array."""
+        for _ in range(2):
+            self.client().post('/api/v1/redflags', data=self.redflag)
+        res = self.client().get('/api/v1/redflags/export?format=json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.get_json()), 2)
+
+    def test_export_json_without_redflags_true(self):
+        """Test exporting no redflags gives an empty array."""
+        res = self.client().get('/api/v1/redflags/export?format=json')
+        self.assertEqual(res.get_json(), [])
+
+    def test_export_unknown_format_false(self):
+        """Test only known export formats are accepted."""
+        res = self.client().get('/api/v1/redflags/export?format=xml')
+        self.assertEqual(res.status_code, 400)
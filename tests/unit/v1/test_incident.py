@@ -61,6 +61,21 @@ class TestRecord(unittest.TestCase):
         self.assertEqual(res['error'][0],
                          'Coordinates should be floating point values')
 
+    def test_create_redflag_off_the_globe_false(self):
+        """Test redflag coordinates are finite and on the globe."""
+        for location in ("nan, inf", "500, 500", "36.8, -91"):
+            redflag = {
+                "Created By": 1,
+                "Location": location,
+                "Comment": "Thieves thieves thieves",
+                "Title": "Corruption of the highest order"
+            }
+            res = self.client().post('/api/v1/redflags', data=redflag)
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(res.get_json()['error'][0],
+                             'Location should be a longitude between -180 '
+                             'and 180 and a latitude between -90 and 90')
+
     def test_create_redflag_without_created_by_false(self):
         """Test user cannot create redflag without redflag owner."""
         redflag = {
@@ -76,6 +91,22 @@ class TestRecord(unittest.TestCase):
         self.assertEqual(res['message']['Created By'],
                          'Created By is required')
 
+    def test_create_redflag_with_huge_created_by_false(self):
+        """Test redflag owners must fit in a 64-bit id."""
+        redflag = {
+            "Created By": 10 ** 20,
+            "Location": "34.5, 45.6",
+            "Comment": "Thieves thieves thieves",
+            "Title": "Corruption of the highest order"
+        }
+
+        res = self.client().post('/api/v1/redflags', data=redflag)
+        self.assertEqual(res.status_code, 400)
+        res = res.get_json()
+        self.assertEqual(res['error'][0],
+                         'Created By should be between 1 and {}'.format(
+                             2 ** 63 - 1))
+
     def test_create_redflag_without_location_false(self):
         """Test user cannot create redflag without location."""
         redflag = {
@@ -303,6 +334,16 @@ class TestRecord(unittest.TestCase):
         self.assertEqual(res['error'][0],
                          "Coordinates should be floating point values")
 
+    def test_edit_record_off_the_globe_false(self):
+        """Test user cannot move a redflag off the globe."""
+        res = self.client().post('/api/v1/redflags', data=self.redflag)
+        self.assertEqual(res.status_code, 201)
+        res = self.client().patch('/api/v1/redflags/1/location',
+                                  data={"Location": "181, 0"})
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(self.client().get('/api/v1/redflags/1').get_json()[
+            'data']['1']['Location'], self.redflag['Location'])
+
     def test_edit_record_with_only_one_location_false(self):
         """Test user cannot edit location with invalid location."""
         res = self.client().post('/api/v1/redflags',
@@ -331,3 +372,31 @@ class TestRecord(unittest.TestCase):
         res = res.get_json()
         self.assertEqual(res['error'][0],
                          "Location should not be empty")
+
+    def test_ids_not_reused_after_delete_true(self):
+        """Test a new redflag does not take the id of a deleted one."""
+        res = self.client().post('/api/v1/redflags', data=self.redflag)
+        self.assertEqual(res.get_json()['data']['Id'], 1)
+        res = self.client().post('/api/v1/redflags', data=self.redflag)
+        self.assertEqual(res.get_json()['data']['Id'], 2)
+        result = self.client().delete('/api/v1/redflags/1')
+        self.assertEqual(result.status_code, 200)
+        res = self.client().post('/api/v1/redflags', data=self.redflag)
+        self.assertEqual(res.get_json()['data']['Id'], 3)
+        result = self.client().get('/api/v1/redflags/2')
+        self.assertEqual(result.status_code, 200)
+
+    def test_create_redflag_reports_errors_per_field_false(self):
+        """Test every invalid field is reported under its name."""
+        redflag = {
+            "Created By": 1,
+            "Location": "23.5",
+            "Comment": "",
+            "Title": "Corruption of the highest order"
+        }
+        res = self.client().post('/api/v1/redflags', data=redflag)
+        self.assertEqual(res.status_code, 400)
+        res = res.get_json()
+        self.assertEqual(res['fields'], {
+            'Location': 'Two coordinates required',
+            'Comment': 'Comments cannot be empty'})
@@ -0,0 +1,240 @@
+"""Contains the tests for the journaled memory backends."""
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from app.api_1_0.backends.binary import MappedColumn, SnapshotFile, \
+    write_snapshot
+from app.api_1_0.backends.journal import Journal, \
+    JournaledIncidentBackend, JournaledUserBackend
+from app.api_1_0.backends.memory import CHUNK_BITS
+from app.api_1_0.records import IncidentRecord, UserRecord
+from app.api_1_0.store import IncidentStore, UserRegistry
+
+
+class TestJournal(unittest.TestCase):
+    """Test changes survive reopening the journal."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.open()
+
+    def tearDown(self):
+        """Close and remove the journals."""
+        self.store.backend.close()
+        self.users.backend.close()
+        self.directory.cleanup()
+
+    def open(self, snapshot_every=10000):
+        """Open stores replaying the journals."""
+        self.store = IncidentStore(JournaledIncidentBackend(
+            Journal(self.directory.name, 'redflags', snapshot_every)))
+        self.users = UserRegistry(JournaledUserBackend(
+            Journal(self.directory.name, 'users', snapshot_every)))
+
+    def reopen(self, snapshot_every=10000):
+        """Close the stores and open them again."""
+        self.store.backend.close()
+        self.users.backend.close()
+        self.open(snapshot_every)
+
+    def record(self, record_id, creator=1):
+        """Return a redflag with the given id."""
+        return IncidentRecord(id=record_id, created_by=creator,
+                              created_on=datetime(2018, 11, 29, 10),
+                              location='1.0, 2.0', comment='Thieves',
+                              title='Corruption')
+
+    def files(self, kind):
+        """Return the names of the redflag files of a kind."""
+        return sorted(name for name in os.listdir(self.directory.name)
+                      if name.startswith('redflags')
+                      and name.endswith(kind))
+
+    def test_changes_are_replayed_true(self):
+        """Test redflags, versions and users are recovered."""
+        self.store.add_many([(self.store.next_id(), self.record(1)),
+                             (self.store.next_id(), self.record(2))])
+        self.store.update(2, Comment='Changed')
+        self.store.remove(1)
+        self.users.add('john@doe.com', UserRecord(
+            email='john@doe.com', password='secret12', id=1))
+        version = self.store.version
+        tag = self.store.record_version(2)
+        self.reopen()
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.get(2)['Comment'], 'Changed')
+        self.assertEqual(self.store.version, version)
+        self.assertEqual(self.store.record_version(2), tag)
+        self.assertEqual(self.store.next_id(), 3)
+        self.assertEqual(self.users.get('john@doe.com').id, 1)
+        self.assertEqual(self.users.next_id(), 2)
+
+    def test_snapshot_replaces_old_logs_true(self):
+        """Test a snapshot is written and only the journal tail is kept."""
+        self.reopen(snapshot_every=3)
+        for record_id in range(1, 8):
+            self.store.add(record_id, self.record(record_id))
+        self.store.remove(3)
+        self.store.backend.journal.close()
+        self.assertEqual(len(self.files('.snapshot')), 1)
+        self.assertEqual(len(self.files('.log')), 1)
+        version = self.store.version
+        self.reopen()
+        self.assertEqual([record['Id'] for record in
+                          self.store.iter_records()], [1, 2, 4, 5, 6, 7])
+        self.assertEqual(self.store.version, version)
+
+    def test_torn_entry_is_dropped_true(self):
+        """Test an entry cut short by a crash is ignored and overwritten."""
+        self.store.add(1, self.record(1))
+        path = os.path.join(self.directory.name, self.files('.log')[0])
+        with open(path, 'ab') as log:
+            log.write(b'["put", 2, {"Id"')
+        self.reopen()
+        self.assertEqual(len(self.store), 1)
+        self.store.add(2, self.record(2))
+        self.reopen()
+        self.assertEqual(self.store.get(2), self.record(2))
+
+    def test_concurrent_writes_are_durable_true(self):
+        """Test every write of concurrent writers is recovered."""
+        def write(start):
+            for record_id in range(start, start + 50):
+                self.store.add(record_id, self.record(record_id))
+
+        writers = [threading.Thread(target=write, args=(start,))
+                   for start in range(1, 401, 50)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        self.reopen()
+        self.assertEqual(len(self.store), 400)
+
+    def test_snapshot_records_can_change_true(self):
+        """Test redflags loaded from a snapshot can be changed."""
+        self.reopen(snapshot_every=4)
+        far = 3 << CHUNK_BITS
+        for record_id in (1, 2, far, far + 1):
+            self.store.add(record_id, self.record(record_id))
+        self.store.backend.journal.close()
+        self.reopen(snapshot_every=4)
+        self.assertEqual(len(self.store), 4)
+        chunks = self.store.backend._snapshot.chunks
+        self.assertIsInstance(chunks[3].records, MappedColumn)
+        self.store.update(far, Title='Changed')
+        self.store.remove(1)
+        self.store.add(5, self.record(5))
+        items, more = self.store.page(0, 10)
+        self.assertEqual([next(iter(item)) for item in items],
+                         [2, 5, far, far + 1])
+        self.store.backend.journal.close()
+        self.reopen()
+        self.assertEqual(self.store.get(far)['Title'], 'Changed')
+        self.assertEqual(self.store.next_id(), far + 2)
+
+    def test_indexes_load_from_snapshot_true(self):
+        """Test indexes loaded from snapshot columns match added ones."""
+        self.reopen(snapshot_every=5)
+        far = 3 << CHUNK_BITS
+        records = [self.record(1), self.record(2, creator=2),
+                   self.record(3).replace(Status='resolved'),
+                   self.record(far).replace(Location='somewhere'),
+                   self.record(far + 1)]
+        for record in records:
+            self.store.add(record.id, record)
+        self.store.backend.journal.close()
+        self.reopen()
+        self.store.update(far + 1, Title='Changed')
+        records[-1] = self.store.get(far + 1)
+        rows, items = self.store.backend.index_rows()
+        self.assertEqual(list(rows[0].column('ids')), [1, 2])
+        self.assertEqual([record_id for record_id, record in items],
+                         [3, far, far + 1])
+        self.store.use(self.store.backend)
+        expected = IncidentStore()
+        for record in records:
+            expected.add(record.id, record)
+        for store in (self.store, expected):
+            self.assertEqual(store.spatial.within(0, 0, 5, 5),
+                             [1, 2, 3, far + 1])
+        self.assertEqual(self.store.timeline.page(limit=10),
+                         expected.timeline.page(limit=10))
+        self.assertEqual(self.store.stats.report(), expected.stats.report())
+        self.assertEqual(self.store.columns.count_by('title'),
+                         expected.columns.count_by('title'))
+        self.assertEqual(self.store.columns.select(creator=2), [2])
+        self.assertEqual(self.store.text.search('thieves', 10),
+                         expected.text.search('thieves', 10))
+
+
+class TestSnapshotFile(unittest.TestCase):
+    """Test redflags are written to and read from binary snapshots."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'redflags.snapshot')
+
+    def tearDown(self):
+        """Remove the snapshot."""
+        self.directory.cleanup()
+
+    def roundtrip(self, rows, version=7, last_id=9):
+        """Write rows to a snapshot and open it."""
+        with open(self.path, 'wb') as file:
+            write_snapshot(file, rows, version, last_id)
+        return SnapshotFile(self.path)
+
+    def record(self, record_id):
+        """Return a redflag with the given id."""
+        return IncidentRecord(id=record_id, created_by=1,
+                              created_on=datetime(2018, 11, 29, 10),
+                              location='1.0, 2.0', comment='Thieves',
+                              title='Corruption')
+
+    def test_records_are_rebuilt_true(self):
+        """Test redflags read back equal, with text kept when needed."""
+        usual = IncidentRecord(
+            id=1, created_by=2, created_on=datetime(2018, 11, 29, 10, 0, 0,
+                                                    125000),
+            location='0.3476, 32.5825', comment='Théft', title='Bribe')
+        odd = usual.replace(Id=2, Location='1, 2', Status='resolved',
+                            **{'Date Created': 'yesterday'})
+        snapshot = self.roundtrip([(1, 4, usual), (2, 5, odd)])
+        self.assertEqual((len(snapshot), snapshot.version,
+                          snapshot.last_id), (2, 7, 9))
+        chunk = snapshot.chunks()[0]
+        self.assertEqual(list(chunk.ids), [1, 2])
+        self.assertEqual(dict(chunk.records), {1: usual, 2: odd})
+        self.assertEqual(chunk.records[1].created_on, usual.created_on)
+        self.assertEqual(dict(chunk.versions), {1: 4, 2: 5})
+        self.assertNotIn(3, chunk.records)
+
+    def test_chunks_follow_ids_true(self):
+        """Test redflags are split into chunks by id."""
+        ids = [1, 2, 1 << CHUNK_BITS, (5 << CHUNK_BITS) + 3]
+        snapshot = self.roundtrip(
+            [(record_id, 1, self.record(record_id)) for record_id in ids])
+        chunks = snapshot.chunks()
+        self.assertEqual(sorted(chunks), [0, 1, 5])
+        self.assertEqual(list(chunks[5].ids), [(5 << CHUNK_BITS) + 3])
+        self.assertEqual(chunks[1].records[1 << CHUNK_BITS],
+                         self.record(1 << CHUNK_BITS))
+
+    def test_empty_snapshot_true(self):
+        """Test a snapshot without redflags."""
+        snapshot = self.roundtrip([], version=3, last_id=0)
+        self.assertEqual(len(snapshot), 0)
+        self.assertEqual(snapshot.chunks(), {})
+
+    def test_other_files_are_rejected_true(self):
+        """Test files that are not snapshots raise ValueError."""
+        with open(self.path, 'wb') as file:
+            file.write(b'{"version": 1}\n' + bytes(40))
+        with self.assertRaises(ValueError):
+            SnapshotFile(self.path)
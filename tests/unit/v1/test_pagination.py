@@ -0,0 +1,71 @@
+"""Contains the tests for paging through redflags."""
+import unittest
+
+from app import create_app
+
+from app.api_1_0.views import DB
+
+
+class TestPagination(unittest.TestCase):
+    """Test listing redflags page by page."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.redflag = {
+            "Created By": 1,
+            "Location": "23.0, 34.5",
+            "Comment": "Thieves thieves thieves",
+            "Title": "Corruption of the highest order"
+        }
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        for _ in range(5):
+            self.client().post('/api/v1/redflags', data=self.redflag)
+
+    def tearDown(self):
+        """Remove instance variables."""
+        del self.redflag
+        DB.clear()
+
+    def test_limit_restricts_page_size_true(self):
+        """Test only limit redflags are returned with a next link."""
+        res = self.client().get('/api/v1/redflags?limit=2')
+        self.assertEqual(res.status_code, 200)
+        res = res.get_json()
+        self.assertEqual(len(res['data']), 2)
+        self.assertIsNotNone(res['next'])
+
+    def test_follow_next_links_visits_all_redflags_true(self):
+        """Test following next links returns every redflag once."""
+        url = '/api/v1/redflags?limit=2'
+        ids = []
+        while url:
+            res = self.client().get(url).get_json()
+            ids.extend(int(next(iter(item))) for item in res['data'])
+            url = res['next']
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+
+    def test_pages_skip_deleted_redflags_true(self):
+        """Test pages stay in id order after a delete."""
+        self.client().delete('/api/v1/redflags/2')
+        res = self.client().get('/api/v1/redflags?limit=2').get_json()
+        ids = [int(next(iter(item))) for item in res['data']]
+        self.assertEqual(ids, [1, 3])
+        res = self.client().get(res['next']).get_json()
+        ids = [int(next(iter(item))) for item in res['data']]
+        self.assertEqual(ids, [4, 5])
+        self.assertIsNone(res['next'])
+
+    def test_invalid_cursor_false(self):
+        """Test a cursor that was not issued by the api is rejected."""
+        res = self.client().get('/api/v1/redflags?cursor=***')
+        self.assertEqual(res.status_code, 400)
+        res = res.get_json()
+        self.assertEqual(res['error'], 'Invalid cursor')
+
+    def test_limit_out_of_range_false(self):
+        """Test limit must be within the allowed page sizes."""
+        res = self.client().get('/api/v1/redflags?limit=0')
+        self.assertEqual(res.status_code, 400)
+        res = self.client().get('/api/v1/redflags?limit=1000')
+        self.assertEqual(res.status_code, 400)
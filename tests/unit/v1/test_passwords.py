@@ -0,0 +1,97 @@
+"""Contains the tests for password hashing."""
+import threading
+import time
+import unittest
+
+from app import create_app
+from app.api_1_0.passwords import HasherBusy, PasswordHasher, check_hash, \
+    encode_hash, parse_hash
+from app.api_1_0.records import UserRecord
+
+from app.api_1_0.views import HASHER, USERS
+
+
+class TestPasswordHasher(unittest.TestCase):
+    """Test hashes keep their parameters and the pool stays bounded."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.hasher = PasswordHasher(iterations=1000, workers=1,
+                                     queue_size=0)
+
+    def test_hashes_keep_parameters_true(self):
+        """Test a hash holds its cost and salt and checks the password."""
+        stored = self.hasher.hash('pass1234')
+        self.assertTrue(stored.startswith('pbkdf2_sha256$1000$'))
+        self.assertEqual(parse_hash(stored)[0], 1000)
+        self.assertNotEqual(self.hasher.hash('pass1234'), stored)
+        self.assertEqual(self.hasher.verify('pass1234', stored),
+                         (True, False))
+        self.assertEqual(self.hasher.verify('pass5678', stored),
+                         (False, False))
+
+    def test_outdated_hashes_need_rehash_true(self):
+        """Test older costs and unhashed passwords are flagged."""
+        self.assertEqual(self.hasher.verify('pass1234',
+                                            encode_hash('pass1234', 10)),
+                         (True, True))
+        self.assertEqual(self.hasher.verify('pass1234', 'pass1234'),
+                         (True, True))
+        self.assertFalse(check_hash('pass1234', 'pbkdf2_sha256$1$*$*'))
+
+    def test_full_pool_refuses_work_false(self):
+        """Test calls fail at once while every slot is taken."""
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=self.hasher._run, args=(block,))
+        thread.start()
+        started.wait(5)
+        with self.assertRaises(HasherBusy):
+            self.hasher.hash('pass1234')
+        release.set()
+        thread.join()
+        for _ in range(100):
+            try:
+                self.hasher.hash('pass1234')
+                break
+            except HasherBusy:
+                time.sleep(0.01)
+        else:
+            self.fail('the pool slot was never released')
+
+
+class TestPasswordStorage(unittest.TestCase):
+    """Test signup and login store and upgrade password hashes."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        self.logins = {"Email": "user@example.com", "Password": "pass1234"}
+
+    def tearDown(self):
+        """Clean up after test."""
+        USERS.clear()
+
+    def test_signup_stores_hash_true(self):
+        """Test raw passwords are never stored."""
+        self.client().post('/api/v1/auth/signup', data=dict(
+            self.logins, **{"Confirm Password": "pass1234"}))
+        stored = USERS.get(self.logins['Email']).password
+        self.assertNotIn('pass1234', stored)
+        self.assertEqual(parse_hash(stored)[0], HASHER.iterations)
+
+    def test_login_rehashes_old_passwords_true(self):
+        """Test unhashed and cheaper hashes are replaced at login."""
+        for password in ('pass1234', encode_hash('pass1234', 10)):
+            USERS.add(self.logins['Email'], UserRecord(
+                email=self.logins['Email'], password=password, id=1))
+            res = self.client().post('/api/v1/auth/login', data=self.logins)
+            self.assertEqual(res.status_code, 200)
+            stored = USERS.get(self.logins['Email']).password
+            self.assertEqual(parse_hash(stored)[0], HASHER.iterations)
+            self.assertTrue(check_hash('pass1234', stored))
@@ -0,0 +1,148 @@
+"""Contains the tests for the PostgreSQL backends.
+
+They run against the database named by POSTGRES_TEST_URL, for example
+postgresql://localhost/ireporter_test, and are skipped when it is not set.
+Every table of that database used by the api is emptied.
+"""
+import os
+import threading
+import unittest
+from datetime import datetime
+
+from app import create_app
+from app.api_1_0.backends.memory import MemoryIncidentBackend
+from app.api_1_0.records import IncidentRecord, UserRecord
+from app.api_1_0.store import IncidentStore, UserRegistry
+from app.api_1_0.views import DB
+
+URL = os.environ.get('POSTGRES_TEST_URL')
+
+if URL:
+    from app.api_1_0.backends.postgres import COPY_THRESHOLD, \
+        ConnectionPool, PoolTimeout, PostgresIncidentBackend, \
+        PostgresUserBackend
+
+
+@unittest.skipUnless(URL, 'POSTGRES_TEST_URL is not set')
+class TestPostgresStore(unittest.TestCase):
+    """Test the stores kept in a PostgreSQL database."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.pool = ConnectionPool(URL, size=2, timeout=0.1)
+        self.store = IncidentStore(PostgresIncidentBackend(self.pool))
+        self.users = UserRegistry(PostgresUserBackend(self.pool))
+        self.store.clear()
+        self.users.clear()
+
+    def tearDown(self):
+        """Empty and close the database."""
+        self.store.clear()
+        self.users.clear()
+        self.pool.close()
+
+    def record(self, record_id, creator=1):
+        """Return a redflag with the given id."""
+        return IncidentRecord(id=record_id, created_by=creator,
+                              created_on=datetime(2018, 11, 29, 10),
+                              location='1.0, 2.0', comment='Thieves',
+                              title='Corruption')
+
+    def test_redflags_survive_reopening_true(self):
+        """Test redflags, ids and versions are kept in the database."""
+        self.store.add_many([(self.store.next_id(), self.record(1)),
+                             (self.store.next_id(), self.record(2))])
+        self.store.update(2, Comment='Changed')
+        self.store.remove(1)
+        version = self.store.version
+        store = IncidentStore(PostgresIncidentBackend(self.pool))
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.get(2)['Comment'], 'Changed')
+        self.assertEqual(store.version, version)
+        self.assertEqual(store.next_id(), 3)
+
+    def test_backends_share_ids_and_versions_true(self):
+        """Test backends sharing a database read the same counters."""
+        other = IncidentStore(PostgresIncidentBackend(self.pool))
+        version = self.store.version
+        ids = [self.store.next_id(), other.next_id(), self.store.next_id()]
+        self.assertEqual(ids, [1, 2, 3])
+        self.store.add(1, self.record(1))
+        other.add(2, self.record(2))
+        self.store.add_many([(3, self.record(3)), (1, self.record(1, 2))])
+        self.assertEqual(other.version, version + 4)
+        self.assertEqual(self.store.version, version + 4)
+        self.assertEqual(self.store.backend.record_version(1), version + 4)
+        self.assertEqual(len(other), 3)
+        other.remove(3)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(other.version, version + 5)
+
+    def test_owners_are_64_bit_true(self):
+        """Test owners past 32 bits are saved."""
+        self.store.add(1, self.record(1, creator=2 ** 40))
+        self.assertEqual(self.store.get(1)['Created By'], 2 ** 40)
+
+    def test_large_batch_is_copied_true(self):
+        """Test batches loaded with COPY are saved and counted."""
+        count = COPY_THRESHOLD + 1
+        self.store.add_many([(record_id, self.record(record_id))
+                             for record_id in range(1, count + 1)])
+        self.assertEqual(len(self.store), count)
+        self.assertEqual(sum(1 for record in self.store.iter_records()),
+                         count)
+        items, more = self.store.page(count - 1, 5)
+        self.assertEqual(items, [{count: self.record(count)}])
+        self.assertFalse(more)
+
+    def test_select_keeps_order_true(self):
+        """Test selections return existing redflags in the given order."""
+        self.store.add_many([(record_id, self.record(record_id))
+                             for record_id in range(1, 4)])
+        items = self.store.select([3, 9, 1])
+        self.assertEqual([next(iter(item)) for item in items], [3, 1])
+
+    def test_users_are_saved_true(self):
+        """Test users are found by email and counted once."""
+        user = UserRecord(email='john@doe.com', password='secret12', id=1)
+        self.users.add('John@Doe.com', user)
+        self.users.add('john@doe.com', user)
+        self.assertEqual(len(self.users), 1)
+        self.assertEqual(self.users.get('JOHN@doe.com'), user)
+
+    def test_pool_is_bounded_true(self):
+        """Test borrowers wait for a connection and then time out."""
+        borrowed = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with self.pool.connection():
+                borrowed.set()
+                release.wait()
+
+        holders = [threading.Thread(target=hold) for _ in range(2)]
+        for holder in holders:
+            holder.start()
+            borrowed.wait()
+            borrowed.clear()
+        with self.assertRaises(PoolTimeout):
+            with self.pool.connection():
+                pass
+        release.set()
+        for holder in holders:
+            holder.join()
+        with self.pool.connection() as connection:
+            self.assertFalse(connection.closed)
+
+    def test_busy_pool_answers_503_true(self):
+        """Test requests get 503 while no connection is free."""
+        client = create_app('testing').test_client()
+        DB.use(PostgresIncidentBackend(ConnectionPool(URL, size=1,
+                                                      timeout=0.1)))
+        try:
+            with DB.backend.pool.connection():
+                res = client.get('/api/v1/redflags/1')
+        finally:
+            DB.use(MemoryIncidentBackend())
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.get_json()['status'], 503)
@@ -0,0 +1,75 @@
+"""Contains the tests for the stored record classes."""
+import json
+import unittest
+from datetime import datetime
+
+from app.api_1_0.records import IncidentRecord, UserRecord
+from app.api_1_0.serializers import encode
+from app.utils import parse_datetime
+
+
+class TestRecords(unittest.TestCase):
+    """Test records read and serialize like the dicts they replace."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.record = IncidentRecord(
+            id=1, created_by=2, created_on=datetime(2018, 11, 29, 10, 5),
+            location='0.3476, 32.5825', comment='Thieves', title='Bribe')
+        self.public = {'Id': 1, 'Created By': 2,
+                       'Date Created': '2018-11-29 10:05:00',
+                       'Location': '0.3476, 32.5825', 'Comment': 'Thieves',
+                       'Title': 'Bribe', 'Status': 'draft'}
+
+    def test_records_have_no_dict_true(self):
+        """Test records keep their fields in slots only."""
+        self.assertFalse(hasattr(self.record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            self.record.priority = 1
+
+    def test_record_reads_like_dict_true(self):
+        """Test records compare equal to and convert into public dicts."""
+        self.assertEqual(self.record, self.public)
+        self.assertEqual(self.record['Date Created'], '2018-11-29 10:05:00')
+        self.assertEqual(list(self.record.to_dict()), list(self.public))
+        with self.assertRaises(KeyError):
+            self.record['created_on']
+
+    def test_replace_returns_copy_true(self):
+        """Test replace leaves the original record unchanged."""
+        updated = self.record.replace(Comment='Changed')
+        self.assertEqual(updated.comment, 'Changed')
+        self.assertEqual(self.record.comment, 'Thieves')
+        self.assertEqual(updated.created_on, self.record.created_on)
+
+    def test_from_dict_parses_dates_true(self):
+        """Test records rebuilt from public dicts get native dates."""
+        record = IncidentRecord.from_dict(self.public)
+        self.assertEqual(record.created_on, datetime(2018, 11, 29, 10, 5))
+        self.public.pop('Status')
+        self.assertEqual(IncidentRecord.from_dict(self.public).status,
+                         'draft')
+        user = UserRecord.from_dict({'Email': 'john@doe.com',
+                                     'Password': 'secret12', 'Id': 3})
+        self.assertEqual(user.id, 3)
+
+    def test_dates_are_parsed_without_fromisoformat_true(self):
+        """Test the str() forms of dates and ISO 8601 query dates parse."""
+        created = datetime(2018, 11, 29, 10, 5, 0, 125000)
+        record = IncidentRecord.from_dict(
+            dict(self.public, **{'Date Created': str(created)}))
+        self.assertEqual(record.created_on, created)
+        for text in ('2018-11-29 10:05:00', '2018-11-29T10:05',
+                     '2018-11-29T10:05:00.000', '2018-11-29'):
+            self.assertEqual(parse_datetime(text).date(), created.date())
+        for text in ('2018-11-29T10:05:00+03:00', 'yesterday', ''):
+            with self.assertRaises(ValueError):
+                parse_datetime(text)
+        record = IncidentRecord.from_dict(
+            dict(self.public, **{'Date Created': 'yesterday'}))
+        self.assertEqual(record.created_on, 'yesterday')
+
+    def test_encode_uses_public_fields_true(self):
+        """Test records are encoded as their public dicts."""
+        body = json.loads(encode({'data': [{1: self.record}]}).decode())
+        self.assertEqual(body, {'data': [{'1': self.public}]})
@@ -0,0 +1,57 @@
+"""Contains the tests for searching redflags."""
+import unittest
+
+from app import create_app
+
+from app.api_1_0.views import DB
+
+
+class TestSearch(unittest.TestCase):
+    """Test full text search over redflags."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        for title, comment in (
+                ("Bribery at the land office", "Clerks demand bribes"),
+                ("Stolen relief food", "Officials sold the relief maize"),
+                ("Road funds missing", "The road was never built")):
+            self.client().post('/api/v1/redflags', data={
+                "Created By": 1,
+                "Location": "23.0, 34.5",
+                "Comment": comment,
+                "Title": title
+            })
+
+    def tearDown(self):
+        """Remove instance variables."""
+        DB.clear()
+
+    def search(self, query):
+        """Return the ids of redflags matching a query."""
+        res = self.client().get('/api/v1/redflags/search?q=' + query)
+        self.assertEqual(res.status_code, 200)
+        return [int(next(iter(item))) for item in res.get_json()['data']]
+
+    def test_search_matches_title_and_comment_true(self):
+        """Test words from titles and comments are found."""
+        self.assertEqual(self.search('bribery'), [1])
+        self.assertEqual(self.search('MAIZE'), [2])
+
+    def test_search_ranks_better_matches_first_true(self):
+        """Test redflags matching more words rank higher."""
+        self.assertEqual(self.search('officials clerks bribes'), [1, 2])
+
+    def test_search_follows_edits_and_deletes_true(self):
+        """Test the index is updated when comments change."""
+        self.client().patch('/api/v1/redflags/3/comments',
+                            data={"Comment": "Clerks took bribes"})
+        self.client().delete('/api/v1/redflags/1')
+        self.assertEqual(self.search('clerks'), [3])
+        self.assertEqual(self.search('built'), [])
+
+    def test_search_without_query_false(self):
+        """Test a query is required."""
+        res = self.client().get('/api/v1/redflags/search?q=%20')
+        self.assertEqual(res.status_code, 400)
@@ -0,0 +1,78 @@
+"""Contains the tests for location queries on redflags."""
+import unittest
+
+from app import create_app
+
+from app.api_1_0.views import DB
+
+
+class TestSpatial(unittest.TestCase):
+    """Test finding redflags by location."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        for location in ("36.80, -1.28", "36.81, -1.29", "39.66, -4.04"):
+            self.client().post('/api/v1/redflags', data={
+                "Created By": 1,
+                "Location": location,
+                "Comment": "Thieves thieves thieves",
+                "Title": "Corruption of the highest order"
+            })
+
+    def tearDown(self):
+        """Remove instance variables."""
+        DB.clear()
+
+    @staticmethod
+    def ids(res):
+        """Return the ids of redflags in a response."""
+        return [int(next(iter(item))) for item in res.get_json()['data']]
+
+    def test_nearby_returns_close_redflags_nearest_first_true(self):
+        """Test only redflags within the radius are returned."""
+        res = self.client().get(
+            '/api/v1/redflags/nearby?lat=-1.291&lon=36.811&radius=5')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.ids(res), [2, 1])
+
+    def test_nearby_follows_location_edit_true(self):
+        """Test the index is updated when a location changes."""
+        self.client().patch('/api/v1/redflags/3/location',
+                            data={"Location": "36.80, -1.28"})
+        self.client().delete('/api/v1/redflags/1')
+        res = self.client().get(
+            '/api/v1/redflags/nearby?lat=-1.28&lon=36.80&radius=5')
+        self.assertEqual(self.ids(res), [3, 2])
+
+    def test_nearby_without_coordinates_false(self):
+        """Test lat and lon are required."""
+        res = self.client().get('/api/v1/redflags/nearby?lat=1')
+        self.assertEqual(res.status_code, 400)
+
+    def test_nearby_rejects_impossible_coordinates_false(self):
+        """Test coordinates and radius must be finite and on the globe."""
+        for query in ('lat=nan&lon=36', 'lat=-1&lon=inf', 'lat=91&lon=36',
+                      'lat=-1&lon=-181', 'lat=-1&lon=36&radius=inf',
+                      'lat=-1&lon=36&radius=nan'):
+            res = self.client().get('/api/v1/redflags/nearby?' + query)
+            self.assertEqual(res.status_code, 400)
+
+    def test_within_bounding_box_true(self):
+        """Test redflags inside a bounding box are returned."""
+        res = self.client().get(
+            '/api/v1/redflags/within?bbox=36,-2,37,-1')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.ids(res), [1, 2])
+
+    def test_within_invalid_bounding_box_false(self):
+        """Test bbox must be four numbers."""
+        res = self.client().get('/api/v1/redflags/within?bbox=36,-2,37')
+        self.assertEqual(res.status_code, 400)
+        res = self.client().get('/api/v1/redflags/within?bbox=37,-2,36,-1')
+        self.assertEqual(res.status_code, 400)
+        for bbox in ('-inf,-2,37,-1', '36,-2,37,nan', '36,-91,37,-1',
+                     '-200,-2,37,-1'):
+            res = self.client().get('/api/v1/redflags/within?bbox=' + bbox)
+            self.assertEqual(res.status_code, 400)
@@ -0,0 +1,104 @@
+"""Contains the tests for redflag statuses and totals."""
+import unittest
+from datetime import datetime
+
+from app import create_app
+from app.api_1_0.records import IncidentRecord
+from app.api_1_0.stats import StatsIndex
+
+from app.api_1_0.views import DB
+
+
+class TestStatsIndex(unittest.TestCase):
+    """Test the counters follow every change."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.stats = StatsIndex()
+        self.record = IncidentRecord(
+            id=1, created_by=2, created_on=datetime(2018, 11, 29, 10),
+            location='1.0, 2.0', comment='Thieves', title='Bribe')
+
+    def test_counters_follow_changes_true(self):
+        """Test counts move with adds, changes and deletes."""
+        self.stats.add(1, self.record)
+        self.stats.add(2, self.record.replace(Id=2, **{'Created By': 3}))
+        resolved = self.record.replace(Status='resolved')
+        self.stats.discard(1, self.record)
+        self.stats.add(1, resolved)
+        report = self.stats.report()
+        self.assertEqual(report['total'], 2)
+        self.assertEqual(report['creators'], {2: 1, 3: 1})
+        self.assertEqual(report['days'], {'2018-11-29': 2})
+        self.assertEqual(report['statuses'], {
+            'draft': 1, 'under investigation': 0, 'resolved': 1,
+            'rejected': 0})
+        self.stats.discard(1, resolved)
+        self.assertEqual(self.stats.report()['creators'], {3: 1})
+
+    def test_report_is_kept_until_a_change_true(self):
+        """Test reads between changes share one report."""
+        self.stats.add(1, self.record)
+        report = self.stats.report()
+        self.assertIs(self.stats.report(), report)
+        self.stats.discard(1, self.record)
+        self.assertIsNot(self.stats.report(), report)
+        self.assertEqual(self.stats.report()['total'], 0)
+
+
+class TestStats(unittest.TestCase):
+    """Test the status and stats endpoints."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        for creator in (1, 1, 2):
+            self.client().post('/api/v1/redflags', data={
+                "Created By": creator,
+                "Location": "36.80, -1.28",
+                "Comment": "Thieves thieves thieves",
+                "Title": "Corruption of the highest order"
+            })
+
+    def tearDown(self):
+        """Remove instance variables."""
+        DB.clear()
+
+    def test_new_redflags_are_drafts_true(self):
+        """Test created redflags start as drafts."""
+        res = self.client().get('/api/v1/redflags/1')
+        self.assertEqual(res.get_json()['data']['1']['Status'], 'draft')
+
+    def test_edit_status_true(self):
+        """Test a redflag can move to another status."""
+        res = self.client().patch('/api/v1/redflags/2/status',
+                                  data={"Status": "under investigation"})
+        self.assertEqual(res.status_code, 200)
+        res = self.client().get('/api/v1/redflags/2')
+        self.assertEqual(res.get_json()['data']['2']['Status'],
+                         'under investigation')
+
+    def test_edit_unknown_status_false(self):
+        """Test only known statuses are accepted."""
+        res = self.client().patch('/api/v1/redflags/2/status',
+                                  data={"Status": "closed"})
+        self.assertEqual(res.status_code, 400)
+        res = self.client().patch('/api/v1/redflags/9/status',
+                                  data={"Status": "resolved"})
+        self.assertEqual(res.status_code, 404)
+
+    def test_stats_follow_changes_true(self):
+        """Test totals reflect saves, edits and deletes."""
+        self.client().patch('/api/v1/redflags/2/status',
+                            data={"Status": "rejected"})
+        self.client().delete('/api/v1/redflags/3')
+        res = self.client().get('/api/v1/redflags/stats')
+        self.assertEqual(res.status_code, 200)
+        data = res.get_json()['data']
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['creators'], {'1': 2})
+        self.assertEqual(list(data['days'].values()), [2])
+        self.assertEqual(data['statuses'], {
+            'draft': 1, 'under investigation': 0, 'resolved': 0,
+            'rejected': 1})
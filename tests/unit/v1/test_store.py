@@ -0,0 +1,222 @@
+"""Contains the tests for the incident store."""
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from app.api_1_0.backends.memory import CHUNK_BITS
+from app.api_1_0.backends.sqlite import SQLiteDatabase, \
+    SQLiteIncidentBackend
+from app.api_1_0.controller import Controller
+from app.api_1_0.models import RedFlagModel, User
+from app.api_1_0.passwords import PasswordHasher
+from app.api_1_0.records import IncidentRecord
+from app.api_1_0.store import IncidentStore, UserRegistry
+
+
+def watch_syncs(store):
+    """Record whether another thread could take the lock at each sync."""
+    free = []
+
+    def probe():
+        taken = store.lock.acquire(blocking=False)
+        if taken:
+            store.lock.release()
+        free.append(taken)
+
+    def sync():
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+    store.backend.sync = sync
+    return free
+
+
+class TestIncidentStore(unittest.TestCase):
+    """Test the store under concurrent use."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.store = IncidentStore()
+
+    def record(self, record_id, creator=1):
+        """Return a redflag with the given id."""
+        return IncidentRecord(id=record_id, created_by=creator,
+                              created_on=datetime(2018, 11, 29, 10),
+                              location='1.0, 2.0', comment='Thieves',
+                              title='Corruption')
+
+    def test_concurrent_writers_get_unique_ids_true(self):
+        """Test ids stay unique when many threads save at once."""
+        def save():
+            for _ in range(200):
+                record_id = self.store.next_id()
+                self.store.add(record_id, self.record(record_id))
+        threads = [threading.Thread(target=save) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.store), 1600)
+        ids = [record['Id'] for record in self.store.iter_records()]
+        self.assertEqual(ids, list(range(1, 1601)))
+
+    def test_snapshot_is_not_changed_by_writes_true(self):
+        """Test readers keep a consistent view while writers change it."""
+        for record_id in range(1, 4):
+            self.store.add(record_id, self.record(record_id))
+        records = self.store.iter_records()
+        first = next(records)
+        self.store.remove(2)
+        self.store.update(3, Comment='Changed')
+        rest = list(records)
+        self.assertEqual(first['Id'], 1)
+        self.assertEqual([record['Id'] for record in rest], [2, 3])
+        self.assertEqual(rest[1]['Comment'], 'Thieves')
+        self.assertEqual(self.store.get(3)['Comment'], 'Changed')
+
+    def test_failed_write_leaves_indexes_alone_false(self):
+        """Test indexes are rolled back when a redflag cannot be saved."""
+        self.store.add(1, self.record(1))
+        with self.assertRaises(OverflowError):
+            self.store.add(2, self.record(2, creator=10 ** 20))
+        with self.assertRaises(OverflowError):
+            self.store.update(1, **{'Created By': 10 ** 20})
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.columns.select(creator=1), [1])
+        self.assertEqual(self.store.spatial.within(0, 1, 2, 3), [1])
+        self.assertEqual(self.store.get(1)['Created By'], 1)
+
+    def test_batches_sync_outside_the_lock_true(self):
+        """Test a batch waits for durability after releasing the lock."""
+        free = watch_syncs(self.store)
+        RedFlagModel.insert_many(
+            [RedFlagModel(1, '1.0, 2.0', 'Corruption', 'Thieves')
+             for _ in range(3)], self.store)
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(free, [True])
+
+    def test_users_sync_outside_the_lock_true(self):
+        """Test signups and rehashes wait for durability unlocked."""
+        users = UserRegistry()
+        free = watch_syncs(users)
+        hasher = PasswordHasher(iterations=1)
+        res = User('john@doe.com', 'secret12').register(users, hasher)
+        self.assertTrue(res['status'])
+        res = User('John@doe.com', 'secret12').register(users, hasher)
+        self.assertFalse(res['status'])
+        user = users.get('john@doe.com')
+        hasher.configure(2, hasher.workers, hasher.queue_size)
+        Controller.rehash(user, 'secret12', users, hasher)
+        self.assertNotEqual(users.get('john@doe.com'), user)
+        self.assertEqual(free, [True, True])
+
+    def test_page_across_chunks_true(self):
+        """Test pages continue over chunk boundaries and gaps."""
+        size = 1 << CHUNK_BITS
+        for record_id in (size - 1, size, 3 * size + 5):
+            self.store.add(record_id, self.record(record_id))
+        items, more = self.store.page(size - 1, 1)
+        self.assertEqual([next(iter(item)) for item in items], [size])
+        self.assertTrue(more)
+        items, more = self.store.page(size, 5)
+        self.assertEqual([next(iter(item)) for item in items],
+                         [3 * size + 5])
+        self.assertFalse(more)
+        self.assertEqual(self.store.next_id(), 3 * size + 6)
+
+
+class TestSQLiteStore(unittest.TestCase):
+    """Test the store kept in a SQLite database."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'test.db')
+        self.store = IncidentStore(
+            SQLiteIncidentBackend(SQLiteDatabase(self.path)))
+
+    def tearDown(self):
+        """Close and remove the database."""
+        self.store.backend.close()
+        self.directory.cleanup()
+
+    def record(self, record_id, creator=1):
+        """Return a redflag with the given id."""
+        return IncidentRecord(id=record_id, created_by=creator,
+                              created_on=datetime(2018, 11, 29, 10),
+                              location='1.0, 2.0', comment='Thieves',
+                              title='Corruption')
+
+    def reopen(self):
+        """Close the store and open the same database again."""
+        self.store.backend.close()
+        self.store = IncidentStore(
+            SQLiteIncidentBackend(SQLiteDatabase(self.path)))
+
+    def test_database_uses_wal_journal_true(self):
+        """Test the database is in write ahead log mode."""
+        mode = self.store.backend.database.connection.execute(
+            'PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_redflags_survive_reopening_true(self):
+        """Test redflags, ids and versions are kept in the database."""
+        self.store.add_many([(self.store.next_id(), self.record(1)),
+                             (self.store.next_id(), self.record(2))])
+        self.store.update(2, Comment='Changed')
+        self.store.remove(1)
+        version = self.store.version
+        self.reopen()
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.get(2)['Comment'], 'Changed')
+        self.assertEqual(self.store.version, version)
+        self.assertEqual(self.store.next_id(), 3)
+        self.store.use(self.store.backend)
+        self.assertEqual(self.store.text.search('changed', 5)[0][1], 2)
+
+    def test_opening_streams_redflags_into_indexes_true(self):
+        """Test indexes are built in one pass without listing redflags."""
+        self.store.add_many([(record_id, self.record(record_id))
+                             for record_id in range(1, 4)])
+        rows, items = self.store.backend.index_rows()
+        self.assertEqual(rows, [])
+        self.assertIs(iter(items), items)
+        self.store.use(self.store.backend)
+        self.assertEqual(self.store.spatial.within(0, 0, 5, 5), [1, 2, 3])
+        self.assertEqual(self.store.columns.select(), [1, 2, 3])
+        self.assertEqual(self.store.stats.report()['total'], 3)
+
+    def test_page_and_select_true(self):
+        """Test pages and selections read the right rows."""
+        self.store.add_many([(record_id, self.record(record_id))
+                             for record_id in range(1, 6)])
+        items, more = self.store.page(2, 2)
+        self.assertEqual([next(iter(item)) for item in items], [3, 4])
+        self.assertTrue(more)
+        items = self.store.select([5, 9, 1])
+        self.assertEqual([next(iter(item)) for item in items], [5, 1])
+        self.assertEqual([record['Id'] for record in
+                          self.store.iter_records()], [1, 2, 3, 4, 5])
+
+    def test_released_connections_are_reused_true(self):
+        """Test request threads share a bounded set of connections."""
+        database = self.store.backend.database
+        database.release()
+        lent = []
+
+        def request():
+            lent.append(database.connection)
+            self.store.get(1)
+            self.store.backend.release()
+        for _ in range(20):
+            thread = threading.Thread(target=request)
+            thread.start()
+            thread.join()
+        self.assertEqual(len({id(connection) for connection in lent}), 1)
+        self.assertEqual(len(database._idle), 1)
+        database.pool_size = 0
+        database.connection
+        database.release()
+        self.assertEqual(database._idle, [])
@@ -0,0 +1,123 @@
+"""Contains the tests for listing redflags by creation date."""
+import unittest
+from datetime import datetime
+
+from app import create_app
+from app.api_1_0.records import IncidentRecord
+from app.api_1_0.timeline import TimeIndex, timestamp
+
+from app.api_1_0.views import DB
+
+
+def redflag(record_id, created):
+    """Return a stored redflag created at a date."""
+    return IncidentRecord(id=record_id, created_by=1, created_on=created,
+                          location='1.0, 2.0', comment='Thieves',
+                          title='Bribe')
+
+
+class TestTimeIndex(unittest.TestCase):
+    """Test the index keeps redflags in creation order."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.index = TimeIndex()
+        self.records = {
+            1: redflag(1, datetime(2024, 1, 3)),
+            2: redflag(2, datetime(2024, 1, 1)),
+            3: redflag(3, datetime(2024, 1, 2)),
+            4: redflag(4, datetime(2024, 1, 2)),
+            5: redflag(5, 'yesterday')}
+        for record_id, record in self.records.items():
+            self.index.add(record_id, record)
+
+    def ids(self, **kwargs):
+        """Return the ids of a page and whether more follow."""
+        keys, more = self.index.page(**kwargs)
+        return [record_id for created, record_id in keys], more
+
+    def test_page_in_creation_order_true(self):
+        """Test dates order redflags and ids break ties."""
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.ids(), ([2, 3, 4, 1], False))
+        self.assertEqual(self.ids(descending=True), ([1, 4, 3, 2], False))
+
+    def test_page_in_date_range_true(self):
+        """Test from is included and to is excluded."""
+        self.assertEqual(self.ids(since=datetime(2024, 1, 2),
+                                  until=datetime(2024, 1, 3)),
+                         ([3, 4], False))
+        self.assertEqual(self.ids(since=datetime(2024, 1, 2),
+                                  descending=True), ([1, 4, 3], False))
+        self.assertEqual(self.ids(until=datetime(2023, 1, 1)), ([], False))
+
+    def test_page_after_key_true(self):
+        """Test pages continue after the last key seen."""
+        key = (timestamp(datetime(2024, 1, 2)), 3)
+        self.assertEqual(self.ids(after=key, limit=1), ([4], True))
+        self.assertEqual(self.ids(after=key, limit=2), ([4, 1], False))
+        self.assertEqual(self.ids(after=key, descending=True), ([2], False))
+        self.assertEqual(self.ids(limit=2, descending=True), ([1, 4], True))
+
+    def test_discard_true(self):
+        """Test discarded redflags leave the index."""
+        self.index.discard(3, self.records[3])
+        self.index.discard(5, self.records[5])
+        self.index.discard(9, redflag(9, datetime(2024, 1, 2)))
+        self.assertEqual(self.ids(), ([2, 4, 1], False))
+
+
+class TestDateQueries(unittest.TestCase):
+    """Test from, to and sort when listing redflags."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.app = create_app('testing')
+        self.client = self.app.test_client
+        for day in (3, 1, 2):
+            res = self.client().post('/api/v1/redflags', data={
+                "Created By": 1,
+                "Location": "36.80, -1.28",
+                "Comment": "Thieves thieves thieves",
+                "Title": "Corruption of the highest order"
+            })
+            DB.update(res.get_json()['data']['Id'],
+                      **{'Date Created': datetime(2024, 1, day, 12)})
+
+    def tearDown(self):
+        """Remove instance variables."""
+        DB.clear()
+
+    @staticmethod
+    def ids(res):
+        """Return the ids of redflags in a response."""
+        return [int(next(iter(item))) for item in res.get_json()['data']]
+
+    def test_sort_by_created_true(self):
+        """Test pages follow creation order both ways."""
+        res = self.client().get('/api/v1/redflags?sort=created')
+        self.assertEqual(self.ids(res), [2, 3, 1])
+        res = self.client().get('/api/v1/redflags?sort=-created')
+        self.assertEqual(self.ids(res), [1, 3, 2])
+
+    def test_date_range_pages_true(self):
+        """Test a date range is paged with cursors keeping the query."""
+        res = self.client().get(
+            '/api/v1/redflags?from=2024-01-02&sort=-created&limit=1')
+        self.assertEqual(self.ids(res), [1])
+        next_page = res.get_json()['next']
+        self.assertIn('sort=-created', next_page)
+        res = self.client().get(next_page)
+        self.assertEqual(self.ids(res), [3])
+        self.assertIsNone(res.get_json()['next'])
+        res = self.client().get(
+            '/api/v1/redflags?from=2024-01-01T13:00&to=2024-01-03')
+        self.assertEqual(self.ids(res), [3])
+
+    def test_bad_date_queries_false(self):
+        """Test invalid dates, sorts and cursors are rejected."""
+        for query in ('from=yesterday', 'to=2024-01-01T00:00+03:00',
+                      'sort=title', 'from=2024-01-01&sort=id',
+                      'sort=created&cursor=MQ'):
+            res = self.client().get('/api/v1/redflags?' + query)
+            self.assertEqual(res.status_code, 400)
@@ -0,0 +1,65 @@
+"""Contains the tests for access tokens."""
+import unittest
+from unittest import mock
+
+from app import create_app
+from app.api_1_0.tokens import RevocationSet, TokenSigner
+
+from instance.config import CONFIG
+
+
+class TestTokens(unittest.TestCase):
+    """Test tokens are signed, expire and can be revoked."""
+
+    def setUp(self):
+        """Initialize objects for testing."""
+        self.signer = TokenSigner('secret', max_age=60)
+
+    def test_tokens_are_checked_without_state_true(self):
+        """Test another signer with the same key accepts a token."""
+        token = self.signer.issue(7)
+        claims = TokenSigner('secret', max_age=60).verify(token)
+        self.assertEqual(claims['id'], 7)
+        self.assertIsNone(TokenSigner('other', max_age=60).verify(token))
+        self.assertIsNone(self.signer.verify(token[:-2]))
+        self.assertNotEqual(self.signer.issue(7), token)
+
+    def test_expired_tokens_are_rejected_false(self):
+        """Test tokens older than max_age are refused."""
+        token = self.signer.issue(7)
+        self.signer.configure('secret', -1)
+        self.assertIsNone(self.signer.verify(token))
+
+    def test_revoked_tokens_are_rejected_false(self):
+        """Test a revoked token is refused but others are not."""
+        first, second = self.signer.issue(7), self.signer.issue(7)
+        self.signer.revoke(self.signer.verify(first))
+        self.assertIsNone(self.signer.verify(first))
+        self.assertEqual(self.signer.verify(second)['id'], 7)
+
+    def test_production_needs_a_secret_key_false(self):
+        """Test production does not fall back to the development key."""
+        with mock.patch.object(CONFIG['production'], 'SECRET_KEY', None):
+            with self.assertRaises(RuntimeError):
+                create_app('production')
+        self.assertTrue(create_app('testing').config['SECRET_KEY'])
+
+
+class TestRevocationSet(unittest.TestCase):
+    """Test revoked ids are kept only until they expire."""
+
+    def test_entries_expire_true(self):
+        """Test ids leave the set once their token has expired."""
+        now = [100.0]
+        revoked = RevocationSet(clock=lambda: now[0])
+        revoked.add('a', 110)
+        revoked.add('b', 120)
+        revoked.add('a', 130)
+        self.assertIn('a', revoked)
+        now[0] = 115
+        self.assertEqual(len(revoked), 2)
+        now[0] = 125
+        self.assertNotIn('b', revoked)
+        self.assertIn('a', revoked)
+        now[0] = 130
+        self.assertEqual(len(revoked), 0)
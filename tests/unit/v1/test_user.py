@@ -3,7 +3,7 @@ import unittest
 
 from app import create_app
 
-from app.api_1_0.views import USERS, LOGGED_IN
+from app.api_1_0.views import CONTROLLER, TOKENS, USERS
 
 
 class TestUser(unittest.TestCase):
@@ -22,7 +22,7 @@ class TestUser(unittest.TestCase):
     def tearDown(self):
         """Clean up after test."""
         USERS.clear()
-        LOGGED_IN.clear()
+        TOKENS.revoked.clear()
 
     def test_signup_with_valid_credentials_success(self):
         """Test user can register."""
@@ -129,7 +129,9 @@ class TestUser(unittest.TestCase):
         resp = self.client().post('/api/v1/auth/login', data=logins)
         self.assertEqual(resp.status_code, 200)
         resp = resp.get_json()
-        self.assertEqual(resp['data']['message'][0]['Email'], logins['Email'])
+        self.assertEqual(resp['data']['message']['Email'], logins['Email'])
+        self.assertEqual(TOKENS.verify(resp['data']['message']['Token'])['id'],
+                         1)
 
     def test_login_wrong_credentials_false(self):
         """Test user cannot login with false credentials."""
@@ -167,11 +169,15 @@ class TestUser(unittest.TestCase):
         }
         resp = self.client().post('/api/v1/auth/login', data=logins)
         self.assertEqual(resp.status_code, 200)
-        result = self.client().post('/api/v1/auth/logout/1')
+        headers = {'Authorization': 'Bearer {}'.format(
+            resp.get_json()['data']['message']['Token'])}
+        result = self.client().post('/api/v1/auth/logout/1', headers=headers)
         self.assertEqual(result.status_code, 200)
         result = result.get_json()
         self.assertEqual(result['data']['message'],
                          'Successfuly logged out')
+        result = self.client().post('/api/v1/auth/logout/1', headers=headers)
+        self.assertEqual(result.status_code, 400)
 
     def test_logout_un_logged_in_user_false(self):
         """Test unlogged in user logout fails."""
@@ -180,3 +186,54 @@ class TestUser(unittest.TestCase):
         resp = resp.get_json()
         self.assertEqual(resp['error'],
                          'That user is not logged in')
+
+    def test_logout_with_token_of_other_user_false(self):
+        """Test a token only logs out the user it was issued to."""
+        token = TOKENS.issue(2)
+        resp = self.client().post(
+            '/api/v1/auth/logout/1',
+            headers={'Authorization': 'Bearer {}'.format(token)})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client().post(
+            '/api/v1/auth/logout/1',
+            headers={'Authorization': 'Bearer {}x'.format(token)})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_login_second_registered_user_true(self):
+        """Test users registered after the first one can login."""
+        res = self.client().post('/api/v1/auth/signup', data=self.user)
+        self.assertEqual(res.status_code, 201)
+        user = {
+            "Email": "other@example.com",
+            "Password": "pass5678",
+            "Confirm Password": "pass5678"
+        }
+        res = self.client().post('/api/v1/auth/signup', data=user)
+        self.assertEqual(res.status_code, 201)
+        logins = {
+            "Email": "other@example.com",
+            "Password": "pass5678"
+        }
+        resp = self.client().post('/api/v1/auth/login', data=logins)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_signup_email_differing_in_case_false(self):
+        """Test emails are compared case insensitively."""
+        res = self.client().post('/api/v1/auth/signup', data=self.user)
+        self.assertEqual(res.status_code, 201)
+        user = dict(self.user, Email="User@Example.com")
+        res = self.client().post('/api/v1/auth/signup', data=user)
+        self.assertEqual(res.status_code, 400)
+        res = res.get_json()
+        self.assertEqual(res['error'][0], 'That email is already taken')
+
+    def test_failed_logins_do_not_share_errors_true(self):
+        """Test errors of one failed login are not shown to the next."""
+        for _ in range(2):
+            resp = self.client().post('/api/v1/auth/login',
+                                      data={"Email": "user.com",
+                                            "Password": "pass1234"})
+            self.assertEqual(resp.status_code, 400)
+            self.assertEqual(resp.get_json()['error'],
+                             ['Invalid Email Address'])
+        self.assertFalse(hasattr(CONTROLLER, 'errors'))